@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from typing import Optional
+import heapq
+from typing import Callable, Optional
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import QStringListModel, Qt, QTimer
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import (
+    QCompleter,
     QDialog,
     QDialogButtonBox,
     QHBoxLayout,
@@ -14,9 +16,12 @@ from PyQt6.QtWidgets import (
     QVBoxLayout,
 )
 
-from math_trainer_core.api_types import AuthError, UserProfile, LoginScreen
+from math_trainer_core.api_types import AuthError, AuthPending, AuthResult, UserProfile, LoginScreen
 
 
+# Only the leaders are shown; the rest of the users stay in the core's view.
+_SHOWN_SCORES = 10
+
 class LoginDialog(QDialog):
     def __init__(self, screen: LoginScreen, parent=None):
         super().__init__(parent)
@@ -32,18 +37,11 @@ class LoginDialog(QDialog):
         title.setFont(QFont("Segoe UI", 16, QFont.Weight.Bold))
         root.addWidget(title)
 
-        if self._screen.view.highscore:
-            score_lines = []
-            for name, score in sorted(
-                self._screen.view.highscore.items(),
-                key=lambda item: item[1],
-                reverse=True,
-            ):
-                score_lines.append(f"{name}: {score}")
-            score_label = QLabel("High scores:\n" + "\n".join(score_lines))
-            score_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            score_label.setFont(QFont("Segoe UI", 10))
-            root.addWidget(score_label)
+        self._score_label = QLabel("Loading high scores...")
+        self._score_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self._score_label.setFont(QFont("Segoe UI", 10))
+        root.addWidget(self._score_label)
+        self._shown_score_count = -1
 
         name_row = QHBoxLayout()
         name_row.addWidget(QLabel("Name:"))
@@ -51,6 +49,14 @@ class LoginDialog(QDialog):
         self._name_edit.setPlaceholderText("Enter your name")
         self._name_edit.returnPressed.connect(self._on_login)
         name_row.addWidget(self._name_edit)
+        # The core does the prefix lookup; the completer only shows the
+        # current suggestions, so its model never holds more than a handful.
+        self._name_model = QStringListModel(self)
+        self._completer = QCompleter(self._name_model, self)
+        self._completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self._completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
+        self._name_edit.setCompleter(self._completer)
+        self._name_edit.textEdited.connect(self._on_name_edited)
         root.addLayout(name_row)
 
         self._error_label = QLabel("")
@@ -73,18 +79,78 @@ class LoginDialog(QDialog):
 
         self._name_edit.setFocus(Qt.FocusReason.ActiveWindowFocusReason)
 
+        # Highscores stream in from the core; poll until the stream is done.
+        self._score_timer = QTimer(self)
+        self._score_timer.setInterval(50)  # ms
+        self._score_timer.timeout.connect(self._on_score_timer)
+        self._score_timer.start()
+        self._on_score_timer()
+
+        # A login or create the core answered with AuthPending (the user is
+        # still being fetched) is retried until it has an answer.
+        self._pending_action: Optional[Callable[[], AuthResult]] = None
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setInterval(50)  # ms
+        self._retry_timer.timeout.connect(self._on_retry_timer)
+
     @property
     def profile(self) -> Optional[UserProfile]:
         return self._profile
 
+    def _on_score_timer(self) -> None:
+        view = self._screen.RefreshHighscores()
+        if view.highscore_complete:
+            self._score_timer.stop()
+        if len(view.highscore) == self._shown_score_count and not view.highscore_complete:
+            return
+        self._shown_score_count = len(view.highscore)
+        self._render_highscores(view.highscore, view.highscore_complete)
+
+    def _render_highscores(self, highscore: dict[str, int], complete: bool) -> None:
+        if not highscore:
+            self._score_label.setVisible(not complete)
+            return
+        score_lines = []
+        for name, score in heapq.nlargest(_SHOWN_SCORES, highscore.items(), key=lambda item: item[1]):
+            score_lines.append(f"{name}: {score}")
+        if not complete:
+            score_lines.append("...")
+        text = "High scores:\n" + "\n".join(score_lines)
+        if text != self._score_label.text():
+            self._score_label.setText(text)
+        self._score_label.setVisible(True)
+
+    def _on_name_edited(self, text: str) -> None:
+        self._name_model.setStringList(self._screen.SuggestNames(text))
+        self._completer.setCompletionPrefix(text)
+        if text and self._name_model.rowCount() > 0:
+            self._completer.complete()
+
     def _on_login(self) -> None:
         name = self._name_edit.text()
-        result = self._screen.Login(name)
-        self._handle_result(result)
+        self._run(lambda: self._screen.Login(name))
 
     def _on_create(self) -> None:
         name = self._name_edit.text()
-        result = self._screen.CreateUser(name)
+        self._run(lambda: self._screen.CreateUser(name))
+
+    def _on_retry_timer(self) -> None:
+        if self._pending_action is not None:
+            self._run(self._pending_action)
+
+    def _run(self, action: Callable[[], AuthResult]) -> None:
+        result = action()
+        pending = isinstance(result, AuthPending)
+        self._pending_action = action if pending else None
+        for button in (self._login_button, self._create_button):
+            button.setEnabled(not pending)
+        self._name_edit.setReadOnly(pending)
+        if pending:
+            self._error_label.setText("")
+            if not self._retry_timer.isActive():
+                self._retry_timer.start()
+            return
+        self._retry_timer.stop()
         self._handle_result(result)
 
     def _handle_result(self, result: UserProfile | AuthError) -> None:
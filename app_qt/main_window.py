@@ -267,13 +267,21 @@ class MainWindow(QWidget):
             self._render()
             return
 
+    def _on_answer_edited(self, text: str) -> None:
+        """Called on every edit of the answer box: mark hopeless answers."""
+        if self._answer_edit is None:
+            return
+        check = getattr(self._screen, "check_partial_answer", None)
+        possible = check(text) if callable(check) else None
+        self._answer_edit.setStyleSheet("color: #b00020;" if possible is False else "")
+
     def _on_timer(self) -> None:
         """Periodic timer -> RefreshEvent for question timer updates."""
         view = self._screen.view
         if not isinstance(view, QuestionView):
             return
 
-        if view.time is None:
+        if view.time is None and not view.question_pending:
             return
 
         events = self._screen.possible_events
@@ -281,6 +289,7 @@ class MainWindow(QWidget):
             return
 
         was_input_enabled = view.input_enabled
+        was_pending = view.question_pending
         was_feedback = view.feedback_text
         was_question_idx = view.question_idx
         was_progress = list(view.progress)
@@ -295,6 +304,7 @@ class MainWindow(QWidget):
         state_changed = (
             new_view.question_idx != was_question_idx
             or new_view.input_enabled != was_input_enabled
+            or new_view.question_pending != was_pending
             or new_view.feedback_text != was_feedback
             or new_view.progress != was_progress
             or had_time != (new_view.time is not None)
@@ -359,6 +369,12 @@ class MainWindow(QWidget):
             desc_lbl.setFont(QFont("Segoe UI", 10))
             self._content_layout.addWidget(desc_lbl)
 
+        if view.plugin_errors:
+            errors_lbl = QLabel("Some trainings could not be loaded:\n" + "\n".join(view.plugin_errors))
+            errors_lbl.setWordWrap(True)
+            errors_lbl.setStyleSheet("color: #b00020;")
+            self._content_layout.addWidget(errors_lbl)
+
         hint = QLabel("Use ↑/↓ to choose, Enter to start, Esc for login")
         hint.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self._content_layout.addWidget(hint)
@@ -642,9 +658,11 @@ class MainWindow(QWidget):
         self._answer_edit.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         self._answer_edit.setReadOnly(not view.input_enabled)
         self._answer_edit.returnPressed.connect(self._on_answer_entered)
+        self._answer_edit.textEdited.connect(self._on_answer_edited)
         self._answer_edit.installEventFilter(self)
         if view.input_enabled and prev_text:
             self._answer_edit.setText(prev_text)
+            self._on_answer_edited(prev_text)
         self._content_layout.addWidget(self._answer_edit)
 
         if view.time is not None:
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from .api_types import LoginScreen
 from .core.login import LoginImpl
+from .plugins.plugin_watcher import start_plugin_watcher
 
 class CoreApi:
     @staticmethod
@@ -9,5 +10,8 @@ class CoreApi:
         """
         Entry point for the GUI.
 
+        Also starts watching the plugins for changes, so edited plugin code
+        and chapter files are picked up without a restart.
         """
+        start_plugin_watcher()
         return LoginImpl()
@@ -68,6 +68,8 @@ class QuestionView:
     question_idx: int
     input_enabled: bool
     time: Optional[QuestionTime]
+    # The question is still being made; keep sending RefreshEvent.
+    question_pending: bool = False
 
 QuestionEvent = Union[RefreshEvent, AnswerEvent, NextEvent]
 
@@ -86,6 +88,15 @@ class QuestionScreen(Protocol):
         """
         ...
 
+    def check_partial_answer(self, text: str) -> Optional[bool]:
+        """
+        As-you-type check of the answer input: False if text can no longer
+        become a correct answer, True if it still can, None if the training
+        cannot tell (or is not waiting for an answer). Cheap enough to call
+        on every keystroke.
+        """
+        ...
+
     def escape(self) -> TrainingGridScreen:
         """
         Always possible: leave questions and go back to training grid.
@@ -182,6 +193,8 @@ class TrainingSelectView:
     total_score: int
     items: List[TrainingItemView]
     selected_index: int
+    # One line per plugin that could not be loaded, e.g. "animals: ValueError: ...".
+    plugin_errors: List[str] = field(default_factory=list)
 
 
 class TrainingSelectScreen(Protocol):
@@ -213,23 +226,53 @@ class UserProfile:
 class AuthError:
     message: str
 
-AuthResult = Union[UserProfile, AuthError]
+
+@dataclass(frozen=True)
+class AuthPending:
+    """
+    The user is still being fetched (e.g. from a remote store); nothing
+    was done. Try again shortly.
+    """
+
+AuthResult = Union[UserProfile, AuthError, AuthPending]
 
 
 @dataclass
 class LoginView:
+    # Filled in incrementally in the background, best scores first.
     highscore: dict[UserName, int]
+    highscore_complete: bool = False
 
 class LoginScreen(Protocol):
     @property
     def view(self) -> LoginView:
         ...
 
+    def RefreshHighscores(self) -> LoginView:
+        """
+        Pull in highscores that arrived since the last call (non-blocking).
+        """
+        ...
+
+    def SuggestNames(self, prefix: str) -> list[str]:
+        """
+        Known user names starting with prefix, ignoring case (non-blocking;
+        empty while the name index is still loading).
+        """
+        ...
+
     def Start(self, user_profile: UserProfile | None = None) -> TrainingSelectScreen:
         ...
 
     def Login(self, name: str) -> AuthResult:
+        """
+        Non-blocking: AuthPending while the user is still being fetched;
+        call again shortly.
+        """
         ...
 
     def CreateUser(self, name: str) -> AuthResult:
+        """
+        Non-blocking, like Login.
+        """
         ...
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def write_atomic(path: Path, payload: bytes) -> None:
+    """
+    Replace path with payload so readers see the old or the new file, never
+    a partial one.
+
+    The temp file gets a unique name next to path (same file system, so
+    the rename is atomic): threads of one process and other processes may
+    write the same file at once.
+    """
+    handle, temp_name = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(handle, "wb") as temp_file:
+            temp_file.write(payload)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
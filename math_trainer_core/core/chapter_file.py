@@ -0,0 +1,469 @@
+from __future__ import annotations
+
+import codecs
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from dataclasses import dataclass
+from json.decoder import scanstring
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, Sequence, TypeVar, overload
+
+from .atomic_file import write_atomic
+from .content_repository import load_content
+
+
+# A chapter file is a JSON object mapping each answer to its value: one
+# string (e.g. a translation) or a list of strings (e.g. picture URLs).
+# It may start with a header member, "@chapter": {"name": ...}, which is
+# not an entry; see read_chapter_header.
+#
+# tools/compile_chapters turns it into <name>.chapter next to it, a
+# little-endian binary file that is mapped instead of parsed:
+#
+#   header          magic, version, source mtime_ns and size,
+#                   record, value reference and string counts
+#   records         per entry: answer, normalized answer (string indices),
+#                   first value reference and value count
+#   value refs      string index of each value
+#   string offsets  string_count + 1 byte offsets into the pool
+#   string pool     UTF-8, every distinct string once
+#
+# Opening one reads the header only; entries are decoded when accessed.
+# A compiled file whose recorded mtime or size no longer matches the JSON
+# is stale and ignored.
+#
+# JSON chapter files from STREAM_THRESHOLD_BYTES up are not parsed whole:
+# StreamedChapter scans them in chunks into an offset index and decodes an
+# entry from the file when it is accessed.
+COMPILED_SUFFIX = ".chapter"
+_MAGIC = b"MTCH"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIqQIII")
+_RECORD = struct.Struct("<IIII")
+_U32 = struct.Struct("<I")
+
+STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+_STREAM_CHUNK_BYTES = 1024 * 1024
+_HEADER_CHUNK_BYTES = 4096
+CHAPTER_HEADER_KEY = "@chapter"
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_JSON_DECODER = json.JSONDecoder()
+
+
+@dataclass(frozen=True)
+class ChapterRecord:
+    answer: str
+    # normalize_answer(answer), computed once when the chapter is loaded.
+    normalized_answer: str
+    values: tuple[str, ...]
+
+
+def normalize_answer(value: str) -> str:
+    return " ".join(value.strip().casefold().split())
+
+
+def load_chapter_records(path: Path) -> Sequence[ChapterRecord]:
+    """
+    Records of the chapter file at path (the JSON file), from its compiled
+    form when that is up to date. Cached by the content repository.
+    """
+    return load_content(path, _load_records)
+
+
+def _load_records(path: Path) -> Sequence[ChapterRecord]:
+    compiled = open_compiled_chapter(path)
+    if compiled is not None:
+        return compiled
+    return _read_json_records(path)
+
+
+def _read_json_records(path: Path) -> Sequence[ChapterRecord]:
+    if os.stat(path).st_size >= STREAM_THRESHOLD_BYTES:
+        return StreamedChapter(path)
+    return read_chapter_json(path)
+
+
+def read_chapter_json(path: Path) -> tuple[ChapterRecord, ...]:
+    """
+    Parse a chapter JSON file, skipping blank answers and entries without a
+    usable value. Raises ValueError if nothing usable is left.
+    """
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(raw, dict):
+        raise ValueError(f"Invalid chapter file format: {path}")
+
+    records = [record for record in map(_record_from_item, raw.items()) if record is not None]
+    if not records:
+        raise ValueError(f"Chapter has no usable entries: {path}")
+    return tuple(records)
+
+
+def _record_from_item(item: tuple[object, object]) -> ChapterRecord | None:
+    answer, value = item
+    if not isinstance(answer, str) or not answer.strip() or answer == CHAPTER_HEADER_KEY:
+        return None
+    raw_values = value if isinstance(value, list) else [value]
+    values = tuple(v.strip() for v in raw_values if isinstance(v, str) and v.strip())
+    if not values:
+        return None
+    answer = answer.strip()
+    return ChapterRecord(answer=answer, normalized_answer=normalize_answer(answer), values=values)
+
+
+def read_chapter_header(path: Path) -> dict[str, Any]:
+    """
+    The "@chapter" header of a chapter JSON file, reading only its start;
+    empty if the file has none.
+    """
+    try:
+        with open(path, "rb") as handle:
+            key, value = _MemberScanner(handle, path, _HEADER_CHUNK_BYTES).first_member()
+    except ValueError:
+        return {}
+    return value if key == CHAPTER_HEADER_KEY and isinstance(value, dict) else {}
+
+
+def count_chapter_entries(path: Path) -> int:
+    """
+    The number of usable entries of the chapter JSON file at path, without
+    loading them: from its compiled form when that is up to date, else
+    counted while scanning the file a chunk at a time. Raises ValueError
+    like read_chapter_json.
+    """
+    compiled = open_compiled_chapter(path)
+    if compiled is not None:
+        return len(compiled)
+    with open(path, "rb") as handle:
+        count = sum(1 for _, _, record in _MemberScanner(handle, path).members() if record is not None)
+    if not count:
+        raise ValueError(f"Chapter has no usable entries: {path}")
+    return count
+
+
+def compiled_path(path: Path) -> Path:
+    return path.with_suffix(COMPILED_SUFFIX)
+
+
+def compile_chapter(path: Path) -> Path:
+    """
+    Write the compiled form of the chapter JSON file at path; returns where.
+    """
+    stat = os.stat(path)
+    records = _read_json_records(path)
+
+    strings: dict[str, int] = {}
+
+    def intern(text: str) -> int:
+        return strings.setdefault(text, len(strings))
+
+    record_table = bytearray()
+    value_refs = bytearray()
+    value_count = 0
+    for record in records:
+        record_table += _RECORD.pack(
+            intern(record.answer), intern(record.normalized_answer), value_count, len(record.values)
+        )
+        for value in record.values:
+            value_refs += _U32.pack(intern(value))
+        value_count += len(record.values)
+
+    pool = bytearray()
+    offsets = bytearray()
+    for text in strings:
+        offsets += _U32.pack(len(pool))
+        pool += text.encode("utf-8")
+    offsets += _U32.pack(len(pool))
+
+    header = _HEADER.pack(
+        _MAGIC, _VERSION, stat.st_mtime_ns, stat.st_size, len(records), value_count, len(strings)
+    )
+    target = compiled_path(path)
+    write_atomic(target, b"".join((header, record_table, value_refs, offsets, pool)))
+    return target
+
+
+def open_compiled_chapter(path: Path) -> CompiledChapter | None:
+    """
+    The compiled form of the chapter JSON file at path, or None if there is
+    none or it is stale or unreadable.
+    """
+    try:
+        stat = os.stat(path)
+        with open(compiled_path(path), "rb") as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        chapter = CompiledChapter(data)
+    except (ValueError, struct.error):
+        data.close()
+        return None
+    if chapter.source_signature != (stat.st_mtime_ns, stat.st_size):
+        data.close()
+        return None
+    return chapter
+
+
+class CompiledChapter(Sequence[ChapterRecord]):
+    """
+    Records of a compiled chapter, decoded from the mapped file on access.
+    """
+
+    def __init__(self, data: mmap.mmap):
+        magic, version, mtime_ns, size, record_count, value_count, string_count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Not a compiled chapter file.")
+        self._data = data
+        self.source_signature = (mtime_ns, size)
+        self._count = record_count
+        self._records_at = _HEADER.size
+        self._values_at = self._records_at + record_count * _RECORD.size
+        self._offsets_at = self._values_at + value_count * _U32.size
+        self._pool_at = self._offsets_at + (string_count + 1) * _U32.size
+        if len(data) < self._pool_at or len(data) != self._pool_at + self._offset(string_count):
+            raise ValueError("Truncated compiled chapter file.")
+
+    def __len__(self) -> int:
+        return self._count
+
+    @overload
+    def __getitem__(self, index: int) -> ChapterRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[ChapterRecord]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("chapter record index out of range")
+        answer, normalized, first_value, value_count = _RECORD.unpack_from(
+            self._data, self._records_at + index * _RECORD.size
+        )
+        values = tuple(
+            self._string(_U32.unpack_from(self._data, self._values_at + (first_value + i) * _U32.size)[0])
+            for i in range(value_count)
+        )
+        return ChapterRecord(answer=self._string(answer), normalized_answer=self._string(normalized), values=values)
+
+    def __iter__(self) -> Iterator[ChapterRecord]:
+        for index in range(self._count):
+            yield self[index]
+
+    def _offset(self, string_index: int) -> int:
+        return _U32.unpack_from(self._data, self._offsets_at + string_index * _U32.size)[0]
+
+    def _string(self, string_index: int) -> str:
+        start = self._pool_at + self._offset(string_index)
+        end = self._pool_at + self._offset(string_index + 1)
+        return self._data[start:end].decode("utf-8")
+
+
+class StreamedChapter(Sequence[ChapterRecord]):
+    """
+    Records of a large chapter JSON file, read from the file on access.
+
+    Opening scans the file once in chunks and keeps only the byte offset
+    and length of each usable entry (12 bytes per entry), so memory use
+    follows the entry count rather than the file size.
+
+    The file is open only while entries are read: access opens it, and
+    close() (or leaving a with block, or iterating to the end) closes it
+    again. The content repository closes a chapter it replaces.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._offsets = array("Q")
+        self._lengths = array("I")
+        with open(path, "rb") as handle:
+            for start, length, record in _MemberScanner(handle, path).members():
+                if record is not None:
+                    self._offsets.append(start)
+                    self._lengths.append(length)
+        if not self._offsets:
+            raise ValueError(f"Chapter has no usable entries: {path}")
+        self._handle: BinaryIO | None = None
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    def __enter__(self) -> StreamedChapter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    @overload
+    def __getitem__(self, index: int) -> ChapterRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[ChapterRecord]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        offset, length = self._offsets[index], self._lengths[index]
+        with self._lock:
+            if self._handle is None:
+                self._handle = open(self._path, "rb")
+            self._handle.seek(offset)
+            member = self._handle.read(length)
+        try:
+            raw = json.loads(b"{" + member + b"}")
+        except ValueError:
+            raw = {}
+        record = next(map(_record_from_item, raw.items()), None)
+        if record is None:
+            raise ValueError("Chapter file changed while in use.")
+        return record
+
+    def __iter__(self) -> Iterator[ChapterRecord]:
+        for index in range(len(self)):
+            yield self[index]
+        self.close()
+
+
+class _Incomplete(Exception):
+    pass
+
+
+class _MemberScanner:
+    """
+    Walks the members of the top-level JSON object of a file a chunk at a
+    time, using the json module's C scanners for keys and values. Holds at
+    most one chunk plus the member being read.
+    """
+
+    def __init__(self, handle: BinaryIO, path: Path, chunk_bytes: int | None = None):
+        self._handle = handle
+        self._path = path
+        self._chunk_bytes = chunk_bytes or _STREAM_CHUNK_BYTES
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._text = ""
+        self._ascii = True
+        self._pos = 0
+        self._byte_pos = 0  # File offset of self._text[self._pos].
+        self._eof = False
+
+    def members(self) -> Iterator[tuple[int, int, ChapterRecord | None]]:
+        """
+        (file offset, byte length, record or None if unusable) per member.
+        """
+        if self._next_char() != "{":
+            raise self._invalid()
+        self._advance(self._pos + 1)
+        if self._next_char() == "}":
+            return
+        while True:
+            self._next_char()
+            key, value, end, delimiter = self._read_member()
+            member = self._text[self._pos:end]
+            byte_start = self._byte_pos
+            length = len(member) if self._ascii else len(member.encode("utf-8"))
+            yield byte_start, length, _record_from_item((key, value))
+            self._advance(delimiter + 1)
+            if self._text[delimiter] == "}":
+                return
+
+    def first_member(self) -> tuple[str | None, object]:
+        """
+        Key and value of the first member; (None, None) for an empty object.
+        """
+        if self._next_char() != "{":
+            raise self._invalid()
+        self._advance(self._pos + 1)
+        if self._next_char() == "}":
+            return None, None
+        key, value, _, _ = self._read_member()
+        return key, value
+
+    def _read_member(self) -> tuple[str, object, int, int]:
+        while True:
+            text = self._text
+            try:
+                if text[self._pos] != '"':
+                    raise self._invalid()
+                key, i = scanstring(text, self._pos + 1)
+                i = _WHITESPACE.match(text, i).end()
+                if i >= len(text):
+                    raise _Incomplete
+                if text[i] != ":":
+                    raise self._invalid()
+                i = _WHITESPACE.match(text, i + 1).end()
+                value, end = _JSON_DECODER.raw_decode(text, i)
+                # Only a delimiter after the value proves it was not cut off
+                # by the chunk end (a number, say); at the end of the file
+                # anything else is an error.
+                delimiter = _WHITESPACE.match(text, end).end()
+                if delimiter >= len(text) or text[delimiter] not in ",}":
+                    raise _Incomplete
+                return key, value, end, delimiter
+            except (json.JSONDecodeError, _Incomplete, IndexError):
+                self._fill()
+
+    def _next_char(self) -> str:
+        while True:
+            self._advance(_WHITESPACE.match(self._text, self._pos).end())
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            self._fill()
+
+    def _advance(self, pos: int) -> None:
+        consumed = self._text[self._pos:pos]
+        self._byte_pos += len(consumed) if self._ascii else len(consumed.encode("utf-8"))
+        self._pos = pos
+
+    def _fill(self) -> None:
+        if self._eof:
+            raise self._invalid()
+        chunk = self._handle.read(self._chunk_bytes)
+        self._eof = not chunk
+        self._text = self._text[self._pos:] + self._decoder.decode(chunk, final=self._eof)
+        self._ascii = self._text.isascii()
+        self._pos = 0
+
+    def _invalid(self) -> ValueError:
+        return ValueError(f"Invalid chapter file format: {self._path}")
+
+
+T = TypeVar("T")
+
+
+class MappedRecords(Sequence[T]):
+    """
+    A read-only view converting chapter records into a plugin's own entry
+    type as they are accessed, so a compiled chapter is not decoded up front.
+    """
+
+    def __init__(self, records: Sequence[ChapterRecord], convert: Callable[[ChapterRecord], T]):
+        self._records = records
+        self._convert = convert
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[T]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._convert(record) for record in self._records[index]]
+        return self._convert(self._records[index])
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Sequence, overload
+
+from .atomic_file import write_atomic
+from .chapter_file import ChapterRecord, count_chapter_entries, load_chapter_records, read_chapter_header
+
+
+# Chapter names and entry counts, keyed by chapter file path and stored
+# with the file's mtime and size, so listing an unchanged chapter never
+# opens it.
+_INDEX_PATH = Path(".plugin_cache") / "chapters.json"
+_INDEX_VERSION = 1
+_INDEX_LOCK = threading.Lock()
+_CHAPTER_SUFFIX = ".json"
+
+
+@dataclass(frozen=True)
+class ChapterInfo:
+    name: str
+    path: Path
+    entry_count: int
+
+
+def discover_chapters(directory: Path) -> list[ChapterInfo]:
+    """
+    The chapters in directory: every *.json file in it, ordered by file
+    name. A chapter is named by the "name" in its "@chapter" header, or
+    after its file.
+
+    Nothing is parsed for chapters listed before, and a new or changed one
+    is only counted (see count_chapter_entries); ChapterRecords loads the
+    entries of one chapter when they are first needed.
+    """
+    paths = sorted(path for path in directory.iterdir() if path.suffix == _CHAPTER_SUFFIX and path.is_file())
+    with _INDEX_LOCK:
+        index = _read_index()
+    chapters: list[ChapterInfo] = []
+    changed = False
+    for path in paths:
+        stat = path.stat()
+        signature = [stat.st_mtime_ns, stat.st_size]
+        key = os.fspath(path)
+        cached = index.get(key)
+        if not (isinstance(cached, dict) and cached.get("signature") == signature):
+            header = read_chapter_header(path)
+            name = header.get("name")
+            cached = {
+                "signature": signature,
+                "name": name if isinstance(name, str) and name.strip() else _name_from_file(path),
+                "entry_count": count_chapter_entries(path),
+            }
+            index[key] = cached
+            changed = True
+        chapters.append(ChapterInfo(name=cached["name"], path=path, entry_count=int(cached["entry_count"])))
+    if changed:
+        _update_index({os.fspath(chapter.path): index[os.fspath(chapter.path)] for chapter in chapters})
+    return chapters
+
+
+def changed_chapter_indices(chapter_paths: Sequence[Path], changed_files: list[Path]) -> list[int] | None:
+    """
+    Indices of the chapter files among changed_files, or None if chapter
+    files were added or removed, so the chapter list itself is out of date.
+    """
+    by_path = {path: index for index, path in enumerate(chapter_paths)}
+    directories = {path.parent for path in chapter_paths}
+    indices: list[int] = []
+    for path in changed_files:
+        if path.suffix != _CHAPTER_SUFFIX or path.parent not in directories:
+            continue
+        index = by_path.get(path)
+        if index is None or not path.exists():
+            return None
+        indices.append(index)
+    return indices
+
+
+class ChapterRecords(Sequence[ChapterRecord]):
+    """
+    The records of one chapter, loaded on first use and always those of the
+    file as it is now (through the content repository).
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+
+    def __len__(self) -> int:
+        return len(load_chapter_records(self._path))
+
+    @overload
+    def __getitem__(self, index: int) -> ChapterRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[ChapterRecord]: ...
+
+    def __getitem__(self, index):
+        return load_chapter_records(self._path)[index]
+
+    def __iter__(self) -> Iterator[ChapterRecord]:
+        return iter(load_chapter_records(self._path))
+
+
+def _name_from_file(path: Path) -> str:
+    return path.stem.replace("_", " ").capitalize()
+
+
+def _read_index() -> dict[str, Any]:
+    try:
+        raw = json.loads(_INDEX_PATH.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(raw, dict) or raw.get("version") != _INDEX_VERSION:
+        return {}
+    chapters = raw.get("chapters")
+    return chapters if isinstance(chapters, dict) else {}
+
+
+def _update_index(entries: dict[str, Any]) -> None:
+    # Plugins are discovered in parallel; merge into what is on disk now.
+    with _INDEX_LOCK:
+        index = _read_index()
+        index.update(entries)
+        try:
+            _INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+            payload = json.dumps({"version": _INDEX_VERSION, "chapters": index}, indent=1, ensure_ascii=False)
+            write_atomic(_INDEX_PATH, payload.encode("utf-8"))
+        except OSError:
+            pass  # A read-only working directory just means no cache.
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+# (st_mtime_ns, st_size): a file whose signature changed is parsed again.
+_Signature = tuple[int, int]
+
+
+@dataclass(frozen=True)
+class _CachedContent:
+    signature: _Signature
+    value: Any
+
+
+class ContentRepository:
+    """
+    Parsed chapter files shared by every plugin in the process.
+
+    Each (file, parser) pair is parsed once and kept until the file's mtime
+    or size changes, so PluginInfo(), CreatePlugin() and re-entering a
+    training all reuse one parse. Parsers must return immutable values
+    (tuples, frozen dataclasses), since every caller gets the same object.
+    A value that is replaced or cleared is closed if it has close().
+    """
+
+    def __init__(self) -> None:
+        self._cache: dict[tuple[str, str], _CachedContent] = {}
+        self._lock = threading.Lock()
+
+    def load(self, path: Path, parser: Callable[[Path], T]) -> T:
+        """
+        parser(path), or the cached result of an earlier call for the same
+        unchanged file.
+        """
+        # Keyed by the parser's name, not the function object, so a plugin
+        # module reloaded at runtime replaces its old entries.
+        key = (os.fspath(path), f"{parser.__module__}.{parser.__qualname__}")
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached.signature == signature:
+            return cached.value
+        # Parse outside the lock; two threads racing on one file both parse
+        # it and the later result wins, which is harmless.
+        value = parser(path)
+        with self._lock:
+            replaced = self._cache.get(key)
+            self._cache[key] = _CachedContent(signature=signature, value=value)
+        if replaced is not None:
+            _close(replaced.value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            replaced = list(self._cache.values())
+            self._cache.clear()
+        for cached in replaced:
+            _close(cached.value)
+
+
+def _close(value: Any) -> None:
+    # Values holding a file (a StreamedChapter) reopen it if still used.
+    close = getattr(value, "close", None)
+    if callable(close):
+        close()
+
+
+_REPOSITORY = ContentRepository()
+
+
+def content_repository() -> ContentRepository:
+    return _REPOSITORY
+
+
+def load_content(path: Path, parser: Callable[[Path], T]) -> T:
+    """
+    Shorthand for content_repository().load(path, parser).
+    """
+    return _REPOSITORY.load(path, parser)
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import math
+import random
+import struct
+import time
+from array import array
+from typing import Callable
+
+from ..plugins.question_batch import Column, affine, divide, weighted_indices
+from .sectioned_state import SectionedStates, from_little_endian, little_endian
+
+
+# Per fact, an error rate and an answer time, both moving averages over
+# the fact's recent answers. A fact is drawn with weight
+#   1 + _ERROR_WEIGHT * error_rate + min(latency, _MAX_LATENCY_MS) / _SLOW_MS
+# so a fact answered wrong recently comes up several times as often as one
+# that is answered quickly and correctly.
+_ALPHA = 0.3
+_ERROR_WEIGHT = 8.0
+_SLOW_MS = 6000.0
+# Longer answers are counted as this long (the student probably left).
+_MAX_LATENCY_MS = 3 * _SLOW_MS
+# Unseen facts: somewhat error prone and slow, so they come up early.
+_PRIOR_ERROR = 0.3
+_PRIOR_LATENCY_MS = _SLOW_MS / 2
+
+_MAGIC = b"MTFS"
+_VERSION = 2
+# Sections (see sectioned_state) hold the first row, row step, row count,
+# first column, column step and column count, then per cell (row major)
+# the answer counts (I), error rates (f) and latencies in ms (f), all
+# little-endian.
+_SHAPE = struct.Struct("<iiIiiI")
+_CELL_BYTES = 4 + 4 + 4
+
+
+class FactStats:
+    """
+    Answer statistics of the facts (a, b) with a in rows and b in cols,
+    e.g. the multiplication table of one level, kept as row-major
+    rows x cols arrays, and weighted drawing of facts by them.
+
+    Facts are grouped by weight into classes [2**(e-1), 2**e). A draw
+    picks a class with probability proportional to its size times 2**e,
+    a fact of it uniformly, and keeps that fact with probability
+    weight / 2**e, else tries again. That is exactly weighted, at least
+    half the tries succeed, and weights are bounded, so there are at most
+    a handful of classes: a draw costs O(1). Recording an answer moves at
+    most one fact to another class, also O(1). draw_many draws a whole
+    batch as columns (see question_batch).
+
+    allowed(a, b) restricts the facts that are drawn, for operand ranges
+    that are not a rectangle (e.g. sums up to a limit).
+    """
+
+    def __init__(
+        self,
+        rows: range,
+        cols: range,
+        allowed: Callable[[int, int], bool] | None = None,
+        state: bytes | None = None,
+    ):
+        if not rows or not cols:
+            raise ValueError("A fact table needs at least one row and column.")
+        self._rows = rows
+        self._cols = cols
+        count = len(rows) * len(cols)
+        self._answers = array("I", bytes(4 * count))
+        self._errors = array("f", [_PRIOR_ERROR]) * count
+        self._latencies = array("f", [_PRIOR_LATENCY_MS]) * count
+        self._allowed = array("B", bytes([1])) * count
+        if allowed is not None:
+            for index in range(count):
+                a, b = self._fact(index)
+                self._allowed[index] = 1 if allowed(a, b) else 0
+            if not any(self._allowed):
+                raise ValueError("No fact is allowed.")
+        if state:
+            self._restore(state)
+        self._weights = array("d", bytes(8 * count))
+        # The facts of each weight class by its exponent e, and where each
+        # fact sits in its class (exponent 0: in none, i.e. not allowed).
+        self._classes: dict[int, array] = {}
+        self._exponents = array("b", bytes(count))
+        self._slots = array("I", bytes(4 * count))
+        # Sum of 2**e over the facts in classes; exact, as a sum of powers
+        # of two.
+        self._bound_total = 0.0
+        for index in range(count):
+            self._set_weight(index, self._weight(index))
+
+    @property
+    def rows(self) -> range:
+        return self._rows
+
+    @property
+    def cols(self) -> range:
+        return self._cols
+
+    def draw(self) -> tuple[int, int]:
+        """
+        A fact (a, b), weighted by its statistics.
+        """
+        rand = random.random
+        while True:
+            target = rand() * self._bound_total
+            for exponent, members in self._classes.items():
+                bound = math.ldexp(1.0, exponent)
+                mass = len(members) * bound
+                if target < mass:
+                    index = members[int(target / bound)]
+                    if rand() * bound < self._weights[index]:
+                        return self._fact(index)
+                    break
+                target -= mass
+
+    def draw_many(self, count: int) -> tuple[Column, Column]:
+        """
+        count facts, weighted by their statistics, as an a column and a b
+        column (see question_batch).
+        """
+        rows, cols = divide(weighted_indices(count, self._weights), len(self._cols))
+        return (
+            affine(rows, self._rows.step, self._rows.start),
+            affine(cols, self._cols.step, self._cols.start),
+        )
+
+    def record(self, a: int, b: int, correct: bool, latency_ms: float) -> None:
+        """
+        An answer to fact (a, b) that took latency_ms.
+        """
+        if a not in self._rows or b not in self._cols:
+            return
+        index = self._rows.index(a) * len(self._cols) + self._cols.index(b)
+        self._answers[index] = min(self._answers[index] + 1, 0xFFFFFFFF)
+        error = 0.0 if correct else 1.0
+        latency = min(max(0.0, latency_ms), _MAX_LATENCY_MS)
+        self._errors[index] += _ALPHA * (error - self._errors[index])
+        self._latencies[index] += _ALPHA * (latency - self._latencies[index])
+        self._set_weight(index, self._weight(index))
+
+    def weight(self, a: int, b: int) -> float:
+        """
+        The current weight of fact (a, b); 0.0 for one that is not drawn.
+        """
+        if a not in self._rows or b not in self._cols:
+            return 0.0
+        return self._weights[self._rows.index(a) * len(self._cols) + self._cols.index(b)]
+
+    def dump(self) -> bytes:
+        """
+        The statistics of every cell; see FactStatsStates.
+        """
+        shape = _SHAPE.pack(
+            self._rows.start, self._rows.step, len(self._rows),
+            self._cols.start, self._cols.step, len(self._cols),
+        )
+        return shape + little_endian(self._answers) + little_endian(self._errors) + little_endian(self._latencies)
+
+    def _fact(self, index: int) -> tuple[int, int]:
+        row, col = divmod(index, len(self._cols))
+        return self._rows[row], self._cols[col]
+
+    def _weight(self, index: int) -> float:
+        if not self._allowed[index]:
+            return 0.0
+        return 1.0 + _ERROR_WEIGHT * self._errors[index] + self._latencies[index] / _SLOW_MS
+
+    def _set_weight(self, index: int, weight: float) -> None:
+        self._weights[index] = weight
+        exponent = math.frexp(weight)[1] if weight > 0.0 else 0
+        old_exponent = self._exponents[index]
+        if exponent == old_exponent:
+            return
+        if old_exponent:
+            # Swap-remove from the old class.
+            members = self._classes[old_exponent]
+            last = members.pop()
+            if last != index:
+                members[self._slots[index]] = last
+                self._slots[last] = self._slots[index]
+            self._bound_total -= math.ldexp(1.0, old_exponent)
+        if exponent:
+            members = self._classes.setdefault(exponent, array("I"))
+            self._slots[index] = len(members)
+            members.append(index)
+            self._bound_total += math.ldexp(1.0, exponent)
+        self._exponents[index] = exponent
+
+    def _restore(self, state: bytes) -> None:
+        first_row, row_step, row_count, first_col, col_step, col_count = _SHAPE.unpack_from(state)
+        if not row_step or not col_step:
+            return
+        count = row_count * col_count
+        offset = _SHAPE.size
+        answers = from_little_endian("I", state[offset:offset + 4 * count])
+        offset += 4 * count
+        errors = from_little_endian("f", state[offset:offset + 4 * count])
+        offset += 4 * count
+        latencies = from_little_endian("f", state[offset:offset + 4 * count])
+        # Copy the cells both tables have, so a changed range keeps the
+        # statistics of the facts that are still in it.
+        stored_cols = range(first_col, first_col + col_step * col_count, col_step)
+        for stored_row in range(row_count):
+            a = first_row + row_step * stored_row
+            if a not in self._rows:
+                continue
+            row_offset = self._rows.index(a) * len(self._cols)
+            for stored_col, b in enumerate(stored_cols):
+                if b not in self._cols:
+                    continue
+                source = stored_row * col_count + stored_col
+                target = row_offset + self._cols.index(b)
+                self._answers[target] = answers[source]
+                self._errors[target] = errors[source]
+                self._latencies[target] = latencies[source]
+
+
+class FactStatsStates(SectionedStates[FactStats]):
+    """
+    The fact tables of one plugin for one user, one per name (e.g. per
+    level), saved together as one blob (Plugin.dump_state). Also times the
+    answers: see reporter.
+
+    Tables are created when first used. Stored state of tables not used in
+    this session is kept as it was.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(_MAGIC, _VERSION, _section_size)
+        self._last_answer_s = 0.0
+
+    def table(
+        self,
+        name: str,
+        rows: range,
+        cols: range,
+        allowed: Callable[[int, int], bool] | None = None,
+    ) -> FactStats:
+        """
+        The table called name, created on first use. Asking for other rows
+        or columns than before replaces it, keeping the shared facts.
+        """
+        table = self._live.get(name)
+        if table is not None and (table.rows, table.cols) == (rows, cols):
+            return table
+        self.forget(name)
+        table = FactStats(rows, cols, allowed, self._stored.get(name))
+        self._live[name] = table
+        return table
+
+    def reporter(self, table: FactStats, a: int, b: int) -> Callable[[bool], None]:
+        """
+        The on_answered callback of a question about fact (a, b), made now.
+        """
+        made_s = time.monotonic()
+
+        def on_answered(correct: bool) -> None:
+            now = time.monotonic()
+            # Questions may be made ahead (see plugin_sandbox), so the time
+            # since the previous answer is the better start when later.
+            started = max(made_s, self._last_answer_s)
+            self._last_answer_s = now
+            table.record(a, b, correct, (now - started) * 1000.0)
+
+        return on_answered
+
+
+def _section_size(data: bytes, offset: int) -> int:
+    _, _, row_count, _, _, col_count = _SHAPE.unpack_from(data, offset)
+    return _SHAPE.size + _CELL_BYTES * row_count * col_count
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+DEFAULT_LOCK_TIMEOUT_S = 0.5
+_POLL_INTERVAL_S = 0.005
+
+
+@contextmanager
+def file_lock(path: Path, timeout_s: float = DEFAULT_LOCK_TIMEOUT_S) -> Iterator[bool]:
+    """
+    Hold an advisory, cross-process lock on path for the duration of the block.
+
+    Yields whether the lock was acquired. The wait is bounded by timeout_s so
+    a stuck writer elsewhere can never freeze the GUI; callers decide what to
+    do when the lock could not be taken.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as handle:
+        acquired = _acquire(handle, timeout_s)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _release(handle)
+
+
+def _acquire(handle: BinaryIO, timeout_s: float) -> bool:
+    deadline = time.monotonic() + max(0.0, timeout_s)
+    while True:
+        if _try_lock(handle):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(_POLL_INTERVAL_S)
+
+
+def _try_lock(handle: BinaryIO) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _release(handle: BinaryIO) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from enum import Enum, auto
+from pathlib import Path
+from typing import Iterator, Sequence
+
+from .chapter_file import ChapterRecord, load_chapter_records
+from .content_repository import load_content
+
+
+# Answers shorter than this are never typos of anything; "ox" one edit
+# from "ax" is simply a different word.
+MIN_TYPO_LENGTH = 3
+
+# Index keys pack a 40 bit hash of an answer variant above a 24 bit entry
+# index, so the index of a chapter is one sorted array("Q").
+_INDEX_BITS = 24
+_INDEX_MASK = (1 << _INDEX_BITS) - 1
+_HASH_MASK = (1 << 40) - 1
+
+
+class MatchKind(Enum):
+    EXACT = auto()
+    # One typo away from the expected answer.
+    NEAR_MISS = auto()
+    # Another entry of the chapter, or one typo away from one.
+    OTHER_ENTRY = auto()
+    NO_MATCH = auto()
+
+
+@dataclass(frozen=True)
+class AnswerMatch:
+    kind: MatchKind
+    # For OTHER_ENTRY: the (display) answer of the entry that matched.
+    other_answer: str | None = None
+
+
+def within_one_typo(a: str, b: str) -> bool:
+    """
+    True if a and b differ by exactly one inserted, deleted or replaced
+    character, or by two neighbouring characters swapped.
+    """
+    if a == b:
+        return False
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > 1:
+        return False
+    # Skip the common prefix, then compare what follows the first difference.
+    i = 0
+    while i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) != len(b):
+        return a[i + 1:] == b[i:]
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    return i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+
+
+class AnswerIndex:
+    """
+    Finds the entries of a chapter an answer matches, exactly or within one
+    typo, with a few bisections of one sorted array.
+
+    Every entry is indexed under its normalized answer and each variant of
+    it with one character deleted; two strings are within one typo only if
+    they share such a variant. A lookup generates the variants of the
+    answer, bisects for each, and checks the few candidates it finds.
+    """
+
+    def __init__(self, records: Sequence[ChapterRecord]):
+        self._records = records
+        keys: list[int] = []
+        for index, record in enumerate(records):
+            if index > _INDEX_MASK:
+                break  # Larger chapters are only matched by their first 16M entries.
+            keys.extend(_key(variant) | index for variant in _variants(record.normalized_answer))
+        keys.sort()
+        self._keys = array("Q", keys)
+
+    def match(self, normalized_answer: str, normalized_expected: str) -> AnswerMatch:
+        """
+        Classify normalized_answer as an answer to the entry whose answer is
+        normalized_expected. A typo of the expected answer wins over a typo
+        of another entry, but not over another entry matched exactly.
+        """
+        if normalized_answer == normalized_expected:
+            return AnswerMatch(MatchKind.EXACT)
+
+        similar: ChapterRecord | None = None
+        for index in self._candidates(normalized_answer):
+            record = self._records[index]
+            other = record.normalized_answer
+            if other == normalized_expected:
+                continue
+            if other == normalized_answer:
+                return AnswerMatch(MatchKind.OTHER_ENTRY, other_answer=record.answer)
+            if similar is None and len(other) >= MIN_TYPO_LENGTH and within_one_typo(normalized_answer, other):
+                similar = record
+
+        if len(normalized_expected) >= MIN_TYPO_LENGTH and within_one_typo(normalized_answer, normalized_expected):
+            return AnswerMatch(MatchKind.NEAR_MISS)
+        if similar is not None:
+            return AnswerMatch(MatchKind.OTHER_ENTRY, other_answer=similar.answer)
+        return AnswerMatch(MatchKind.NO_MATCH)
+
+    def _candidates(self, normalized_answer: str) -> set[int]:
+        keys = self._keys
+        found: set[int] = set()
+        for variant in _variants(normalized_answer):
+            key = _key(variant)
+            pos = bisect_left(keys, key)
+            while pos < len(keys) and keys[pos] & ~_INDEX_MASK == key:
+                found.add(keys[pos] & _INDEX_MASK)
+                pos += 1
+        return found
+
+
+def load_answer_index(path: Path) -> AnswerIndex:
+    """
+    The answer index of one chapter file, built once per process while the
+    file is unchanged.
+    """
+    return load_content(path, _build_answer_index)
+
+
+def match_answer(chapter_path: Path | None, normalized_answer: str, normalized_expected: str) -> AnswerMatch:
+    """
+    AnswerIndex.match against the chapter in chapter_path. Without a
+    readable chapter file, the answer is only compared to the expected one.
+    """
+    if normalized_answer == normalized_expected:
+        return AnswerMatch(MatchKind.EXACT)
+    if chapter_path is not None:
+        try:
+            return load_answer_index(chapter_path).match(normalized_answer, normalized_expected)
+        except (OSError, ValueError):
+            pass  # Removed or broken since the question was made.
+    if len(normalized_expected) >= MIN_TYPO_LENGTH and within_one_typo(normalized_answer, normalized_expected):
+        return AnswerMatch(MatchKind.NEAR_MISS)
+    return AnswerMatch(MatchKind.NO_MATCH)
+
+
+def _build_answer_index(path: Path) -> AnswerIndex:
+    return AnswerIndex(load_chapter_records(path))
+
+
+def _variants(text: str) -> Iterator[str]:
+    yield text
+    # Shorter texts are not within one typo of anything MIN_TYPO_LENGTH long.
+    if len(text) >= MIN_TYPO_LENGTH - 1:
+        seen = {text}
+        for i in range(len(text)):
+            variant = text[:i] + text[i + 1:]
+            if variant not in seen:
+                seen.add(variant)
+                yield variant
+
+
+def _key(variant: str) -> int:
+    return (hash(variant) & _HASH_MASK) << _INDEX_BITS
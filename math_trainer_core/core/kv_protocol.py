@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import socket
+import struct
+import threading
+from typing import BinaryIO
+
+
+# Requests: op (u8), key length (u32), value length (u32), key, value.
+# Responses: status (u8), payload length (u32), payload.
+_REQUEST = struct.Struct("<BII")
+_RESPONSE = struct.Struct("<BI")
+_U64 = struct.Struct("<Q")
+
+OP_GET = 1
+OP_SET = 2
+# Appends value to the key, creating it if needed; replies with the new
+# length as a u64.
+OP_APPEND = 3
+# Value is a u64 offset; replies with the bytes from there to the end.
+OP_GETRANGE = 4
+# Key is a prefix; replies with the matching keys, one per line.
+OP_KEYS = 5
+
+STATUS_OK = 0
+STATUS_NOT_FOUND = 1
+STATUS_ERROR = 2
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT_S = 5.0
+
+Command = tuple[int, bytes, bytes]
+
+
+class KVError(OSError):
+    pass
+
+
+def get(key: str) -> Command:
+    return OP_GET, key.encode("utf-8"), b""
+
+
+def set_value(key: str, value: bytes) -> Command:
+    return OP_SET, key.encode("utf-8"), value
+
+
+def append(key: str, value: bytes) -> Command:
+    return OP_APPEND, key.encode("utf-8"), value
+
+
+def get_range(key: str, offset: int) -> Command:
+    return OP_GETRANGE, key.encode("utf-8"), _U64.pack(offset)
+
+
+def keys(prefix: str) -> Command:
+    return OP_KEYS, prefix.encode("utf-8"), b""
+
+
+def unpack_length(payload: bytes) -> int:
+    (length,) = _U64.unpack(payload)
+    return length
+
+
+def pack_length(length: int) -> bytes:
+    return _U64.pack(length)
+
+
+def encode_request(command: Command) -> bytes:
+    op, key, value = command
+    return _REQUEST.pack(op, len(key), len(value)) + key + value
+
+
+def read_request(reader: BinaryIO) -> Command | None:
+    """
+    Read one request frame; None on a clean end of stream.
+    """
+    header = reader.read(_REQUEST.size)
+    if not header:
+        return None
+    if len(header) < _REQUEST.size:
+        raise KVError("Truncated request header.")
+    op, key_len, value_len = _REQUEST.unpack(header)
+    key = _read_exact(reader, key_len)
+    value = _read_exact(reader, value_len)
+    return op, key, value
+
+
+def encode_response(status: int, payload: bytes = b"") -> bytes:
+    return _RESPONSE.pack(status, len(payload)) + payload
+
+
+def read_response(reader: BinaryIO) -> tuple[int, bytes]:
+    status, length = _RESPONSE.unpack(_read_exact(reader, _RESPONSE.size))
+    return status, _read_exact(reader, length)
+
+
+def _read_exact(reader: BinaryIO, size: int) -> bytes:
+    data = reader.read(size) if size else b""
+    if len(data) < size:
+        raise KVError("Connection closed mid-frame.")
+    return data
+
+
+class _Connection:
+    def __init__(self, address: tuple[str, int], timeout_s: float):
+        self.sock = socket.create_connection(address, timeout=timeout_s)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def close(self) -> None:
+        self.reader.close()
+        self.sock.close()
+
+
+class KVClient:
+    """
+    Client for the key-value server, with a small connection pool.
+
+    execute() pipelines a list of commands: all frames go out in one write
+    and the replies are read back in order, so a batch costs one round trip.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+    ):
+        self._address = (host, port)
+        self._pool_size = pool_size
+        self._timeout_s = timeout_s
+        self._idle: list[_Connection] = []
+        self._lock = threading.Lock()
+
+    def execute(self, commands: list[Command]) -> list[bytes | None]:
+        """
+        Run commands in order. Returns one payload per command, None for a
+        missing key. Raises KVError on server or connection errors.
+        """
+        if not commands:
+            return []
+        connection = self._acquire()
+        try:
+            connection.sock.sendall(b"".join(encode_request(command) for command in commands))
+            replies = [read_response(connection.reader) for _ in commands]
+        except OSError as exc:
+            connection.close()
+            if isinstance(exc, KVError):
+                raise
+            raise KVError(f"Key-value server unreachable: {exc}") from exc
+        self._release(connection)
+
+        results: list[bytes | None] = []
+        for status, payload in replies:
+            if status == STATUS_ERROR:
+                raise KVError(payload.decode("utf-8", errors="replace"))
+            results.append(None if status == STATUS_NOT_FOUND else payload)
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _acquire(self) -> _Connection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return _Connection(self._address, self._timeout_s)
+        except OSError as exc:
+            raise KVError(f"Key-value server unreachable: {exc}") from exc
+
+    def _release(self, connection: _Connection) -> None:
+        with self._lock:
+            if len(self._idle) < self._pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
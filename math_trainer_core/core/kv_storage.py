@@ -0,0 +1,477 @@
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator
+
+from . import kv_protocol as kv
+from .kv_protocol import KVClient, KVError
+from .progress_log import ProgressEvent, apply_events, decode_events, diff_events, encode_events
+from .storage import ProfileStorage
+from .user import (
+    StoredUserProfile,
+    changed_training_ids,
+    copy_profile,
+    decode_snapshot,
+    encode_profile,
+    merge_profile_into,
+    normalize_name,
+    total_score,
+)
+
+
+# Keys: u:<name>:snap holds a binary snapshot, u:<name>:log the event log
+# it was compacted from (never truncated), total:<name> the user's score,
+# u:<name>:state:<training id> a plugin's state for the user.
+# "names" lists every user, one per line, possibly with duplicates.
+_NAMES_KEY = "names"
+_TOTAL_PREFIX = "total:"
+_COMPACT_AFTER_EVENTS = 256
+# Saves arriving within this window go out in one pipelined batch.
+_WRITE_BATCH_DELAY_S = 0.05
+_RETRY_DELAY_S = 1.0
+_FLUSH_TIMEOUT_S = 5.0
+# Totals fetched per round trip by highscore_batches.
+_TOTALS_PER_REQUEST = 1000
+
+
+def _snapshot_key(key: str) -> str:
+    return f"u:{key}:snap"
+
+
+def _log_key(key: str) -> str:
+    return f"u:{key}:log"
+
+
+def _total_key(key: str) -> str:
+    return f"{_TOTAL_PREFIX}{key}"
+
+
+def _plugin_state_key(key: str, training_id: str) -> str:
+    return f"{_plugin_state_prefix(key)}{training_id}"
+
+
+def _plugin_state_prefix(key: str) -> str:
+    return f"u:{key}:state:"
+
+
+@dataclass
+class _RemoteState:
+    profile: StoredUserProfile
+    # Bytes of the remote log applied to profile.
+    log_end: int
+    # Events applied since the last snapshot we know of.
+    tail_events: int
+
+
+@dataclass
+class _PendingWrite:
+    events: list[ProgressEvent]
+    created: bool = False
+
+
+class RemoteKVStorage(ProfileStorage):
+    """
+    Profiles on a shared key-value server, with the same snapshot + event
+    log layout as local storage.
+
+    Reads are served from an in-process cache and revalidated in the
+    background. The list of users is fetched when the storage is made, and
+    prefetch() and ready() fetch users and their plugin states ahead of
+    their first load, so the GUI, which asks ready() first, never waits
+    for the server; only a load that skips it does. Saves update the cache
+    immediately and queue the new events; a writer thread sends everything
+    queued in one pipelined batch. Log appends are merged by replay, so
+    several sites can write the same user.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, client: KVClient | None = None):
+        self._client = client if client is not None else KVClient(host, port)
+        self._states: dict[str, _RemoteState] = {}
+        self._names: set[str] | None = None
+        self._pending: dict[str, _PendingWrite] = {}
+        # Plugin states by (user key, training id): what we know of, and
+        # what still has to be sent.
+        self._plugin_states: dict[tuple[str, str], bytes | None] = {}
+        self._pending_plugin_states: dict[tuple[str, str], bytes] = {}
+        # Users whose plugin states are all in _plugin_states; a training
+        # missing there has no state.
+        self._plugin_states_complete: set[str] = set()
+        self._prefetch_keys: set[str] = set()
+        # Users a prefetch found no profile for.
+        self._missing: set[str] = set()
+        self._writing = False
+        self._refresh_keys: set[str] = set()
+        # Listed right away, so that ready() knows new names.
+        self._refresh_names = True
+        self._lock = threading.Lock()
+        self._write_wake = threading.Condition(self._lock)
+        self._refresh_wake = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        for target, name in ((self._write_loop, "kv-writer"), (self._refresh_loop, "kv-refresh")):
+            threading.Thread(target=target, name=name, daemon=True).start()
+        atexit.register(self.flush)
+
+    def load(self, name: str) -> StoredUserProfile | None:
+        key = normalize_name(name)
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._schedule_refresh(key)
+                self._schedule_prefetch(key)
+                return copy_profile(state.profile)
+            if self._known_missing(key):
+                # Pick up users created elsewhere for the next time.
+                self._refresh_names = True
+                self._refresh_wake.notify()
+                return None
+
+        # Only reached by callers that did not wait for ready(), e.g. tools.
+        snapshot, log = self._client.execute([kv.get(_snapshot_key(key)), kv.get(_log_key(key))])
+        fetched = _remote_state(key, snapshot, log)
+        if fetched is None:
+            return None
+        with self._lock:
+            state = self._store_fetched(key, fetched)
+            self._schedule_prefetch(key)
+            return copy_profile(state.profile)
+
+    def prefetch(self, names: list[str]) -> None:
+        """
+        Fetch the users and their plugin states in the background, e.g.
+        while a name is being typed.
+        """
+        with self._lock:
+            for name in names:
+                self._schedule_prefetch(normalize_name(name))
+
+    def ready(self, name: str) -> bool:
+        key = normalize_name(name)
+        with self._lock:
+            if key in self._states:
+                if key in self._plugin_states_complete:
+                    return True
+            elif self._known_missing(key):
+                return True
+            self._schedule_prefetch(key)
+            return False
+
+    def save(self, profile: StoredUserProfile) -> None:
+        key = normalize_name(profile.name)
+        with self._lock:
+            state = self._states.get(key)
+            created = state is None
+            if state is None:
+                state = _RemoteState(StoredUserProfile(name=profile.name, items={}), 0, 0)
+                self._states[key] = state
+                if self._names is not None:
+                    self._names.add(key)
+
+            events = diff_events(state.profile.items, profile.items, changed_training_ids(profile))
+            if events:
+                apply_events(state.profile.items, events)
+                state.profile.revision += len(events)
+            merge_profile_into(profile, state.profile)
+            profile.revision = state.profile.revision
+
+            if events or created:
+                self._queue_write(key, events, created)
+
+    def list_names(self) -> list[str]:
+        with self._lock:
+            if self._names is not None:
+                self._refresh_names = True
+                self._refresh_wake.notify()
+                return sorted(self._names)
+        (listing,) = self._client.execute([kv.get(_NAMES_KEY)])
+        with self._lock:
+            self._names = _parse_names(listing) | (self._names or set())
+            return sorted(self._names)
+
+    def highscore_batches(self, batch_size: int) -> Iterator[list[tuple[str, int]]]:
+        (listing,) = self._client.execute([kv.keys(_TOTAL_PREFIX)])
+        total_keys = listing.decode("utf-8").splitlines() if listing else []
+        # The server cannot sort, so every total is fetched before the best
+        # come out first.
+        totals: list[tuple[str, int]] = []
+        for start in range(0, len(total_keys), _TOTALS_PER_REQUEST):
+            chunk = total_keys[start:start + _TOTALS_PER_REQUEST]
+            replies = self._client.execute([kv.get(total_key) for total_key in chunk])
+            totals += [
+                (total_key[len(_TOTAL_PREFIX):], int(reply))
+                for total_key, reply in zip(chunk, replies)
+                if reply is not None
+            ]
+        totals.sort(key=lambda item: (-item[1], item[0]))
+        for start in range(0, len(totals), batch_size):
+            yield totals[start:start + batch_size]
+
+    def create_many(self, profiles: list[StoredUserProfile]) -> None:
+        with self._lock:
+            for profile in profiles:
+                key = normalize_name(profile.name)
+                self._states[key] = _RemoteState(copy_profile(profile), 0, 0)
+                # New users have no plugin state to fetch.
+                self._plugin_states_complete.add(key)
+                if self._names is not None:
+                    self._names.add(key)
+                self._queue_write(key, [], created=True)
+
+    def load_plugin_state(self, name: str, training_id: str) -> bytes | None:
+        state_key = (normalize_name(name), training_id)
+        with self._lock:
+            if state_key in self._plugin_states:
+                return self._plugin_states[state_key]
+            if state_key[0] in self._plugin_states_complete:
+                return None
+        # Only reached when the prefetch for the user has not finished.
+        (data,) = self._client.execute([kv.get(_plugin_state_key(*state_key))])
+        with self._lock:
+            # A save that got in first wins.
+            return self._plugin_states.setdefault(state_key, data)
+
+    def save_plugin_state(self, name: str, training_id: str, data: bytes) -> None:
+        state_key = (normalize_name(name), training_id)
+        with self._lock:
+            self._plugin_states[state_key] = data
+            self._pending_plugin_states[state_key] = data
+            self._write_wake.notify()
+
+    def flush(self, timeout_s: float = _FLUSH_TIMEOUT_S) -> bool:
+        """
+        Wait until every queued write has reached the server. Returns False
+        on timeout, e.g. while the server is unreachable.
+        """
+        deadline = time.monotonic() + timeout_s
+        with self._lock:
+            while self._pending or self._pending_plugin_states or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        self.flush()
+        self._client.close()
+
+    # Everything below runs with self._lock held or on the background threads.
+
+    def _store_fetched(self, key: str, fetched: _RemoteState) -> _RemoteState:
+        state = self._states.setdefault(key, fetched)
+        if state is not fetched:
+            # A save got in first; keep its state and fold ours in.
+            merge_profile_into(state.profile, fetched.profile)
+        return state
+
+    def _known_missing(self, key: str) -> bool:
+        # Not cached, and no profile as far as we know.
+        return key in self._missing or (self._names is not None and key not in self._names)
+
+    def _schedule_prefetch(self, key: str) -> None:
+        if key in self._states and key in self._plugin_states_complete:
+            return
+        self._prefetch_keys.add(key)
+        self._refresh_wake.notify()
+
+    def _queue_write(self, key: str, events: list[ProgressEvent], created: bool) -> None:
+        pending = self._pending.setdefault(key, _PendingWrite(events=[]))
+        pending.events.extend(events)
+        pending.created = pending.created or created
+        self._write_wake.notify()
+
+    def _schedule_refresh(self, key: str) -> None:
+        self._refresh_keys.add(key)
+        self._refresh_wake.notify()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._pending_plugin_states:
+                    self._write_wake.wait()
+            time.sleep(_WRITE_BATCH_DELAY_S)
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                plugin_states, self._pending_plugin_states = self._pending_plugin_states, {}
+                self._writing = True
+            try:
+                self._write_batch(batch, plugin_states)
+            except KVError:
+                with self._lock:
+                    for key, write in batch.items():
+                        pending = self._pending.setdefault(key, _PendingWrite(events=[]))
+                        pending.events[:0] = write.events
+                        pending.created = pending.created or write.created
+                    for state_key, data in plugin_states.items():
+                        # Unless a newer state was saved meanwhile.
+                        self._pending_plugin_states.setdefault(state_key, data)
+                time.sleep(_RETRY_DELAY_S)
+            finally:
+                with self._lock:
+                    self._writing = False
+                    self._idle.notify_all()
+
+    def _write_batch(self, batch: dict[str, _PendingWrite], plugin_states: dict[tuple[str, str], bytes]) -> None:
+        commands: list[kv.Command] = [
+            kv.set_value(_plugin_state_key(*state_key), data) for state_key, data in plugin_states.items()
+        ]
+        appends: list[tuple[str, int, int, int]] = []
+        with self._lock:
+            for key, write in batch.items():
+                if write.created:
+                    commands.append(kv.append(_NAMES_KEY, f"{key}\n".encode("utf-8")))
+                # An empty append still creates the log, which marks the user
+                # as existing without overwriting anyone's snapshot.
+                payload = encode_events(write.events)
+                appends.append((key, len(payload), len(write.events), len(commands)))
+                commands.append(kv.append(_log_key(key), payload))
+                state = self._states.get(key)
+                if state is not None:
+                    total = str(total_score(state.profile)).encode("utf-8")
+                    commands.append(kv.set_value(_total_key(key), total))
+        replies = self._client.execute(commands)
+
+        to_compact: list[str] = []
+        with self._lock:
+            for key, size, event_count, index in appends:
+                state = self._states.get(key)
+                if state is None:
+                    continue
+                new_end = kv.unpack_length(replies[index] or b"")
+                if new_end - size == state.log_end:
+                    state.log_end = new_end
+                else:
+                    # Someone else appended in between; replay their events.
+                    self._schedule_refresh(key)
+                state.tail_events += event_count
+                if state.tail_events >= _COMPACT_AFTER_EVENTS:
+                    to_compact.append(key)
+        for key in to_compact:
+            try:
+                self._compact(key)
+            except KVError:
+                pass  # The log is intact; compaction is retried after later saves.
+
+    def _compact(self, key: str) -> None:
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            log_end = state.log_end
+        (tail,) = self._client.execute([kv.get_range(_log_key(key), log_end)])
+        with self._lock:
+            if state.log_end != log_end:
+                return
+            self._apply_tail(state, tail)
+            snapshot = encode_profile(state.profile, log_offset=state.log_end)
+            state.tail_events = 0
+        self._client.execute([kv.set_value(_snapshot_key(key), snapshot)])
+
+    def _refresh_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._refresh_keys and not self._refresh_names and not self._prefetch_keys:
+                    self._refresh_wake.wait()
+                prefetch_keys, self._prefetch_keys = self._prefetch_keys, set()
+                offsets = {
+                    key: self._states[key].log_end
+                    for key in self._refresh_keys
+                    if key in self._states
+                }
+                refresh_names = self._refresh_names
+                self._refresh_keys.clear()
+                self._refresh_names = False
+
+            keys = list(offsets)
+            commands = [kv.get_range(_log_key(key), offsets[key]) for key in keys]
+            if refresh_names:
+                commands.append(kv.get(_NAMES_KEY))
+            try:
+                replies = self._client.execute(commands)
+            except KVError:
+                # Serve the cached state; the next load schedules another try.
+                with self._lock:
+                    self._prefetch_keys |= prefetch_keys
+                time.sleep(_RETRY_DELAY_S)
+                continue
+
+            with self._lock:
+                for key, tail in zip(keys, replies):
+                    state = self._states.get(key)
+                    # Skip if a write moved the log on while we were reading.
+                    if state is not None and state.log_end == offsets[key]:
+                        self._apply_tail(state, tail)
+                if refresh_names:
+                    self._names = _parse_names(replies[-1]) | (self._names or set())
+                    self._missing -= self._names
+
+            if prefetch_keys:
+                try:
+                    self._prefetch(prefetch_keys)
+                except KVError:
+                    with self._lock:
+                        self._prefetch_keys |= prefetch_keys
+                    time.sleep(_RETRY_DELAY_S)
+
+    def _prefetch(self, keys: set[str]) -> None:
+        """
+        Fetch uncached users and every plugin state of the given users, in
+        two round trips for the whole set.
+        """
+        with self._lock:
+            fetch_keys = [key for key in keys if key not in self._states]
+            state_users = [key for key in keys if key not in self._plugin_states_complete]
+        commands: list[kv.Command] = []
+        for key in fetch_keys:
+            commands += [kv.get(_snapshot_key(key)), kv.get(_log_key(key))]
+        commands += [kv.keys(_plugin_state_prefix(key)) for key in state_users]
+        replies = self._client.execute(commands)
+        profile_replies = replies[:2 * len(fetch_keys)]
+        state_keys = [
+            (key, state_key.decode("utf-8")[len(_plugin_state_prefix(key)):])
+            for key, listing in zip(state_users, replies[2 * len(fetch_keys):])
+            for state_key in (listing.split(b"\n") if listing else [])
+        ]
+        state_replies = self._client.execute([kv.get(_plugin_state_key(*state_key)) for state_key in state_keys])
+
+        with self._lock:
+            for index, key in enumerate(fetch_keys):
+                fetched = _remote_state(key, profile_replies[2 * index], profile_replies[2 * index + 1])
+                if fetched is not None:
+                    self._store_fetched(key, fetched)
+                elif key not in self._states:
+                    self._missing.add(key)
+            for state_key, data in zip(state_keys, state_replies):
+                # A save that got in first wins.
+                self._plugin_states.setdefault(state_key, data)
+            self._plugin_states_complete.update(state_users)
+
+    @staticmethod
+    def _apply_tail(state: _RemoteState, tail: bytes | None) -> None:
+        events, consumed = decode_events(tail or b"")
+        if events:
+            apply_events(state.profile.items, events)
+            state.profile.revision += len(events)
+            state.tail_events += len(events)
+        state.log_end += consumed
+
+
+def _remote_state(key: str, snapshot: bytes | None, log: bytes | None) -> _RemoteState | None:
+    if snapshot is None and log is None:
+        return None
+    if snapshot is not None:
+        profile, log_offset = decode_snapshot(snapshot, fallback_name=key)
+    else:
+        profile, log_offset = StoredUserProfile(name=key, items={}), 0
+    events, consumed = decode_events((log or b"")[log_offset:])
+    apply_events(profile.items, events)
+    profile.revision += len(events)
+    return _RemoteState(profile, log_offset + consumed, len(events))
+
+
+def _parse_names(listing: bytes | None) -> set[str]:
+    if not listing:
+        return set()
+    return {line for line in listing.decode("utf-8").splitlines() if line}
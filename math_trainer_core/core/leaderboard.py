@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from .atomic_file import write_atomic
+from .progress_log import append_lines
+
+
+_INDEX_FILENAME = "leaderboard.idx"
+# New totals are appended here, one [name, total] JSON line each, and folded
+# into the index by the next compaction.
+_UPDATES_FILENAME = "leaderboard.log"
+_INDEX_VERSION = 1
+TOP_K = 10
+# A reader compacts the index once this many updates have piled up.
+COMPACT_AFTER_UPDATES = 512
+
+
+@dataclass
+class LeaderboardIndex:
+    totals: dict[str, int]
+    top: list[tuple[str, int]]
+    # Updates read from the log on top of the snapshot.
+    pending_updates: int = 0
+
+
+def index_path(users_dir: Path) -> Path:
+    return users_dir / _INDEX_FILENAME
+
+
+def updates_path(users_dir: Path) -> Path:
+    return users_dir / _UPDATES_FILENAME
+
+
+def leaderboard_is_fresh(users_dir: Path, source_path: Path) -> bool:
+    """
+    Whether the index exists and is at least as new as source_path (the list
+    of users). Only stats the two files.
+    """
+    try:
+        index_mtime = index_path(users_dir).stat().st_mtime_ns
+        source_mtime = source_path.stat().st_mtime_ns
+    except OSError:
+        return False
+    return source_mtime <= index_mtime
+
+
+def load_leaderboard(users_dir: Path, source_path: Path) -> LeaderboardIndex | None:
+    """
+    Read the materialized leaderboard for users_dir: the snapshot plus the
+    updates appended since it was written.
+
+    Returns None when the index is missing, unreadable or stale. The index is
+    stale when source_path (the list of users) changed after the index was
+    last written, e.g. a user was added without going through save_user.
+    """
+    if not leaderboard_is_fresh(users_dir, source_path):
+        return None
+    try:
+        raw = json.loads(index_path(users_dir).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(raw, dict) or raw.get("version") != _INDEX_VERSION:
+        return None
+    raw_totals = raw.get("totals")
+    if not isinstance(raw_totals, dict):
+        return None
+
+    totals: dict[str, int] = {}
+    for name, total in raw_totals.items():
+        if isinstance(name, str) and isinstance(total, int):
+            totals[name] = total
+    top = _parse_top(raw.get("top"), totals)
+    updates = read_leaderboard_updates(users_dir)
+    if not updates:
+        return LeaderboardIndex(totals=totals, top=top)
+
+    candidates = dict(top)
+    for name, total in merge_leaderboard_updates(totals, updates).items():
+        candidates[name] = total
+    # Totals only grow, so the new top-K is among the old top-K and the
+    # updated names.
+    return LeaderboardIndex(totals=totals, top=_top_k(candidates), pending_updates=len(updates))
+
+
+def merge_leaderboard_updates(totals: dict[str, int], updates: list[tuple[str, int]]) -> dict[str, int]:
+    """
+    Fold updates into totals in place and return the entries that changed.
+
+    A user's total never goes down, so the higher value wins. That also
+    makes replaying an update that is already in the snapshot harmless.
+    """
+    changed: dict[str, int] = {}
+    for name, total in updates:
+        if total > totals.get(name, -1):
+            totals[name] = changed[name] = total
+    return changed
+
+
+def read_leaderboard_updates(users_dir: Path) -> list[tuple[str, int]]:
+    """
+    (name, total) pairs appended since the last compaction, oldest first.
+    """
+    try:
+        data = updates_path(users_dir).read_bytes()
+    except FileNotFoundError:
+        return []
+    updates: list[tuple[str, int]] = []
+    # A trailing partial line is an append still in progress.
+    for line in data[:data.rfind(b"\n") + 1].splitlines():
+        try:
+            name, total = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(name, str) and isinstance(total, int):
+            updates.append((name, total))
+    return updates
+
+
+def append_leaderboard_updates(users_dir: Path, totals: dict[str, int]) -> None:
+    """
+    Record new totals without touching the snapshot. The caller holds the
+    leaderboard lock, so a compaction cannot drop the update.
+    """
+    if not totals:
+        return
+    append_lines(
+        updates_path(users_dir),
+        "".join(
+            json.dumps([name, total], separators=(",", ":"), ensure_ascii=False) + "\n"
+            for name, total in totals.items()
+        ).encode("utf-8"),
+    )
+
+
+def touch_leaderboard(users_dir: Path) -> None:
+    """
+    Mark the index as covering the current list of users, after a new user's
+    total was appended to it.
+    """
+    try:
+        os.utime(index_path(users_dir))
+    except FileNotFoundError:
+        pass
+
+
+def discard_leaderboard(users_dir: Path) -> None:
+    """
+    Drop the index so the next reader rebuilds it from the profiles.
+    """
+    index_path(users_dir).unlink(missing_ok=True)
+
+
+def write_leaderboard(users_dir: Path, totals: dict[str, int]) -> LeaderboardIndex:
+    """
+    Persist totals as the new snapshot and clear the update log.
+
+    The caller holds the leaderboard lock and has folded the log into
+    totals. The file is replaced atomically, so a concurrent reader sees
+    either the old or the new index, never a partial one.
+    """
+    index = LeaderboardIndex(totals=dict(totals), top=_top_k(totals))
+    payload = {
+        "version": _INDEX_VERSION,
+        "top": [[name, total] for name, total in index.top],
+        "totals": index.totals,
+    }
+    users_dir.mkdir(parents=True, exist_ok=True)
+    path = index_path(users_dir)
+    write_atomic(path, json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+    updates_path(users_dir).unlink(missing_ok=True)
+    return index
+
+
+def _parse_top(raw_top: object, totals: dict[str, int]) -> list[tuple[str, int]]:
+    if isinstance(raw_top, list):
+        top: list[tuple[str, int]] = []
+        for entry in raw_top:
+            if not isinstance(entry, list) or len(entry) != 2:
+                break
+            name, total = entry
+            if totals.get(name) != total:
+                break
+            top.append((name, total))
+        else:
+            if len(top) == min(TOP_K, len(totals)):
+                return top
+    return _top_k(totals)
+
+
+def _top_k(totals: dict[str, int]) -> list[tuple[str, int]]:
+    ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:TOP_K]
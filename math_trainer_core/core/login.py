@@ -1,18 +1,56 @@
 from __future__ import annotations
 
+import queue
+import threading
+
 from ..api_types import LoginScreen, LoginView, AuthResult, UserProfile, TrainingSelectScreen
+from .name_index import NameIndex
 from .training_select_impl import TrainingSelectImpl
-from .user import create_user, login, load_all_users, total_score
+from .user import create_user, login, iter_highscore_batches, name_index, prefetch_users
 
 
 class LoginImpl(LoginScreen):
     def __init__(self) -> None:
-        self._view = LoginView(highscore=_load_highscores())
+        self._view = LoginView(highscore={})
+        # Batches of (name, total); None marks the end of the stream.
+        self._highscore_batches: queue.SimpleQueue[list[tuple[str, int]] | None] = (
+            queue.SimpleQueue()
+        )
+        self._loader = threading.Thread(
+            target=_stream_highscores,
+            args=(self._highscore_batches,),
+            name="highscore-loader",
+            daemon=True,
+        )
+        self._loader.start()
+        # Set by the indexer thread; suggestions are empty until then.
+        self._name_index: NameIndex | None = None
+        threading.Thread(target=self._build_name_index, name="name-indexer", daemon=True).start()
 
     @property
     def view(self) -> LoginView:
         return self._view
 
+    def RefreshHighscores(self) -> LoginView:
+        while not self._view.highscore_complete:
+            try:
+                batch = self._highscore_batches.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                self._view.highscore_complete = True
+                break
+            self._view.highscore.update(batch)
+        return self._view
+
+    def SuggestNames(self, prefix: str) -> list[str]:
+        if self._name_index is None or not prefix:
+            return []
+        names = self._name_index.complete(prefix)
+        # One of them is likely to log in; fetch it before Login() needs it.
+        prefetch_users(names)
+        return names
+
     def Start(self, user_profile: UserProfile | None = None) -> TrainingSelectScreen:
         return TrainingSelectImpl.start(user_profile)
 
@@ -22,9 +60,13 @@ class LoginImpl(LoginScreen):
     def CreateUser(self, name: str) -> AuthResult:
         return create_user(name)
 
+    def _build_name_index(self) -> None:
+        self._name_index = name_index()
+
 
-def _load_highscores() -> dict[str, int]:
-    highscores: dict[str, int] = {}
-    for profile in load_all_users():
-        highscores[profile.name] = total_score(profile)
-    return highscores
+def _stream_highscores(batches: queue.SimpleQueue[list[tuple[str, int]] | None]) -> None:
+    try:
+        for batch in iter_highscore_batches():
+            batches.put(batch)
+    finally:
+        batches.put(None)
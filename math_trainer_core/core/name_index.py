@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from typing import Iterable
+
+
+DEFAULT_SUGGESTION_LIMIT = 10
+
+
+class NameIndex:
+    """
+    Sorted, case-insensitive prefix index over user names.
+
+    A lookup is one binary search plus at most limit steps, so it stays far
+    below a millisecond per keystroke with tens of thousands of names.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        # (casefolded, name) pairs in one list, so an insert from another
+        # thread can never leave a reader with mismatched halves.
+        self._entries: list[tuple[str, str]] = sorted({(name.casefold(), name) for name in names})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        entry = (name.casefold(), name)
+        pos = bisect_left(self._entries, entry)
+        return pos < len(self._entries) and self._entries[pos] == entry
+
+    def add(self, name: str) -> None:
+        if name not in self:
+            insort(self._entries, (name.casefold(), name))
+
+    def complete(self, prefix: str, limit: int = DEFAULT_SUGGESTION_LIMIT) -> list[str]:
+        """
+        Up to limit names starting with prefix, ignoring case, in order.
+        """
+        key = prefix.casefold()
+        entries = self._entries
+        matches: list[str] = []
+        pos = bisect_left(entries, (key,))
+        while pos < len(entries) and len(matches) < limit and entries[pos][0].startswith(key):
+            matches.append(entries[pos][1])
+            pos += 1
+        return matches
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections.abc import Mapping, MutableMapping
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..api_types import Locked, Room, RoomGrid, RoomProgress, TrainingId, Unlocked
+
+
+# Appends are flushed immediately but fsynced at most this often per file.
+_FSYNC_INTERVAL_S = 1.0
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """
+    One room reaching a new state: unlocked and/or a higher mastery level.
+
+    Events only ever move a room forward, so replaying them in any order and
+    any number of times gives the same grid.
+    """
+    training_id: TrainingId
+    room: Room
+    mastery_level: int
+    unlocked: bool
+    timestamp: float
+
+
+def join_status(current: RoomProgress | None, incoming: RoomProgress) -> RoomProgress:
+    """
+    The later of two states for one room: unlocked beats locked, and the
+    higher mastery level wins.
+    """
+    if current is None or isinstance(current, Locked):
+        return incoming
+    if isinstance(incoming, Unlocked) and incoming.mastery_level > current.mastery_level:
+        return incoming
+    return current
+
+
+def diff_events(
+    before: Mapping[TrainingId, RoomGrid],
+    after: Mapping[TrainingId, RoomGrid],
+    training_ids: list[TrainingId] | None = None,
+) -> list[ProgressEvent]:
+    """
+    Events that move before forward to after. Rooms that went backwards in
+    after (e.g. stale data from another writer) produce no event.
+    """
+    now = time.time()
+    events: list[ProgressEvent] = []
+    for training_id in training_ids if training_ids is not None else list(after):
+        new_grid = after.get(training_id)
+        if not new_grid:
+            continue
+        old_grid = before.get(training_id) or {}
+        for room, status in new_grid.items():
+            old = old_grid.get(room)
+            if join_status(old, status) == old:
+                continue
+            unlocked = isinstance(status, Unlocked)
+            events.append(
+                ProgressEvent(
+                    training_id=training_id,
+                    room=room,
+                    mastery_level=status.mastery_level if unlocked else 0,
+                    unlocked=unlocked,
+                    timestamp=now,
+                )
+            )
+    return events
+
+
+def apply_events(items: MutableMapping[TrainingId, RoomGrid], events: list[ProgressEvent]) -> None:
+    """
+    Replay events onto items. Each touched grid is copied once and replaced,
+    since grids are shared between cached profiles.
+    """
+    touched: dict[TrainingId, RoomGrid] = {}
+    for event in events:
+        grid = touched.get(event.training_id)
+        if grid is None:
+            grid = dict(items.get(event.training_id) or {})
+            touched[event.training_id] = grid
+        grid[event.room] = join_status(grid.get(event.room), _event_status(event))
+    for training_id, grid in touched.items():
+        items[training_id] = grid
+
+
+def merge_events(items: MutableMapping[TrainingId, RoomGrid], events: list[ProgressEvent]) -> list[ProgressEvent]:
+    """
+    Apply events to items and return the ones that changed something, e.g.
+    to log only the news from a batch recorded elsewhere.
+    """
+    grids: dict[TrainingId, RoomGrid] = {}
+    advancing: list[ProgressEvent] = []
+    for event in events:
+        grid = grids.get(event.training_id)
+        if grid is None:
+            grid = grids[event.training_id] = dict(items.get(event.training_id) or {})
+        old = grid.get(event.room)
+        new = join_status(old, _event_status(event))
+        if new != old:
+            grid[event.room] = new
+            advancing.append(event)
+    for training_id in {event.training_id for event in advancing}:
+        items[training_id] = grids[training_id]
+    return advancing
+
+
+def append_events(path: Path, events: list[ProgressEvent]) -> int:
+    """
+    Append events as JSON lines and return the new size of the log.
+    """
+    size = append_lines(path, encode_events(events))
+    _FSYNCS.schedule(path)
+    return size
+
+
+def append_lines(path: Path, lines: bytes) -> int:
+    """
+    Append newline-terminated lines to path and return its new size.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as handle:
+        end = handle.seek(0, os.SEEK_END)
+        if end > 0:
+            # Terminate a line torn by a crash so it cannot swallow ours.
+            handle.seek(end - 1)
+            if handle.read(1) != b"\n":
+                lines = b"\n" + lines
+        handle.write(lines)
+        handle.flush()
+        return handle.tell()
+
+
+def read_events(path: Path, offset: int = 0) -> tuple[list[ProgressEvent], int]:
+    """
+    Read events from offset to the last complete line.
+
+    Returns the events and the offset just past them. Unreadable lines are
+    skipped; a trailing partial line is left for a later read.
+    """
+    try:
+        with open(path, "rb") as handle:
+            handle.seek(offset)
+            data = handle.read()
+    except FileNotFoundError:
+        return [], offset
+    events, complete = decode_events(data)
+    return events, offset + complete
+
+
+def encode_events(events: list[ProgressEvent]) -> bytes:
+    """
+    Events in the log's line format, ready to append to any byte stream.
+    """
+    return "".join(_encode_event(event) + "\n" for event in events).encode("utf-8")
+
+
+def decode_events(data: bytes) -> tuple[list[ProgressEvent], int]:
+    """
+    Decode complete lines from data. Returns the events and the number of
+    bytes consumed; a trailing partial line is not consumed.
+    """
+    complete = data.rfind(b"\n") + 1
+    events: list[ProgressEvent] = []
+    for line in data[:complete].splitlines():
+        event = _decode_event(line)
+        if event is not None:
+            events.append(event)
+    return events, complete
+
+
+def encode_user_events(name: str, events: list[ProgressEvent]) -> bytes:
+    """
+    Events tagged with the user's name ("n"), for feeds that carry many
+    users. A user without events is written as a bare name line so that
+    the user's existence is passed on too.
+    """
+    if not events:
+        return json.dumps({"n": name}, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+    return "".join(
+        json.dumps({"n": name, **_event_fields(event)}, separators=(",", ":"), ensure_ascii=False) + "\n"
+        for event in events
+    ).encode("utf-8")
+
+
+def decode_user_events(data: bytes) -> tuple[list[tuple[str, ProgressEvent | None]], int]:
+    """
+    Decode complete lines written by encode_user_events. Returns
+    (name, event or None for a bare name) pairs and the bytes consumed.
+    """
+    complete = data.rfind(b"\n") + 1
+    pairs: list[tuple[str, ProgressEvent | None]] = []
+    for line in data[:complete].splitlines():
+        try:
+            raw = json.loads(line)
+            name = str(raw["n"])
+        except (ValueError, TypeError, KeyError):
+            continue
+        pairs.append((name, _event_from_fields(raw) if "t" in raw else None))
+    return pairs, complete
+
+
+def sync_log(path: Path) -> None:
+    """
+    fsync path now instead of waiting for the batch interval.
+    """
+    _FSYNCS.flush(path)
+
+
+def _event_status(event: ProgressEvent) -> RoomProgress:
+    if not event.unlocked:
+        return Locked()
+    room = event.room
+    return Unlocked(
+        mastery_level=event.mastery_level,
+        score=room.difficulty * room.time_pressure * event.mastery_level,
+    )
+
+
+def _event_fields(event: ProgressEvent) -> dict[str, object]:
+    return {
+        "ts": round(event.timestamp, 3),
+        "t": event.training_id,
+        "d": event.room.difficulty,
+        "p": event.room.time_pressure,
+        "m": event.mastery_level,
+        "u": 1 if event.unlocked else 0,
+    }
+
+
+def _event_from_fields(raw: dict) -> ProgressEvent | None:
+    try:
+        return ProgressEvent(
+            training_id=str(raw["t"]),
+            room=Room(difficulty=int(raw["d"]), time_pressure=int(raw["p"])),
+            mastery_level=int(raw["m"]),
+            unlocked=bool(raw["u"]),
+            timestamp=float(raw.get("ts", 0.0)),
+        )
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def _encode_event(event: ProgressEvent) -> str:
+    return json.dumps(_event_fields(event), separators=(",", ":"), ensure_ascii=False)
+
+
+def _decode_event(line: bytes) -> ProgressEvent | None:
+    try:
+        raw = json.loads(line)
+    except ValueError:
+        return None
+    return _event_from_fields(raw) if isinstance(raw, dict) else None
+
+
+class _FsyncBatcher:
+    """
+    Coalesces fsyncs: every appended-to file is synced once per interval.
+    """
+
+    def __init__(self, interval_s: float):
+        self._interval_s = interval_s
+        self._pending: set[Path] = set()
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+
+    def schedule(self, path: Path) -> None:
+        with self._lock:
+            self._pending.add(path)
+            if self._timer is None:
+                self._timer = threading.Timer(self._interval_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self, path: Path | None = None) -> None:
+        with self._lock:
+            if path is not None:
+                if path not in self._pending:
+                    return
+                self._pending.discard(path)
+                paths = [path]
+            else:
+                paths = list(self._pending)
+                self._pending.clear()
+                self._timer = None
+        for pending in paths:
+            _fsync_file(pending)
+
+
+def _fsync_file(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+_FSYNCS = _FsyncBatcher(_FSYNC_INTERVAL_S)
+atexit.register(_FSYNCS.flush)
@@ -69,6 +69,7 @@ class QuestionImpl:
         self._question = self._plugin.make_question(self._level_index)
         self._deadline_ms: Optional[int] = None
         self._awaiting_next: bool = False
+        self._near_miss_used: bool = False
 
         self._start_new_question(initial=True)
 
@@ -100,6 +101,16 @@ class QuestionImpl:
 
         return self
 
+    def check_partial_answer(self, text: str) -> Optional[bool]:
+        if self._awaiting_next or self._view.question_pending:
+            return None
+        check_fn = getattr(self._question, "check_partial_answer", None)
+        if not callable(check_fn):
+            return None
+        possible = check_fn(text)
+        # None: the question cannot tell.
+        return None if possible is None else bool(possible)
+
     # -------------------------------------------------------------------------
     # Internal helpers
     # -------------------------------------------------------------------------
@@ -113,11 +124,27 @@ class QuestionImpl:
             self._question = self._plugin.make_question(self._level_index)
 
         self._awaiting_next = False
-        self._view.input_enabled = True
+        self._near_miss_used = False
         self._view.feedback_text = ""
         if self._view.question_idx >= len(self._view.progress):
             self._view.progress.append(Progress.PENDING)
 
+        if not self._content_ready():
+            # Shown once it arrives; see _handle_refresh.
+            self._view.question_pending = True
+            self._view.input_enabled = False
+            self._view.time = None
+            self._deadline_ms = None
+            placeholder = self._question.read_question()
+            self._view.question_text = f"Streak: {self._view.current_streak}\n{placeholder.question_text}"
+            self._view.optional_question_pictures = []
+            return
+        self._show_question()
+
+    def _show_question(self) -> None:
+        self._view.question_pending = False
+        self._view.input_enabled = True
+
         # timer setup
         if self._time_limit_ms is not None:
             self._deadline_ms = _now_ms() + self._time_limit_ms
@@ -140,6 +167,11 @@ class QuestionImpl:
         if self._awaiting_next:
             return self
 
+        if self._view.question_pending:
+            if self._content_ready():
+                self._show_question()
+            return self
+
         if self._deadline_ms is None:
             return self
 
@@ -151,8 +183,13 @@ class QuestionImpl:
             self._view.time.time_left_ms = remaining
         return self
 
+    def _content_ready(self) -> bool:
+        ready_fn = getattr(self._question, "content_ready", None)
+        # Only an explicit False means pending.
+        return not callable(ready_fn) or ready_fn() is not False
+
     def _handle_answer(self, raw_answer: str) -> QuestionScreen:
-        if self._awaiting_next:
+        if self._awaiting_next or self._view.question_pending:
             # ignore extra answers when waiting for next
             return self
 
@@ -165,6 +202,14 @@ class QuestionImpl:
             self._view.feedback_text = "Please enter a valid number. 🙃"
             return self  # stay on current question, still waiting for answer
 
+        if result.result == AnswerResult.NEAR_MISS:
+            if not self._near_miss_used:
+                self._near_miss_used = True
+                self._view.feedback_text = result.display_answer_text
+                return self  # one more try, streak kept
+            # Second near miss: wrong, with the answer shown.
+            result = self._question.reveal_answer()
+
         if result.result == AnswerResult.CORRECT:
             self._view.current_streak += 1
             if self._view.current_streak > self._view.highest_streak:
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import itertools
+import random
+import struct
+from array import array
+from typing import Callable, Iterable
+
+from .sectioned_state import SectionedStates, from_little_endian, little_endian
+
+
+# Leitner boxes: an item in box b comes back after _INTERVALS[b] questions
+# of its chapter. A correct answer moves it up a box, a wrong one back to 0.
+_INTERVALS = (2, 4, 8, 16, 32, 64, 128, 256, 512)
+_TOP_BOX = len(_INTERVALS) - 1
+_UNSEEN = 0xFF
+
+_MAGIC = b"MTRV"
+_VERSION = 1
+# Sections (see sectioned_state) hold the item count, and the items as key
+# hashes (Q), boxes (B) and due times relative to the scheduler's clock
+# (i), all little-endian.
+_U32 = struct.Struct("<I")
+_ITEM_BYTES = 8 + 1 + 4
+
+
+def item_key_hash(key: str) -> int:
+    """
+    Stable 64 bit hash of an item key, the same in every process.
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class ReviewScheduler:
+    """
+    Spaced repetition over the items of one chapter.
+
+    Items are identified by stable keys; review state (box and due time)
+    lives in arrays indexed like the keys, and due items wait in a heap, so
+    choosing the next item costs O(log n). Time is counted in questions, so
+    a break between sessions does not make everything due at once.
+
+    next_item schedules the item as if it will be answered correctly;
+    record moves it back to box 0 if it was not. A question that is never
+    answered thus just keeps its box.
+    """
+
+    def __init__(self, keys: Iterable[str], state: bytes | None = None):
+        self._hashes = array("Q", map(item_key_hash, keys))
+        count = len(self._hashes)
+        self._boxes = array("B", bytes([_UNSEEN]) * count)
+        self._due = array("q", bytes(8 * count))
+        # Sequence number of each item's live heap entry; older entries of
+        # the same item are stale and skipped.
+        self._entry_seq = array("Q", bytes(8 * count))
+        self._heap: list[tuple[int, int, int]] = []
+        self._seq = itertools.count(1)
+        self._clock = 0
+        self._last = -1
+        if state:
+            self._restore(state)
+        unseen = [index for index in range(count) if self._boxes[index] == _UNSEEN]
+        random.shuffle(unseen)
+        # Popped from the end.
+        self._unseen = array("I", reversed(unseen))
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def next_item(self) -> int:
+        """
+        Index of the item to ask next: the most overdue one, else a new
+        one, else the one due soonest.
+        """
+        if not self._hashes:
+            raise ValueError("No items to schedule.")
+        self._clock += 1
+        self._drop_stale()
+        if self._heap and self._heap[0][0] <= self._clock:
+            index = self._pop_next()
+        elif self._unseen:
+            index = self._unseen.pop()
+            self._boxes[index] = 0
+        else:
+            index = self._pop_next()
+        self._schedule(index, _INTERVALS[min(self._boxes[index] + 1, _TOP_BOX)])
+        self._last = index
+        return index
+
+    def record(self, index: int, correct: bool) -> None:
+        """
+        The answer to item index, handed out by next_item.
+        """
+        if self._boxes[index] == _UNSEEN:
+            return
+        if correct:
+            self._boxes[index] = min(self._boxes[index] + 1, _TOP_BOX)
+        else:
+            self._boxes[index] = 0
+            self._schedule(index, _INTERVALS[0])
+
+    def dump(self) -> bytes:
+        """
+        The review state of every item seen so far; see ReviewStates.
+        """
+        seen = [index for index in range(len(self._hashes)) if self._boxes[index] != _UNSEEN]
+        hashes = array("Q", (self._hashes[index] for index in seen))
+        boxes = array("B", (self._boxes[index] for index in seen))
+        due = array("i", (max(-(1 << 31), self._due[index] - self._clock) for index in seen))
+        return _U32.pack(len(seen)) + little_endian(hashes) + boxes.tobytes() + little_endian(due)
+
+    def _schedule(self, index: int, interval: int) -> None:
+        seq = next(self._seq)
+        self._due[index] = self._clock + interval
+        self._entry_seq[index] = seq
+        heapq.heappush(self._heap, (self._clock + interval, seq, index))
+        if len(self._heap) > 2 * len(self._hashes) + 16:
+            self._heap = [entry for entry in self._heap if self._entry_seq[entry[2]] == entry[1]]
+            heapq.heapify(self._heap)
+
+    def _pop_next(self) -> int:
+        # Never the same item twice in a row while there is another one.
+        entry = heapq.heappop(self._heap)
+        if entry[2] == self._last:
+            self._drop_stale()
+            if self._heap:
+                entry = heapq.heapreplace(self._heap, entry)
+        return entry[2]
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._entry_seq[self._heap[0][2]] != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def _restore(self, state: bytes) -> None:
+        (count,) = _U32.unpack_from(state)
+        offset = _U32.size
+        hashes = from_little_endian("Q", state[offset:offset + 8 * count])
+        offset += 8 * count
+        boxes = state[offset:offset + count]
+        offset += count
+        due = from_little_endian("i", state[offset:offset + 4 * count])
+        positions = {key_hash: index for index, key_hash in enumerate(self._hashes)}
+        for key_hash, box, relative_due in zip(hashes, boxes, due):
+            index = positions.get(key_hash)
+            if index is None or box > _TOP_BOX:
+                continue  # An item no longer in the chapter.
+            self._boxes[index] = box
+            seq = next(self._seq)
+            # The clock starts at 0, so relative due times are absolute.
+            self._due[index] = relative_due
+            self._entry_seq[index] = seq
+            self._heap.append((relative_due, seq, index))
+        heapq.heapify(self._heap)
+
+
+class ReviewStates(SectionedStates[ReviewScheduler]):
+    """
+    The review schedulers of one plugin for one user, one per chapter name,
+    saved together as one blob (Plugin.dump_state).
+
+    Schedulers are created when a chapter is first used. Stored state of
+    chapters not used in this session is kept as it was. forget(name)
+    drops the scheduler of a chapter whose items changed; its state is
+    carried over, by key, to the next one.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(_MAGIC, _VERSION, _section_size)
+
+    def scheduler(self, name: str, keys: Callable[[], Iterable[str]]) -> ReviewScheduler:
+        """
+        The scheduler of chapter name, created from keys() on first use.
+        """
+        scheduler = self._live.get(name)
+        if scheduler is None:
+            scheduler = ReviewScheduler(keys(), self._stored.get(name))
+            self._live[name] = scheduler
+        return scheduler
+
+
+def _section_size(data: bytes, offset: int) -> int:
+    (count,) = _U32.unpack_from(data, offset)
+    return _U32.size + _ITEM_BYTES * count
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from typing import Callable, Generic, Protocol, TypeVar
+
+
+# magic, version, section count; then per section: name length, name and
+# the section itself, whose length the owner tells from its first bytes
+# (see SectionedStates). All little-endian.
+_HEADER = struct.Struct("<4sII")
+_U32 = struct.Struct("<I")
+
+
+class Dumpable(Protocol):
+    def dump(self) -> bytes: ...
+
+
+T = TypeVar("T", bound=Dumpable)
+
+
+class SectionedStates(Generic[T]):
+    """
+    Named pieces of one plugin's state for one user (e.g. a review
+    scheduler per chapter), saved together as one blob (Plugin.dump_state).
+
+    Subclasses make the pieces when first used and keep them in _live;
+    _stored holds the sections of the others as they were loaded, so a
+    chapter or level not used in this session keeps its state.
+    section_size(data, offset) tells how long the section at offset is.
+    """
+
+    def __init__(self, magic: bytes, version: int, section_size: Callable[[bytes, int], int]):
+        self._magic = magic
+        self._version = version
+        self._section_size = section_size
+        self._stored: dict[str, bytes] = {}
+        self._live: dict[str, T] = {}
+
+    def load(self, data: bytes | None) -> None:
+        """
+        Replace all state with data from dump(); None starts over.
+        """
+        self._live.clear()
+        self._stored = self._decode(data) if data else {}
+
+    def dump(self) -> bytes:
+        sections = dict(self._stored)
+        sections.update((name, piece.dump()) for name, piece in self._live.items())
+        parts = [_HEADER.pack(self._magic, self._version, len(sections))]
+        for name, section in sections.items():
+            encoded = name.encode("utf-8")
+            parts.append(_U32.pack(len(encoded)) + encoded + section)
+        return b"".join(parts)
+
+    def forget(self, name: str) -> None:
+        """
+        Drop the live piece called name, keeping its state for the next
+        one made under that name.
+        """
+        piece = self._live.pop(name, None)
+        if piece is not None:
+            self._stored[name] = piece.dump()
+
+    def _decode(self, data: bytes) -> dict[str, bytes]:
+        try:
+            magic, version, section_count = _HEADER.unpack_from(data)
+            if magic != self._magic or version != self._version:
+                return {}
+            sections: dict[str, bytes] = {}
+            offset = _HEADER.size
+            for _ in range(section_count):
+                (name_length,) = _U32.unpack_from(data, offset)
+                offset += _U32.size
+                name = data[offset:offset + name_length].decode("utf-8")
+                offset += name_length
+                size = self._section_size(data, offset)
+                if offset + size > len(data):
+                    raise ValueError("Truncated plugin state.")
+                sections[name] = data[offset:offset + size]
+                offset += size
+            return sections
+        except (struct.error, UnicodeDecodeError, ValueError):
+            return {}  # Unreadable state only costs the history it held.
+
+
+def little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator, Protocol
+
+if TYPE_CHECKING:
+    from .user import StoredUserProfile
+
+
+class ProfileStorage(Protocol):
+    """
+    Where user profiles live. core.user talks to exactly one of these.
+
+    Implementations must be safe to call from the GUI thread and the
+    highscore loader thread at the same time.
+    """
+
+    def load(self, name: str) -> StoredUserProfile | None:
+        ...
+
+    def save(self, profile: StoredUserProfile) -> None:
+        """
+        Persist the profile's progress, merging in concurrent progress from
+        other writers. The merged result is applied to profile in place.
+        """
+        ...
+
+    def prefetch(self, names: list[str]) -> None:
+        """
+        Hint that these users are about to be loaded. Must not block.
+        """
+        ...
+
+    def ready(self, name: str) -> bool:
+        """
+        Whether load and load_plugin_state can answer for the user without
+        waiting for a round trip. If not, the user is fetched in the
+        background; ask again later. Must not block.
+        """
+        ...
+
+    def list_names(self) -> list[str]:
+        """
+        Sanitized names of all users, sorted.
+        """
+        ...
+
+    def highscore_batches(self, batch_size: int) -> Iterator[list[tuple[str, int]]]:
+        """
+        Stream (name, total) pairs, preferably best scores first.
+        """
+        ...
+
+    def create_many(self, profiles: list[StoredUserProfile]) -> None:
+        """
+        Store new, empty profiles in one pass. Names are already validated
+        and known not to exist.
+        """
+        ...
+
+    def load_plugin_state(self, name: str, training_id: str) -> bytes | None:
+        """
+        What save_plugin_state last stored for the user and training.
+        """
+        ...
+
+    def save_plugin_state(self, name: str, training_id: str, data: bytes) -> None:
+        """
+        Store a plugin's opaque per-user state. Unlike progress it is not
+        merged: the last save wins, and it stays on this storage (sync does
+        not carry it).
+        """
+        ...
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Protocol
+
+from . import kv_protocol as kv
+from .atomic_file import write_atomic
+from .kv_protocol import KVClient
+from .progress_log import ProgressEvent, append_lines, decode_user_events, encode_user_events
+from .user import enable_sync_outbox, import_progress, normalize_name, read_sync_outbox, sync_dir
+
+
+# Every machine (replica) publishes one append-only feed of the progress
+# made on it. A sync pushes the local outbox bytes not yet published, then
+# pulls from every other feed the bytes past this machine's sync vector
+# (replica -> feed offset) and merges them by join. Both directions cost
+# O(bytes changed since the last sync), never O(profile size).
+_REPLICA_FILE = "replica.id"
+_STATE_FILE = "state.json"
+_FEED_SUFFIX = ".feed"
+_SERVER_FEED_PREFIX = "sync:"
+
+
+class SyncTransport(Protocol):
+    """
+    A place where replicas publish their feeds.
+    """
+
+    # Identifies the remote in the local sync state.
+    key: str
+
+    def publish(self, replica: str, data: bytes) -> None:
+        """
+        Append complete lines to the replica's own feed.
+        """
+        ...
+
+    def fetch(self, vector: dict[str, int], exclude: str) -> dict[str, bytes]:
+        """
+        Bytes past vector[replica] (0 if absent) for every feed but exclude's.
+        """
+        ...
+
+
+class SharedFolderTransport(SyncTransport):
+    """
+    Feeds as <replica>.feed files in a folder every machine can reach, such
+    as a network share or a synced cloud folder. Each file has a single
+    writer, so no cross-machine locking is needed.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.key = f"folder:{self.root.resolve()}"
+
+    def publish(self, replica: str, data: bytes) -> None:
+        path = self.root / f"{replica}{_FEED_SUFFIX}"
+        append_lines(path, data)
+        fd = os.open(path, os.O_RDWR)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def fetch(self, vector: dict[str, int], exclude: str) -> dict[str, bytes]:
+        tails: dict[str, bytes] = {}
+        for path in self.root.glob(f"*{_FEED_SUFFIX}"):
+            replica = path.stem
+            offset = vector.get(replica, 0)
+            if replica == exclude or path.stat().st_size <= offset:
+                continue
+            with open(path, "rb") as handle:
+                handle.seek(offset)
+                tails[replica] = handle.read()
+        return tails
+
+
+class SyncServerTransport(SyncTransport):
+    """
+    Feeds as sync:<replica> keys on a key-value server, e.g. the stand-in
+    from tools/kv_server. A fetch is two round trips however many replicas
+    there are.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.key = f"server:{host}:{port}"
+        self._client = KVClient(host, port)
+
+    def publish(self, replica: str, data: bytes) -> None:
+        self._client.execute([kv.append(f"{_SERVER_FEED_PREFIX}{replica}", data)])
+
+    def fetch(self, vector: dict[str, int], exclude: str) -> dict[str, bytes]:
+        (listing,) = self._client.execute([kv.keys(_SERVER_FEED_PREFIX)])
+        feed_keys = [
+            feed_key
+            for feed_key in (listing.decode("utf-8").splitlines() if listing else [])
+            if feed_key[len(_SERVER_FEED_PREFIX):] != exclude
+        ]
+        replies = self._client.execute(
+            [
+                kv.get_range(feed_key, vector.get(feed_key[len(_SERVER_FEED_PREFIX):], 0))
+                for feed_key in feed_keys
+            ]
+        )
+        return {
+            feed_key[len(_SERVER_FEED_PREFIX):]: reply
+            for feed_key, reply in zip(feed_keys, replies)
+            if reply
+        }
+
+
+@dataclass
+class SyncReport:
+    pushed: int = 0
+    pulled: int = 0
+    # Users whose stored progress changed, with the number of new events.
+    updated: dict[str, int] = field(default_factory=dict)
+
+
+def replica_id() -> str:
+    """
+    This machine's replica id, created on first use.
+    """
+    path = sync_dir() / _REPLICA_FILE
+    try:
+        return path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    replica = uuid.uuid4().hex
+    path.write_text(replica, encoding="utf-8")
+    return replica
+
+
+def sync(transport: SyncTransport) -> SyncReport:
+    """
+    Exchange progress with the other replicas behind transport.
+
+    Safe to repeat and to interrupt: the sync state is only advanced after
+    the data it covers has been published or merged, and merging an event
+    twice changes nothing.
+    """
+    enable_sync_outbox()
+    replica = replica_id()
+    state = _load_sync_state(transport.key)
+    report = SyncReport()
+
+    pushed_offset = state.get("pushed", 0)
+    pairs, outbox_end = read_sync_outbox(pushed_offset)
+    if pairs:
+        by_user = _group_by_user(pairs)
+        transport.publish(
+            replica, b"".join(encode_user_events(name, events) for name, events in by_user.items())
+        )
+        report.pushed = sum(len(events) for events in by_user.values())
+    state["pushed"] = outbox_end
+    _save_sync_state(transport.key, state)
+
+    vector: dict[str, int] = state.setdefault("vector", {})
+    for source, tail in sorted(transport.fetch(vector, exclude=replica).items()):
+        pairs, consumed = decode_user_events(tail)
+        for name, events in _group_by_user(pairs).items():
+            if normalize_name(name) != name:
+                continue  # Never let a feed pick our file names.
+            report.pulled += len(events)
+            added = import_progress(name, events)
+            if added:
+                report.updated[name] = report.updated.get(name, 0) + added
+        vector[source] = vector.get(source, 0) + consumed
+        _save_sync_state(transport.key, state)
+    return report
+
+
+def _group_by_user(pairs: list[tuple[str, ProgressEvent | None]]) -> dict[str, list[ProgressEvent]]:
+    grouped: dict[str, list[ProgressEvent]] = defaultdict(list)
+    for name, event in pairs:
+        events = grouped[name]
+        if event is not None:
+            events.append(event)
+    return grouped
+
+
+def _state_path() -> Path:
+    return sync_dir() / _STATE_FILE
+
+
+def _load_sync_state(key: str) -> dict:
+    try:
+        raw = json.loads(_state_path().read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    state = raw.get(key) if isinstance(raw, dict) else None
+    return state if isinstance(state, dict) else {}
+
+
+def _save_sync_state(key: str, state: dict) -> None:
+    path = _state_path()
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        raw = {}
+    if not isinstance(raw, dict):
+        raw = {}
+    raw[key] = state
+    write_atomic(path, json.dumps(raw, indent=2, sort_keys=True).encode("utf-8"))
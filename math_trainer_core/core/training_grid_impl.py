@@ -18,7 +18,7 @@ from ..api_types import (
 )
 from ..plugins.plugin_api import Plugin, PluginInfo, Difficulty, Chapters, AnswerButton, Chapter
 from .question_impl import start_question_session, QuestionImpl
-from .user import save_user, StoredUserProfile
+from .user import load_plugin_state, save_plugin_state, save_user, StoredUserProfile
 
 
 _DEFAULT_INFINITE_LEVELS = 25
@@ -39,6 +39,9 @@ _TIME_LIMITS_MS: list[Optional[int]] = [
 ]
 _DEFAULT_REQUIRED_STREAK = 5
 _DEFAULT_ANSWER_BUTTONS = [AnswerButton.SPACE, AnswerButton.ENTER]
+# Plugin state is saved when leaving a question session, and every this
+# many questions so that closing the window loses little.
+_SAVE_PLUGIN_STATE_EVERY = 10
 
 
 def _is_chapters_mode(mode: Difficulty | Chapters) -> bool:
@@ -144,6 +147,7 @@ class TrainingGridImpl(TrainingGridScreen):
         )
         self._rebuild_view()
         self._sync_profile()
+        self._load_plugin_state()
 
     def accepted_answer_buttons(self) -> List[AnswerButton]:
         buttons = self._info.accepted_answer_buttons
@@ -204,8 +208,23 @@ class TrainingGridImpl(TrainingGridScreen):
         self._rebuild_view()
         self._sync_profile()
 
+    def save_plugin_state(self) -> None:
+        dump_fn = getattr(self._plugin, "dump_state", None)
+        if not callable(dump_fn) or self._profile is None or self._training_id is None:
+            return
+        data = dump_fn()
+        if data is not None:
+            save_plugin_state(self._profile.name, self._training_id, data)
+
     # ------------------------------------------------------------------ helpers
 
+    def _load_plugin_state(self) -> None:
+        # The plugin instance is shared; give it this user's state.
+        load_fn = getattr(self._plugin, "load_state", None)
+        if not callable(load_fn) or self._profile is None or self._training_id is None:
+            return
+        load_fn(load_plugin_state(self._profile.name, self._training_id))
+
     def _delta_for_move(self, event: GridMove) -> tuple[int, int]:
         if event == GridMove.LEFT:
             return -1, 0
@@ -362,6 +381,7 @@ class _QuestionWrapper(QuestionScreen):
         self._inner: QuestionImpl = inner
         self._grid = grid
         self._coord: Room = coord
+        self._saved_question_idx = 0
 
     @property
     def view(self):
@@ -377,8 +397,15 @@ class _QuestionWrapper(QuestionScreen):
 
     def handle(self, event):
         self._inner = self._inner.handle(event)
+        if self._inner.view.question_idx - self._saved_question_idx >= _SAVE_PLUGIN_STATE_EVERY:
+            self._saved_question_idx = self._inner.view.question_idx
+            self._grid.save_plugin_state()
         return self
 
+    def check_partial_answer(self, text: str):
+        return self._inner.check_partial_answer(text)
+
     def escape(self) -> TrainingGridScreen:
         self._grid.record_mastery(self._coord, self._inner.view.mastery_level)
+        self._grid.save_plugin_state()
         return self._grid
@@ -10,7 +10,8 @@ from ..api_types import (
     Unlocked,
 )
 from ..plugins.plugin_api import Plugin, PluginInfo, EmojiIcon, FileIcon
-from ..plugins.plugin_loader import load_plugin_factories
+from ..plugins.plugin_loader import discover_plugins
+from ..plugins.plugin_watcher import plugin_reload_errors
 from .training_grid_impl import TrainingGridImpl
 from .user import load_user, StoredUserProfile
 
@@ -18,7 +19,9 @@ from .user import load_user, StoredUserProfile
 class TrainingSelectImpl(TrainingSelectScreen):
     @staticmethod
     def start(user_profile: UserProfile | None = None) -> TrainingSelectScreen:
-        plugins = load_plugin_factories()  # dict[id, LoadedPlugin]
+        # dict[id, LoadedPlugin]; no plugin module is imported here.
+        plugins, load_errors = discover_plugins()
+        load_errors += plugin_reload_errors()
         name = user_profile.name if user_profile is not None else "Player"
         stored_profile = load_user(name)
         if stored_profile is None:
@@ -43,11 +46,12 @@ class TrainingSelectImpl(TrainingSelectScreen):
             total_score=_total_score_all(stored_profile),
             items=items,
             selected_index=0,
+            plugin_errors=[f"{error.package}: {error.message}" for error in load_errors],
         )
 
         # TrainingSelectImpl will keep 'plugins' internally, so later when the
-        # user presses Enter, it can create the right plugin instance and
-        # transition to a TrainingGridScreen.
+        # user presses Enter, it can import the plugin, get its warm instance
+        # and transition to a TrainingGridScreen.
         return TrainingSelectImpl(view=view, plugins=plugins, user_profile=stored_profile)
 
     def __init__(self, view: TrainingSelectView, plugins, user_profile: StoredUserProfile):
@@ -72,9 +76,8 @@ class TrainingSelectImpl(TrainingSelectScreen):
     def enter(self):
         selected = self._view.items[self._view.selected_index]
         loaded = self._plugins[selected.training_id]
-        factory = loaded.factory
-        plugin = factory.CreatePlugin()
-        info = factory.PluginInfo()
+        plugin = loaded.instance()
+        info = loaded.info
         return _make_initial_training_grid(
             plugin=plugin,
             selected=selected,
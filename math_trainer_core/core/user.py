@@ -1,39 +1,749 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, MutableMapping
 from pathlib import Path
 from dataclasses import dataclass
 from typing import Any
 
-from ..api_types import Locked, Room, RoomGrid, RoomProgress, TrainingId, Unlocked, AuthError, AuthResult, UserProfile
+from ..api_types import Locked, Room, RoomGrid, RoomProgress, TrainingId, Unlocked, AuthError, AuthPending, AuthResult, UserProfile
+from .atomic_file import write_atomic
+from .file_lock import file_lock
+from .name_index import NameIndex
+from .storage import ProfileStorage
+from .progress_log import (
+    ProgressEvent,
+    append_events,
+    append_lines,
+    apply_events,
+    decode_user_events,
+    diff_events,
+    encode_user_events,
+    join_status,
+    merge_events,
+    read_events,
+    sync_log,
+)
+from .leaderboard import (
+    COMPACT_AFTER_UPDATES,
+    append_leaderboard_updates,
+    discard_leaderboard,
+    leaderboard_is_fresh,
+    load_leaderboard,
+    merge_leaderboard_updates,
+    read_leaderboard_updates,
+    touch_leaderboard,
+    write_leaderboard,
+)
 
 
 _USERS_DIR = Path("users")
+_PROFILE_SUFFIX = ".prof"
+_LOG_SUFFIX = ".log"
+_LEGACY_SUFFIX = ".json"
+# users/<xx>/<name>.<training id>.state holds a plugin's state for the user.
+_PLUGIN_STATE_SUFFIX = ".state"
+# A user's lock file sits next to the profile in its shard; the locks for
+# shared files (leaderboard, name manifest) live in users/locks/.
+_LOCKS_DIR = _USERS_DIR / "locks"
+_LOCK_SUFFIX = ".lock"
+_LEADERBOARD_LOCK = "leaderboard.lock"
+_MANIFEST_LOCK = "names.lock"
+# Profiles live in users/<xx>/<name>.prof, where xx is a hash prefix of the
+# sanitized name, so no single directory grows with the number of users.
+# users/names.manifest lists every sanitized name, one per line.
+_SHARD_PREFIX_LEN = 2
+_MANIFEST_PATH = _USERS_DIR / "names.manifest"
+_PROFILE_CACHE_SIZE = 64
+# Progress is appended to users/<xx>/<name>.log; once this many events have
+# accumulated after the snapshot (<name>.prof), a new snapshot is written.
+# The log itself is never truncated and doubles as the audit trail.
+_COMPACT_AFTER_EVENTS = 256
+# Once sync is set up (users/sync/ exists), progress made on this machine
+# is also appended to users/sync/outbox.log for core.sync to send on.
+_SYNC_DIR = _USERS_DIR / "sync"
+_SYNC_OUTBOX = _SYNC_DIR / "outbox.log"
+_STORAGE_ENV = "MATH_TRAINER_STORAGE"
+_STORAGE: ProfileStorage | None = None
+_NAME_INDEX: NameIndex | None = None
+_NAME_INDEX_LOCK = threading.Lock()
+# Names created before the index was built, folded in when it is.
+_NAMES_CREATED: list[str] = []
+
 
 @dataclass
 class StoredUserProfile:
     name: str
-    items: dict[TrainingId, RoomGrid]
+    items: MutableMapping[TrainingId, RoomGrid]
+    # Number of progress events reflected in this profile when it was loaded
+    # (or last saved).
+    revision: int = 0
 
 
 def save_user(profile: StoredUserProfile) -> None:
-    _USERS_DIR.mkdir(parents=True, exist_ok=True)
-    path = _USERS_DIR / f"{_sanitize_name(profile.name)}.json"
-    payload = _profile_to_dict(profile)
-    path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+    get_storage().save(profile)
 
 
 def load_user(name: str) -> StoredUserProfile | None:
-    path = _USERS_DIR / f"{_sanitize_name(name)}.json"
-    if not path.exists():
-        return None
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    return _profile_from_dict(raw, fallback_name=name)
+    return get_storage().load(name)
+
 
 def list_user_names() -> list[str]:
+    return get_storage().list_names()
+
+
+def prefetch_users(names: list[str]) -> None:
+    get_storage().prefetch(names)
+
+
+def load_plugin_state(name: str, training_id: TrainingId) -> bytes | None:
+    return get_storage().load_plugin_state(name, training_id)
+
+
+def save_plugin_state(name: str, training_id: TrainingId, data: bytes) -> None:
+    get_storage().save_plugin_state(name, training_id, data)
+
+
+def iter_highscore_batches(batch_size: int = 200) -> Iterator[list[tuple[str, int]]]:
+    """
+    Stream (name, total) pairs; the first batch holds the top scores when
+    the storage keeps a leaderboard.
+    """
+    return get_storage().highscore_batches(batch_size)
+
+
+def get_storage() -> ProfileStorage:
+    global _STORAGE
+    if _STORAGE is None:
+        _STORAGE = _storage_from_env()
+    return _STORAGE
+
+
+def set_storage(storage: ProfileStorage) -> None:
+    global _STORAGE
+    _STORAGE = storage
+
+
+def _storage_from_env() -> ProfileStorage:
+    """
+    MATH_TRAINER_STORAGE selects the backend: unset or "local" for the
+    users/ directory, "kv://host:port" for a remote key-value store.
+    """
+    spec = os.environ.get(_STORAGE_ENV, "local").strip()
+    if spec in ("", "local"):
+        return LocalFileStorage()
+    if spec.startswith("kv://"):
+        from .kv_storage import RemoteKVStorage
+
+        host, _, port = spec[len("kv://"):].rpartition(":")
+        return RemoteKVStorage(host=host or "127.0.0.1", port=int(port))
+    raise ValueError(f"Unknown {_STORAGE_ENV} value: {spec!r}")
+
+
+class LocalFileStorage(ProfileStorage):
+    """
+    Profiles as snapshot + event log files in the sharded users/ directory.
+    """
+
+    def load(self, name: str) -> StoredUserProfile | None:
+        return _load_local(name)
+
+    def save(self, profile: StoredUserProfile) -> None:
+        _save_local(profile)
+
+    def prefetch(self, names: list[str]) -> None:
+        pass  # Loading from disk is fast enough to do on demand.
+
+    def ready(self, name: str) -> bool:
+        return True
+
+    def list_names(self) -> list[str]:
+        return _list_names_local()
+
+    def highscore_batches(self, batch_size: int) -> Iterator[list[tuple[str, int]]]:
+        return _highscore_batches_local(batch_size)
+
+    def create_many(self, profiles: list[StoredUserProfile]) -> None:
+        _create_many_local(profiles)
+
+    def load_plugin_state(self, name: str, training_id: str) -> bytes | None:
+        try:
+            return _plugin_state_path(name, training_id).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def save_plugin_state(self, name: str, training_id: str, data: bytes) -> None:
+        path = _plugin_state_path(name, training_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, data)
+
+
+def _save_local(profile: StoredUserProfile) -> None:
+    """
+    Record the profile's progress, merging in progress saved by others.
+
+    Only rooms that moved forward compared to the stored state are written,
+    as events appended to the user's log, so a save costs O(changes). The
+    stored state is the latest snapshot plus the log tail; replaying events
+    only ever raises mastery or unlocks rooms, so concurrent writers merge
+    instead of overwriting each other. The merged result is applied to
+    profile in place.
+
+    The per-user lock has a short timeout. If it cannot be taken the save
+    goes ahead anyway; appends and the snapshot's atomic replace keep the
+    files readable, and the merge semantics make a replay order-independent.
+    Without the lock the save re-reads the log past its own append, so
+    events from the lock holder are not skipped, and leaves compaction and
+    the cache alone.
+
+    The leaderboard only hears about the save when the user's total
+    changed, and then as one appended line. The total is kept up to date
+    from the events' score gains, so a save costs O(changes) end to end.
+    """
+    with file_lock(_lock_path(profile.name)) as locked:
+        # Checked before a new user lands in the manifest, which would make
+        # the index look stale.
+        leaderboard_fresh = leaderboard_is_fresh(_USERS_DIR, _MANIFEST_PATH)
+        state = _load_state(profile.name)
+        created = state is None
+        if state is None:
+            state = _create_state(profile.name)
+
+        events = diff_events(state.profile.items, profile.items, changed_training_ids(profile))
+        current = state.profile
+        total_before = _stored_total(state)
+        before = _touched_grids(current.items, events)
+        apply_events(current.items, events)
+        state.total = total_before + _score_gain(before, current.items, events)
+        _commit_events(state, events, locked)
+        merge_profile_into(profile, current)
+        profile.revision = current.revision
+        if events or created:
+            _record_for_sync((profile.name, events))
+        total = _stored_total(state)
+        if created or total != total_before:
+            _update_leaderboard({current.name: total}, touch=created and leaderboard_fresh)
+
+
+def import_progress(name: str, events: list[ProgressEvent]) -> int:
+    """
+    Merge progress recorded on another machine into the user's stored
+    state, creating the user if needed.
+
+    Only events that move a room forward here are appended to the log.
+    Returns their number. Imported events are not put in the sync outbox,
+    so they are never sent back.
+    """
+    _load_local(name)  # Migrates a legacy JSON profile before we lock.
+    with file_lock(_lock_path(name)) as locked:
+        leaderboard_fresh = leaderboard_is_fresh(_USERS_DIR, _MANIFEST_PATH)
+        state = _load_state(name)
+        created = state is None
+        if state is None:
+            state = _create_state(name)
+        total_before = _stored_total(state)
+        before = _touched_grids(state.profile.items, events)
+        advancing = merge_events(state.profile.items, events)
+        state.total = total_before + _score_gain(before, state.profile.items, advancing)
+        _commit_events(state, advancing, locked)
+        if advancing or created:
+            _update_leaderboard({state.profile.name: _stored_total(state)}, touch=created and leaderboard_fresh)
+        return len(advancing)
+
+
+def _stored_total(state: _StoredState) -> int:
+    if state.total is None:
+        state.total = total_score(state.profile)
+    return state.total
+
+
+def _touched_grids(
+    items: MutableMapping[TrainingId, RoomGrid], events: list[ProgressEvent]
+) -> dict[TrainingId, RoomGrid]:
+    """
+    The grids events are about to change. Applying events replaces grids
+    rather than editing them, so these keep the old state.
+    """
+    return {training_id: items.get(training_id) or {} for training_id in {event.training_id for event in events}}
+
+
+def _score_gain(
+    before: dict[TrainingId, RoomGrid], after: MutableMapping[TrainingId, RoomGrid], events: list[ProgressEvent]
+) -> int:
+    gain = 0
+    for training_id, room in {(event.training_id, event.room) for event in events}:
+        gain += _room_score(after[training_id].get(room)) - _room_score(before[training_id].get(room))
+    return gain
+
+
+def _room_score(status: RoomProgress | None) -> int:
+    return status.score if isinstance(status, Unlocked) else 0
+
+
+def _update_leaderboard(totals: dict[str, int], touch: bool) -> None:
+    """
+    Append new totals to the leaderboard index. With touch, the index was
+    fresh before new users were added to the manifest and is marked fresh
+    again, since their totals are now in it.
+
+    If the leaderboard lock cannot be taken the index is dropped instead,
+    so the next reader rebuilds it rather than missing the update.
+    """
+    with file_lock(_LOCKS_DIR / _LEADERBOARD_LOCK) as locked:
+        if not locked:
+            discard_leaderboard(_USERS_DIR)
+            return
+        append_leaderboard_updates(_USERS_DIR, totals)
+        if touch:
+            touch_leaderboard(_USERS_DIR)
+
+
+def sync_dir() -> Path:
+    return _SYNC_DIR
+
+
+def enable_sync_outbox() -> bool:
+    """
+    Start recording local progress in the sync outbox.
+
+    The first call seeds the outbox with every user's current state, so
+    progress made before sync was set up is sent too. Returns whether this
+    call enabled it.
+    """
+    if _SYNC_OUTBOX.exists():
+        return False
+    _SYNC_DIR.mkdir(parents=True, exist_ok=True)
+    # Saves from here on are recorded by themselves; a save that lands in
+    # both the seed and the outbox is merged twice, which is harmless.
+    seed = bytearray()
+    for name in _list_names_local():
+        profile = _load_local(name)
+        if profile is not None:
+            seed += encode_user_events(profile.name, diff_events({}, profile.items))
+    append_lines(_SYNC_OUTBOX, bytes(seed))
+    return True
+
+
+def read_sync_outbox(offset: int = 0) -> tuple[list[tuple[str, ProgressEvent | None]], int]:
+    """
+    Local progress recorded since offset, as (name, event) pairs with None
+    for a user created without progress. Returns the pairs and the offset
+    just past them.
+    """
+    try:
+        with open(_SYNC_OUTBOX, "rb") as handle:
+            handle.seek(offset)
+            data = handle.read()
+    except FileNotFoundError:
+        return [], offset
+    pairs, consumed = decode_user_events(data)
+    return pairs, offset + consumed
+
+
+def _record_for_sync(*entries: tuple[str, list[ProgressEvent]]) -> None:
+    if not _SYNC_DIR.is_dir():
+        return
+    append_lines(_SYNC_OUTBOX, b"".join(encode_user_events(name, events) for name, events in entries))
+
+
+def _create_state(name: str) -> _StoredState:
+    _add_to_manifest(name)
+    return _write_snapshot(StoredUserProfile(name=name, items={}), log_offset=0, previous=None)
+
+
+def _commit_events(state: _StoredState, events: list[ProgressEvent], locked: bool = True) -> None:
+    """
+    Append events already applied to state.profile to the user's log, then
+    compact or refresh the cache entry.
+
+    Without the user's lock another writer may have appended since state
+    was read, so the log from state.log_end is replayed onto state.profile
+    instead of taking the end of our append as covered. Compaction and the
+    cache are skipped, since a snapshot or cache entry could then claim log
+    lines the profile has not seen.
+    """
+    current = state.profile
+    log_path = _log_path(current.name)
+    if not locked:
+        if events:
+            append_events(log_path, events)
+        replayed, _ = read_events(log_path, state.log_end)
+        apply_events(current.items, replayed)
+        current.revision += len(replayed)
+        state.total = None
+        _PROFILE_CACHE.invalidate(current.name)
+        return
+
+    log_end = state.log_end
+    if events:
+        log_end = append_events(log_path, events)
+        current.revision += len(events)
+
+    tail_events = state.tail_events + len(events)
+    if tail_events >= _COMPACT_AFTER_EVENTS or state.snapshot_path != _profile_path(current.name):
+        _write_snapshot(current, log_offset=log_end, previous=state.snapshot_path, total=state.total)
+    elif events:
+        _PROFILE_CACHE.put(
+            current.name,
+            _StoredState(
+                profile=current,
+                snapshot_path=state.snapshot_path,
+                log_end=log_end,
+                tail_events=tail_events,
+                signature=_state_signature(state.snapshot_path, log_path),
+                total=state.total,
+            ),
+        )
+
+
+def _load_local(name: str) -> StoredUserProfile | None:
+    state = _load_state(name)
+    if state is not None:
+        return state.profile
+    return _migrate_legacy_user(name)
+
+
+def compact_user(name: str) -> bool:
+    """
+    Fold the user's log tail into a fresh snapshot in the user's shard.
+
+    Returns False if the user does not exist, or if the user's lock could
+    not be taken; a snapshot written without it could skip another writer's
+    events.
+    """
+    with file_lock(_lock_path(name)) as locked:
+        if not locked:
+            return False
+        state = _load_state(name)
+        if state is None:
+            return False
+        _write_snapshot(state.profile, log_offset=state.log_end, previous=state.snapshot_path)
+        return True
+
+
+def read_progress_history(name: str) -> list[ProgressEvent]:
+    """
+    Every progress event ever recorded for the user, oldest first.
+    """
+    events, _ = read_events(_log_path(name))
+    return events
+
+
+def invalidate_profile_cache(name: str | None = None) -> None:
+    """
+    Drop one user (or everyone) from the in-process profile cache.
+    """
+    _PROFILE_CACHE.invalidate(name)
+
+
+def _list_names_local() -> list[str]:
+    try:
+        text = _MANIFEST_PATH.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return rebuild_name_manifest()
+    return sorted({line for line in text.splitlines() if line})
+
+
+def rebuild_name_manifest() -> list[str]:
+    """
+    Rewrite users/names.manifest from the profiles actually on disk.
+
+    This walks every shard, so it only runs when the manifest is missing or
+    on request (e.g. after a migration).
+    """
+    if not _USERS_DIR.exists():
+        return []
+    names = {path.stem for path in _USERS_DIR.glob(f"*/*{_PROFILE_SUFFIX}")}
+    names.update(path.stem for path in _USERS_DIR.glob(f"*{_PROFILE_SUFFIX}"))
+    names.update(path.stem for path in _USERS_DIR.glob(f"*{_LEGACY_SUFFIX}"))
+    ordered = sorted(names)
+    with file_lock(_LOCKS_DIR / _MANIFEST_LOCK) as locked:
+        # Replacing the manifest under a concurrent append would drop the
+        # appended name; the listing is still right for this caller.
+        if locked:
+            write_atomic(_MANIFEST_PATH, "".join(f"{name}\n" for name in ordered).encode("utf-8"))
+    return ordered
+
+
+def list_unsharded_user_names() -> list[str]:
+    """
+    Names of users whose profile is still stored directly in users/.
+    """
     if not _USERS_DIR.exists():
         return []
-    return sorted(path.stem for path in _USERS_DIR.glob("*.json"))
+    names = {path.stem for path in _USERS_DIR.glob(f"*{_PROFILE_SUFFIX}")}
+    names.update(path.stem for path in _USERS_DIR.glob(f"*{_LEGACY_SUFFIX}"))
+    return sorted(names)
+
+
+def export_user_json(profile: StoredUserProfile) -> str:
+    return json.dumps(_profile_to_dict(profile), indent=2, sort_keys=True)
+
+
+def import_user_json(text: str, fallback_name: str = "player") -> StoredUserProfile:
+    raw = json.loads(text)
+    if not isinstance(raw, dict):
+        raise ValueError("Profile JSON must be an object.")
+    return _profile_from_dict(raw, fallback_name=fallback_name)
+
+
+def merge_grids(ours: RoomGrid, theirs: RoomGrid) -> RoomGrid:
+    """
+    Room-level join of two grids: the higher mastery wins, and a room is
+    unlocked if either side unlocked it.
+    """
+    merged: RoomGrid = dict(ours)
+    for room, status in theirs.items():
+        merged[room] = join_status(merged.get(room), status)
+    return merged
+
+
+def merge_profile_into(profile: StoredUserProfile, other: StoredUserProfile) -> None:
+    for training_id, theirs in other.items.items():
+        ours = profile.items.get(training_id)
+        if ours is None:
+            profile.items[training_id] = theirs
+            continue
+        merged = merge_grids(ours, theirs)
+        if merged != ours:
+            profile.items[training_id] = merged
+    profile.revision = max(profile.revision, other.revision)
+
+
+@dataclass
+class _StoredState:
+    profile: StoredUserProfile
+    snapshot_path: Path
+    # Offset just past the last complete log line applied to profile.
+    log_end: int
+    # Events applied on top of the snapshot.
+    tail_events: int
+    signature: tuple[Path, int, int, int] | None
+    # total_score(profile), once someone needed it.
+    total: int | None = None
+
+
+def _state_signature(snapshot_path: Path, log_path: Path) -> tuple[Path, int, int, int] | None:
+    try:
+        stat = snapshot_path.stat()
+    except FileNotFoundError:
+        return None
+    try:
+        log_size = log_path.stat().st_size
+    except FileNotFoundError:
+        log_size = -1
+    return snapshot_path, stat.st_mtime_ns, stat.st_size, log_size
+
+
+def _load_state(name: str) -> _StoredState | None:
+    """
+    Latest snapshot plus replayed log tail, from the cache when unchanged.
+    """
+    log_path = _log_path(name)
+    # Sharded first; a flat file means the migration has not reached this
+    # user yet. Retry the sharded path in case it moved between the two.
+    for snapshot_path in (_profile_path(name), _flat_profile_path(name), _profile_path(name)):
+        signature = _state_signature(snapshot_path, log_path)
+        if signature is None:
+            continue
+        cached = _PROFILE_CACHE.get(name, signature)
+        if cached is not None:
+            return cached
+        try:
+            data = snapshot_path.read_bytes()
+        except FileNotFoundError:
+            continue
+        profile, log_offset = decode_snapshot(data, fallback_name=name)
+        events, log_end = read_events(log_path, log_offset)
+        apply_events(profile.items, events)
+        profile.revision += len(events)
+        state = _StoredState(
+            profile=profile,
+            snapshot_path=snapshot_path,
+            log_end=log_end,
+            tail_events=len(events),
+            signature=signature,
+        )
+        _PROFILE_CACHE.put(name, state)
+        return state
+    return None
+
+
+def _write_snapshot(
+    profile: StoredUserProfile, log_offset: int, previous: Path | None, total: int | None = None
+) -> _StoredState:
+    """
+    Write profile as the user's snapshot, covering the log up to log_offset.
+    """
+    path = _profile_path(profile.name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    log_path = _log_path(profile.name)
+    sync_log(log_path)
+    write_atomic(path, encode_profile(profile, log_offset=log_offset))
+    if previous is not None and previous != path:
+        previous.unlink(missing_ok=True)
+    state = _StoredState(
+        profile=profile,
+        snapshot_path=path,
+        log_end=log_offset,
+        tail_events=0,
+        signature=_state_signature(path, log_path),
+        total=total,
+    )
+    _PROFILE_CACHE.put(profile.name, state)
+    return state
+
+
+def changed_training_ids(profile: StoredUserProfile) -> list[TrainingId]:
+    # Grids still in their packed form have not been touched since loading.
+    if isinstance(profile.items, _LazyTrainingGrids):
+        return [tid for tid in profile.items if profile.items.packed(tid) is None]
+    return list(profile.items)
+
+
+class _ProfileCache:
+    """
+    Bounded LRU of stored profile states, keyed by sanitized name.
+
+    An entry is only served while the snapshot still has the same path,
+    mtime and size and the log the same size. Callers get their own copy of
+    the profile, so mutating it never leaks into the cache.
+    """
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, _StoredState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str, signature: tuple[Path, int, int, int]) -> _StoredState | None:
+        key = _sanitize_name(name)
+        with self._lock:
+            state = self._entries.get(key)
+            if state is None:
+                return None
+            if state.signature != signature:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return _StoredState(
+                profile=copy_profile(state.profile),
+                snapshot_path=state.snapshot_path,
+                log_end=state.log_end,
+                tail_events=state.tail_events,
+                signature=state.signature,
+                total=state.total,
+            )
+
+    def put(self, name: str, state: _StoredState) -> None:
+        key = _sanitize_name(name)
+        with self._lock:
+            if state.signature is None:
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = _StoredState(
+                profile=copy_profile(state.profile),
+                snapshot_path=state.snapshot_path,
+                log_end=state.log_end,
+                tail_events=state.tail_events,
+                signature=state.signature,
+                total=state.total,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, name: str | None = None) -> None:
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(_sanitize_name(name), None)
+
+
+def copy_profile(profile: StoredUserProfile) -> StoredUserProfile:
+    # Grids are replaced wholesale, never edited in place, so copying the
+    # training mapping is enough.
+    if isinstance(profile.items, _LazyTrainingGrids):
+        items: MutableMapping[TrainingId, RoomGrid] = profile.items.copy()
+    else:
+        items = dict(profile.items)
+    return StoredUserProfile(name=profile.name, items=items, revision=profile.revision)
+
+
+_PROFILE_CACHE = _ProfileCache(_PROFILE_CACHE_SIZE)
+
+
+def _shard_dir(name: str) -> Path:
+    digest = hashlib.sha1(_sanitize_name(name).encode("utf-8")).hexdigest()
+    return _USERS_DIR / digest[:_SHARD_PREFIX_LEN]
+
+
+def _profile_path(name: str) -> Path:
+    return _shard_dir(name) / f"{_sanitize_name(name)}{_PROFILE_SUFFIX}"
+
+
+def _flat_profile_path(name: str) -> Path:
+    return _USERS_DIR / f"{_sanitize_name(name)}{_PROFILE_SUFFIX}"
+
+
+def _log_path(name: str) -> Path:
+    return _shard_dir(name) / f"{_sanitize_name(name)}{_LOG_SUFFIX}"
+
+
+def _existing_profile_path(name: str) -> Path | None:
+    for path in (_profile_path(name), _flat_profile_path(name)):
+        if path.exists():
+            return path
+    return None
+
+
+def _plugin_state_path(name: str, training_id: str) -> Path:
+    return _shard_dir(name) / f"{_sanitize_name(name)}.{_sanitize_name(training_id)}{_PLUGIN_STATE_SUFFIX}"
+
+
+def _lock_path(name: str) -> Path:
+    return _shard_dir(name) / f"{_sanitize_name(name)}{_LOCK_SUFFIX}"
+
+
+def _add_to_manifest(*names: str) -> None:
+    if not _MANIFEST_PATH.exists():
+        listed = set(rebuild_name_manifest())
+        # Profiles on disk but still no manifest: the rebuild could not lock.
+        # The next listing rebuilds it; appending would start a partial one.
+        if listed and not _MANIFEST_PATH.exists():
+            return
+        names = tuple(name for name in names if _sanitize_name(name) not in listed)
+        if not names:
+            return
+    with file_lock(_LOCKS_DIR / _MANIFEST_LOCK):
+        with open(_MANIFEST_PATH, "a", encoding="utf-8") as handle:
+            handle.write("".join(f"{_sanitize_name(name)}\n" for name in names))
+
+
+def _migrate_legacy_user(name: str) -> StoredUserProfile | None:
+    """
+    Read a profile still stored as JSON and rewrite it in the binary format.
+    """
+    legacy_path = _USERS_DIR / f"{_sanitize_name(name)}{_LEGACY_SUFFIX}"
+    if not legacy_path.exists():
+        return None
+    profile = import_user_json(legacy_path.read_text(encoding="utf-8"), fallback_name=name)
+    path = _profile_path(name)
+    with file_lock(_lock_path(name)) as locked:
+        # Without the lock the conversion is left for a later load.
+        if locked:
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(path, encode_profile(profile))
+            legacy_path.unlink(missing_ok=True)
+    return profile
 
 
 def load_all_users() -> list[StoredUserProfile]:
@@ -45,6 +755,77 @@ def load_all_users() -> list[StoredUserProfile]:
     return profiles
 
 
+def load_highscores() -> dict[str, int]:
+    """
+    Total score per user. With local storage this reads only the leaderboard
+    index, unless the index is missing or stale.
+    """
+    highscores: dict[str, int] = {}
+    for batch in iter_highscore_batches():
+        highscores.update(batch)
+    return highscores
+
+
+def _highscore_batches_local(batch_size: int) -> Iterator[list[tuple[str, int]]]:
+    """
+    Stream (name, total) pairs, best scores first when the index is fresh.
+
+    The first batch is the index's top-K so a GUI can show the leaders
+    before the remaining users arrive. Without a usable index, profiles are
+    parsed one by one and yielded as they are read; the rebuilt index is
+    written at the end, together with the totals that saves appended to the
+    update log during the scan.
+    """
+    index = load_leaderboard(_USERS_DIR, _MANIFEST_PATH)
+    if index is not None:
+        yield list(index.top)
+        top_names = {name for name, _ in index.top}
+        rest = [(name, total) for name, total in index.totals.items() if name not in top_names]
+        for start in range(0, len(rest), batch_size):
+            yield rest[start:start + batch_size]
+        if index.pending_updates >= COMPACT_AFTER_UPDATES:
+            _compact_leaderboard()
+        return
+
+    totals: dict[str, int] = {}
+    batch: list[tuple[str, int]] = []
+    for name in _list_names_local():
+        profile = _load_local(name)
+        if profile is None:
+            continue
+        total = total_score(profile)
+        totals[profile.name] = total
+        batch.append((profile.name, total))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+    if not _USERS_DIR.exists():
+        return
+    with file_lock(_LOCKS_DIR / _LEADERBOARD_LOCK) as locked:
+        # Without the lock a save could append an update that the write
+        # then clears; leave the rebuild to the next reader.
+        if locked:
+            changed = merge_leaderboard_updates(totals, read_leaderboard_updates(_USERS_DIR))
+            write_leaderboard(_USERS_DIR, totals)
+    if locked and changed:
+        yield list(changed.items())
+
+
+def _compact_leaderboard() -> None:
+    """
+    Fold the leaderboard's update log into its snapshot. Runs on the
+    highscore loader thread, which has just read the whole index anyway.
+    """
+    with file_lock(_LOCKS_DIR / _LEADERBOARD_LOCK) as locked:
+        if not locked:
+            return
+        index = load_leaderboard(_USERS_DIR, _MANIFEST_PATH)
+        if index is not None:
+            write_leaderboard(_USERS_DIR, index.totals)
+
+
 def _profile_to_dict(profile: StoredUserProfile) -> dict[str, Any]:
     items: dict[str, list[dict[str, Any]]] = {}
     for training_id, grid in profile.items.items():
@@ -105,6 +886,228 @@ def _entry_from_dict(entry: dict[str, Any]) -> tuple[Room | None, RoomProgress |
     return None, None
 
 
+# ---------------------------------------------------------------------------
+# Binary profile format
+# ---------------------------------------------------------------------------
+#
+# Version 3 layout (all integers little-endian):
+#
+#   header     "MTUP" | u8 version | u32 revision | u64 log offset |
+#              u16 name length | name (utf-8)
+#   directory  u16 training count, then per training:
+#              u16 id length | id (utf-8) | u32 room count | u32 offset | u32 size
+#   grids      per training, at directory offset (relative to the grid area):
+#              u16[n] difficulty | u16[n] time_pressure | u8[n] mastery |
+#              unlocked bitmap, ceil(n / 8) bytes, bit i = room i unlocked
+#
+# Scores are not stored: the grid always derives them as
+# difficulty * time_pressure * mastery.
+#
+# The log offset is how far into the user's progress log the snapshot
+# reaches; loading replays only the events after it. Version 2 headers have
+# no log offset (read as 0), version 1 headers also no revision (read as 0).
+
+_MAGIC = b"MTUP"
+_FORMAT_VERSION = 3
+_PREFIX = struct.Struct("<4sB")
+_HEADER_V1 = struct.Struct("<H")
+_HEADER_V2 = struct.Struct("<IH")
+_HEADER_V3 = struct.Struct("<IQH")
+_TRAINING_COUNT = struct.Struct("<H")
+_DIRECTORY_ENTRY = struct.Struct("<H")
+_DIRECTORY_SPAN = struct.Struct("<III")
+
+
+class _LazyTrainingGrids(MutableMapping[TrainingId, RoomGrid]):
+    """
+    Training grids that are decoded from their packed form on first access.
+
+    Grids that are never touched are written back as their original bytes.
+    """
+
+    def __init__(self, packed: dict[TrainingId, tuple[int, memoryview]]):
+        self._packed = packed
+        self._decoded: dict[TrainingId, RoomGrid] = {}
+
+    def __getitem__(self, training_id: TrainingId) -> RoomGrid:
+        grid = self._decoded.get(training_id)
+        if grid is not None:
+            return grid
+        if training_id not in self._packed:
+            raise KeyError(training_id)
+        room_count, data = self._packed[training_id]
+        grid = _decode_grid(room_count, data)
+        self._decoded[training_id] = grid
+        return grid
+
+    def __setitem__(self, training_id: TrainingId, grid: RoomGrid) -> None:
+        self._packed.pop(training_id, None)
+        self._decoded[training_id] = grid
+
+    def __delitem__(self, training_id: TrainingId) -> None:
+        found = self._packed.pop(training_id, None) is not None
+        found = self._decoded.pop(training_id, None) is not None or found
+        if not found:
+            raise KeyError(training_id)
+
+    def __iter__(self) -> Iterator[TrainingId]:
+        yield from self._decoded
+        for training_id in self._packed:
+            if training_id not in self._decoded:
+                yield training_id
+
+    def __len__(self) -> int:
+        return len(self._decoded) + sum(1 for tid in self._packed if tid not in self._decoded)
+
+    def copy(self) -> _LazyTrainingGrids:
+        clone = _LazyTrainingGrids(dict(self._packed))
+        clone._decoded = dict(self._decoded)
+        return clone
+
+    def packed(self, training_id: TrainingId) -> tuple[int, bytes] | None:
+        if training_id in self._decoded or training_id not in self._packed:
+            return None
+        room_count, data = self._packed[training_id]
+        return room_count, bytes(data)
+
+
+def encode_profile(profile: StoredUserProfile, log_offset: int = 0) -> bytes:
+    name = profile.name.encode("utf-8")
+    directory: list[bytes] = []
+    blobs: list[bytes] = []
+    offset = 0
+    for training_id in profile.items:
+        packed = None
+        if isinstance(profile.items, _LazyTrainingGrids):
+            packed = profile.items.packed(training_id)
+        if packed is None:
+            packed = _encode_grid(profile.items[training_id])
+        room_count, blob = packed
+        encoded_id = training_id.encode("utf-8")
+        directory.append(
+            _DIRECTORY_ENTRY.pack(len(encoded_id))
+            + encoded_id
+            + _DIRECTORY_SPAN.pack(room_count, offset, len(blob))
+        )
+        blobs.append(blob)
+        offset += len(blob)
+
+    return b"".join(
+        [
+            _PREFIX.pack(_MAGIC, _FORMAT_VERSION),
+            _HEADER_V3.pack(profile.revision, log_offset, len(name)),
+            name,
+            _TRAINING_COUNT.pack(len(directory)),
+            *directory,
+            *blobs,
+        ]
+    )
+
+
+def decode_profile(data: bytes, fallback_name: str) -> StoredUserProfile:
+    profile, _ = decode_snapshot(data, fallback_name)
+    return profile
+
+
+def decode_snapshot(data: bytes, fallback_name: str) -> tuple[StoredUserProfile, int]:
+    """
+    Return the profile and the log offset the snapshot reaches.
+    """
+    view = memoryview(data)
+    revision, log_offset, name_len, pos = _unpack_header(view)
+    name = bytes(view[pos:pos + name_len]).decode("utf-8") or fallback_name
+    pos += name_len
+
+    (training_count,) = _TRAINING_COUNT.unpack_from(view, pos)
+    pos += _TRAINING_COUNT.size
+    spans: list[tuple[TrainingId, int, int, int]] = []
+    for _ in range(training_count):
+        (id_len,) = _DIRECTORY_ENTRY.unpack_from(view, pos)
+        pos += _DIRECTORY_ENTRY.size
+        training_id = bytes(view[pos:pos + id_len]).decode("utf-8")
+        pos += id_len
+        room_count, offset, size = _DIRECTORY_SPAN.unpack_from(view, pos)
+        pos += _DIRECTORY_SPAN.size
+        spans.append((training_id, room_count, offset, size))
+
+    packed: dict[TrainingId, tuple[int, memoryview]] = {}
+    for training_id, room_count, offset, size in spans:
+        start = pos + offset
+        packed[training_id] = (room_count, view[start:start + size])
+    profile = StoredUserProfile(name=name, items=_LazyTrainingGrids(packed), revision=revision)
+    return profile, log_offset
+
+
+def _unpack_header(view: memoryview) -> tuple[int, int, int, int]:
+    """
+    Return (revision, log offset, name length, offset of the name).
+    """
+    magic, version = _PREFIX.unpack_from(view, 0)
+    if magic != _MAGIC:
+        raise ValueError("Not a binary user profile.")
+    if version == 1:
+        (name_len,) = _HEADER_V1.unpack_from(view, _PREFIX.size)
+        return 0, 0, name_len, _PREFIX.size + _HEADER_V1.size
+    if version == 2:
+        revision, name_len = _HEADER_V2.unpack_from(view, _PREFIX.size)
+        return revision, 0, name_len, _PREFIX.size + _HEADER_V2.size
+    if version == 3:
+        revision, log_offset, name_len = _HEADER_V3.unpack_from(view, _PREFIX.size)
+        return revision, log_offset, name_len, _PREFIX.size + _HEADER_V3.size
+    raise ValueError(f"Unsupported profile format version: {version}")
+
+
+def _encode_grid(grid: RoomGrid) -> tuple[int, bytes]:
+    difficulties = array("H")
+    time_pressures = array("H")
+    mastery_levels = array("B")
+    unlocked_bits = bytearray((len(grid) + 7) // 8)
+    for index, (room, status) in enumerate(grid.items()):
+        difficulties.append(room.difficulty)
+        time_pressures.append(room.time_pressure)
+        if isinstance(status, Unlocked):
+            mastery_levels.append(status.mastery_level)
+            unlocked_bits[index >> 3] |= 1 << (index & 7)
+        else:
+            mastery_levels.append(0)
+    if sys.byteorder == "big":
+        difficulties.byteswap()
+        time_pressures.byteswap()
+    blob = b"".join(
+        [difficulties.tobytes(), time_pressures.tobytes(), mastery_levels.tobytes(), bytes(unlocked_bits)]
+    )
+    return len(grid), blob
+
+
+def _decode_grid(room_count: int, data: memoryview) -> RoomGrid:
+    difficulties = array("H")
+    time_pressures = array("H")
+    mastery_levels = array("B")
+    end_difficulty = room_count * 2
+    end_time_pressure = end_difficulty + room_count * 2
+    end_mastery = end_time_pressure + room_count
+    difficulties.frombytes(data[:end_difficulty])
+    time_pressures.frombytes(data[end_difficulty:end_time_pressure])
+    mastery_levels.frombytes(data[end_time_pressure:end_mastery])
+    unlocked_bits = data[end_mastery:]
+    if sys.byteorder == "big":
+        difficulties.byteswap()
+        time_pressures.byteswap()
+
+    grid: RoomGrid = {}
+    for index in range(room_count):
+        room = Room(difficulty=difficulties[index], time_pressure=time_pressures[index])
+        if unlocked_bits[index >> 3] & (1 << (index & 7)):
+            mastery = mastery_levels[index]
+            grid[room] = Unlocked(
+                mastery_level=mastery,
+                score=room.difficulty * room.time_pressure * mastery,
+            )
+        else:
+            grid[room] = Locked()
+    return grid
+
+
 def _safe_int(value: Any, default: int = 0) -> int:
     try:
         return int(value)
@@ -125,23 +1128,103 @@ def login(name: str) -> AuthResult:
     validated_name, error = _validate_name(name)
     if error is not None:
         return error
+    if not get_storage().ready(validated_name):
+        return AuthPending()
     stored = load_user(validated_name)
     if stored is None:
         return AuthError(message=f"User '{validated_name}' not found.")
     return UserProfile(name=stored.name)
 
 
+def name_index() -> NameIndex:
+    """
+    Prefix index over all user names, built from list_user_names() on first
+    use and kept up to date by create_user/create_users in this process.
+    """
+    global _NAME_INDEX
+    if _NAME_INDEX is None:
+        # Build outside the lock so a create on the GUI thread never waits
+        # for the listing; names created meanwhile are added afterwards.
+        index = NameIndex(list_user_names())
+        with _NAME_INDEX_LOCK:
+            if _NAME_INDEX is None:
+                for name in _NAMES_CREATED:
+                    index.add(name)
+                _NAME_INDEX = index
+    return _NAME_INDEX
+
+
+def _index_new_names(names: Iterable[str]) -> None:
+    with _NAME_INDEX_LOCK:
+        if _NAME_INDEX is None:
+            _NAMES_CREATED.extend(names)
+            return
+        for name in names:
+            _NAME_INDEX.add(name)
+
+
 def create_user(name: str) -> AuthResult:
     validated_name, error = _validate_name(name)
     if error is not None:
         return error
+    if not get_storage().ready(validated_name):
+        return AuthPending()
     if load_user(validated_name) is not None:
         return AuthError(message="User already exists.")
     stored = StoredUserProfile(name=validated_name, items={})
     save_user(stored)
+    _index_new_names([validated_name])
     return UserProfile(name=validated_name)
 
 
+def create_users(names: Iterable[str]) -> list[AuthResult]:
+    """
+    Create many users in one pass, e.g. from a class roster.
+
+    Returns one result per input name, in order. New profiles are handed
+    to the storage in a single batch instead of being saved one by one.
+    """
+    results: list[AuthResult] = []
+    created: list[StoredUserProfile] = []
+    known = set(list_user_names())
+    for name in names:
+        validated_name, error = _validate_name(name)
+        if error is not None:
+            results.append(error)
+            continue
+        key = _sanitize_name(validated_name)
+        if key in known:
+            results.append(AuthError(message=f"User '{validated_name}' already exists."))
+            continue
+        known.add(key)
+        created.append(StoredUserProfile(name=validated_name, items={}))
+        results.append(UserProfile(name=validated_name))
+
+    if created:
+        get_storage().create_many(created)
+        _index_new_names(profile.name for profile in created)
+    return results
+
+
+def _create_many_local(profiles: list[StoredUserProfile]) -> None:
+    """
+    Write the profiles directly, then update the name manifest and the
+    leaderboard once for the whole batch.
+    """
+    leaderboard_fresh = leaderboard_is_fresh(_USERS_DIR, _MANIFEST_PATH)
+    # Never overwrite a profile created by another process meanwhile.
+    profiles = [profile for profile in profiles if _existing_profile_path(profile.name) is None]
+    for profile in profiles:
+        path = _profile_path(profile.name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, encode_profile(profile))
+    _add_to_manifest(*(profile.name for profile in profiles))
+    _record_for_sync(*((profile.name, []) for profile in profiles))
+    _update_leaderboard(
+        {profile.name: total_score(profile) for profile in profiles}, touch=leaderboard_fresh
+    )
+
+
 def total_score(profile: StoredUserProfile) -> int:
     total = 0
     for grid in profile.items.values():
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-import random
+from functools import partial
+from typing import Callable, Sequence
 
+from math_trainer_core.core.fact_stats import FactStats, FactStatsStates
+from ..partial_answer import IntAnswerPrefix, PartialAnswerChecker
+from ..question_batch import QuestionBatch
 from ..plugin_api import (
     AnswerResult,
     Difficulty,
@@ -20,6 +24,8 @@ from ..plugin_api import (
 class PlusQuestion:
     a: int
     b: int
+    # Called with whether the question was answered correctly.
+    on_answered: Callable[[bool], None] | None = None
     _FIGURE_SPACE = "\u2007"
 
     def _format_number(self, value: int) -> str:
@@ -59,6 +65,7 @@ class PlusQuestion:
                 display_answer_text=self._format_stacked(answer=correct),
             )
 
+        self._report(value == correct)
         if value == correct:
             return QuestionResult(
                 result=AnswerResult.CORRECT,
@@ -70,38 +77,78 @@ class PlusQuestion:
             display_answer_text=self._format_stacked(answer=correct),
         )
 
+    def check_partial_answer(self, partial: str) -> bool:
+        return self.partial_answer_checker()(partial)
+
+    def partial_answer_checker(self) -> PartialAnswerChecker:
+        return IntAnswerPrefix(self.a + self.b, ignore_inner_whitespace=True)
+
     def reveal_answer(self) -> QuestionResult:
         """
         Used when time expires (or question is ended without an answer).
         Plugin does not know about timers, just shows the correct result.
         """
+        self._report(False)
         correct = self.a + self.b
         return QuestionResult(
             result=AnswerResult.WRONG,
             display_answer_text=self._format_stacked(answer=correct),
         )
 
+    def _report(self, correct: bool) -> None:
+        if self.on_answered is not None:
+            self.on_answered(correct)
+
 
 # Plugin implementation --------------------------------------------------------
 
 
+def _max_sum(difficulty_or_chapter: int) -> int:
+    # Interpret difficulty_or_chapter as a difficulty level.
+    # Level 0: sums up to 10
+    # Level 1: sums up to 15
+    # Level 2: sums up to 20
+    # etc.
+    level = max(0, int(difficulty_or_chapter))
+    base_max_sum = 10
+    increment = 5
+    return base_max_sum + level * increment
+
+
 class PlusPlugin(Plugin):
-    def make_question(self, difficulty_or_chapter: int) -> Question:
-        # Interpret difficulty_or_chapter as a difficulty level.
-        # Level 0: sums up to 10
-        # Level 1: sums up to 15
-        # Level 2: sums up to 20
-        # etc.
-        level = max(0, int(difficulty_or_chapter))
-        base_max_sum = 10
-        increment = 5
-        max_sum = base_max_sum + level * increment
+    """
+    Draws the sums of each level weighted by the user's errors and answer
+    times on them (see fact_stats), so troublesome sums come up more.
+    """
+
+    def __init__(self) -> None:
+        self._facts = FactStatsStates()
+
+    def load_state(self, data: bytes | None) -> None:
+        self._facts.load(data)
 
-        # Keep operands in range [0, max_sum], ensuring a + b <= max_sum
-        a = random.randint(2, max_sum -2)
-        b = random.randint(2, max_sum - a)
+    def dump_state(self) -> bytes:
+        return self._facts.dump()
 
-        return PlusQuestion(a=a, b=b)
+    def make_question(self, difficulty_or_chapter: int) -> Question:
+        table = self._table(difficulty_or_chapter)
+        return self._question(table, *table.draw())
+
+    def make_questions(self, difficulty_or_chapter: int, count: int) -> Sequence[Question]:
+        table = self._table(difficulty_or_chapter)
+        a, b = table.draw_many(count)
+        return QuestionBatch(partial(self._question, table), a, b)
+
+    def _question(self, table: FactStats, a: int, b: int) -> PlusQuestion:
+        a, b = int(a), int(b)
+        return PlusQuestion(a=a, b=b, on_answered=self._facts.reporter(table, a, b))
+
+    def _table(self, difficulty_or_chapter: int) -> FactStats:
+        # Operands in [2, max_sum - 2], ensuring a + b <= max_sum
+        max_sum = _max_sum(difficulty_or_chapter)
+        operands = range(2, max_sum - 1)
+        level = max(0, int(difficulty_or_chapter))
+        return self._facts.table(str(level), operands, operands, lambda a, b: a + b <= max_sum)
 
 
 class PlusPluginFactory:
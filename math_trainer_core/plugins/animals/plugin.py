@@ -3,7 +3,6 @@ from __future__ import annotations
 from pathlib import Path
 
 from ..plugin_api import (
-    Chapter,
     EmojiIcon,
     Plugin,
     PluginFactory,
@@ -11,43 +10,45 @@ from ..plugin_api import (
 )
 from ..picture_text_shared import (
     PictureTextChapter,
-    PictureTextChapterCycle,
+    PictureTextSchedule,
     PictureTextQuestion,
     load_picture_text_chapters,
-    load_picture_text_entries,
+    picture_text_mode,
+    reload_picture_text_chapters,
 )
 
 
-_CHAPTER_FILES: list[tuple[str, str]] = [
-    ("Fisk", "fish.json"),
-]
-
-
 def _plugin_dir() -> Path:
     return Path(__file__).resolve().parent
 
 
-def _load_chapter_file(filename: str):
-    return load_picture_text_entries(_plugin_dir() / filename)
-
-
 def _load_chapters() -> list[PictureTextChapter]:
-    return load_picture_text_chapters(_plugin_dir(), _CHAPTER_FILES)
+    # Every *.json file in the plugin directory is a chapter.
+    return load_picture_text_chapters(_plugin_dir())
 
 
 class AnimalsPlugin(Plugin):
     def __init__(self, chapters: list[PictureTextChapter]):
-        self._cycle = PictureTextChapterCycle(chapters)
+        self._schedule = PictureTextSchedule(chapters)
+
+    def reload_data(self, changed_files: list[Path]) -> bool:
+        return reload_picture_text_chapters(self._schedule, changed_files)
+
+    def load_state(self, data: bytes | None) -> None:
+        self._schedule.load_state(data)
 
-    def reset(self) -> None:
-        self._cycle.reset_last_chapter()
+    def dump_state(self) -> bytes:
+        return self._schedule.dump_state()
 
     def make_question(self, difficulty_or_chapter: int):
-        chapter, animal = self._cycle.next_for_chapter(difficulty_or_chapter)
+        chapter, animal, on_answered = self._schedule.next_for_chapter(difficulty_or_chapter)
         return PictureTextQuestion(
             prompt=f"Vilket djur ar det pa bilden?\nKapitel: {chapter.name}",
             answer=animal.answer,
             picture_urls=list(animal.picture_urls),
+            normalized_answer=animal.normalized_answer,
+            chapter_path=chapter.path,
+            on_answered=on_answered,
         )
 
 
@@ -58,10 +59,7 @@ class AnimalsPluginFactory:
             id="animals",
             name="Animals",
             description="Gissa djuret pa bilden. Kapitel styr vilken JSON-fil som anvands.",
-            mode=[
-                Chapter(name=name, required_streak=len(_load_chapter_file(filename)))
-                for name, filename in _CHAPTER_FILES
-            ],
+            mode=picture_text_mode(_plugin_dir()),
             icon=EmojiIcon("🐟"),
             required_streak=None,
         )
@@ -5,6 +5,7 @@ import random
 
 from math_trainer_core.api_types import PictureWithText
 from math_trainer_core.core.picture_helper import PictureRef, download_picture
+from ..partial_answer import LetterSequencePrefix, PartialAnswerChecker
 from ..plugin_api import (
     AnswerResult,
     Difficulty,
@@ -62,6 +63,13 @@ class KeyboardTrainingQuestion:
             display_answer_text=_make_prompt(self.letters),
         )
 
+    def check_partial_answer(self, partial: str) -> bool:
+        return self.partial_answer_checker()(partial)
+
+    def partial_answer_checker(self) -> PartialAnswerChecker:
+        # Letter by letter: each typed letter must be the one at its position.
+        return LetterSequencePrefix(self.letters)
+
     def reveal_answer(self) -> QuestionResult:
         return QuestionResult(
             result=AnswerResult.WRONG,
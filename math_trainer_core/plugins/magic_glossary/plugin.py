@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-import json
+from functools import partial
 from pathlib import Path
-import random
-
+from typing import Callable, Sequence
+
+from math_trainer_core.core.chapter_file import ChapterRecord, MappedRecords, normalize_answer
+from math_trainer_core.core.chapter_registry import ChapterRecords, changed_chapter_indices, discover_chapters
+from math_trainer_core.core.fuzzy_match import MatchKind, match_answer
+from math_trainer_core.core.review_scheduler import ReviewStates
+from ..partial_answer import PartialAnswerChecker, TextAnswerPrefix
+from ..picture_text_shared import NEAR_MISS_TEXT
 from ..plugin_api import (
     AnswerButton,
     AnswerResult,
@@ -19,66 +25,45 @@ from ..plugin_api import (
 )
 
 
-_CHAPTER_FILES: list[tuple[str, str]] = [
-    ("Grundord", "glossary_basics.json"),
-]
-
-
 @dataclass(frozen=True)
 class _GlossaryEntry:
     english: str
     swedish: str
+    normalized_english: str
 
 
 @dataclass(frozen=True)
 class _ChapterData:
     name: str
-    entries: list[_GlossaryEntry]
+    entries: Sequence[_GlossaryEntry]
+    path: Path
 
 
 def _plugin_dir() -> Path:
     return Path(__file__).resolve().parent
 
 
-def _normalize_answer(value: str) -> str:
-    return " ".join(value.strip().casefold().split())
-
-
-def _load_chapter_file(filename: str) -> list[_GlossaryEntry]:
-    path = _plugin_dir() / filename
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    if not isinstance(raw, dict):
-        raise ValueError(f"Invalid glossary chapter file format: {path}")
-
-    entries: list[_GlossaryEntry] = []
-    for english, swedish in raw.items():
-        if not isinstance(english, str) or not english.strip():
-            continue
-        if not isinstance(swedish, str) or not swedish.strip():
-            continue
-        entries.append(
-            _GlossaryEntry(
-                english=english.strip(),
-                swedish=swedish.strip(),
-            )
-        )
-
-    if not entries:
-        raise ValueError(f"Glossary chapter has no usable entries: {path}")
-    return entries
+def _entry_from_record(record: ChapterRecord) -> _GlossaryEntry:
+    return _GlossaryEntry(
+        english=record.answer,
+        swedish=record.values[0],
+        normalized_english=record.normalized_answer,
+    )
 
 
 def _load_chapters() -> list[_ChapterData]:
-    chapters: list[_ChapterData] = []
-    for chapter_name, filename in _CHAPTER_FILES:
-        chapters.append(
-            _ChapterData(
-                name=chapter_name,
-                entries=_load_chapter_file(filename),
-            )
+    # Every *.json file (english -> swedish) in the plugin directory is a
+    # chapter; its entries are loaded when the chapter is first used.
+    chapters = [
+        _ChapterData(
+            name=chapter.name,
+            entries=MappedRecords(ChapterRecords(chapter.path), _entry_from_record),
+            path=chapter.path,
         )
+        for chapter in discover_chapters(_plugin_dir())
+    ]
     if not chapters:
-        raise ValueError("Magic glossary plugin has no chapter files configured.")
+        raise ValueError("Magic glossary plugin has no chapter files.")
     return chapters
 
 
@@ -87,6 +72,9 @@ class MagicGlossaryQuestion:
     chapter_name: str
     english: str
     swedish: str
+    normalized_english: str
+    chapter_path: Path | None = None
+    on_answered: Callable[[bool], None] | None = None
 
     def read_question(self) -> QuestionContent:
         return QuestionContent(
@@ -98,70 +86,96 @@ class MagicGlossaryQuestion:
         )
 
     def answer_question(self, answer: str) -> QuestionResult:
-        normalized = _normalize_answer(answer)
+        normalized = normalize_answer(answer)
         if not normalized:
             return QuestionResult(
                 result=AnswerResult.INVALID_INPUT,
                 display_answer_text=f"Ratt svar: {self.english}",
             )
 
-        if normalized == _normalize_answer(self.english):
+        match = match_answer(self.chapter_path, normalized, self.normalized_english)
+        if match.kind != MatchKind.NEAR_MISS:
+            self._report(match.kind == MatchKind.EXACT)
+        if match.kind == MatchKind.EXACT:
             return QuestionResult(
                 result=AnswerResult.CORRECT,
                 display_answer_text=f"Ratt svar: {self.english}",
             )
+        if match.kind == MatchKind.NEAR_MISS:
+            return QuestionResult(
+                result=AnswerResult.NEAR_MISS,
+                display_answer_text=NEAR_MISS_TEXT,
+            )
+        if match.kind == MatchKind.OTHER_ENTRY:
+            return QuestionResult(
+                result=AnswerResult.WRONG,
+                display_answer_text=f"{match.other_answer} ar ett annat ord. Ratt svar: {self.english}",
+            )
 
         return QuestionResult(
             result=AnswerResult.WRONG,
             display_answer_text=f"Ratt svar: {self.english}",
         )
 
+    def check_partial_answer(self, partial: str) -> bool:
+        return self.partial_answer_checker()(partial)
+
+    def partial_answer_checker(self) -> PartialAnswerChecker:
+        return TextAnswerPrefix(self.normalized_english)
+
     def reveal_answer(self) -> QuestionResult:
+        self._report(False)
         return QuestionResult(
             result=AnswerResult.WRONG,
             display_answer_text=f"Ratt svar: {self.english}",
         )
 
+    def _report(self, correct: bool) -> None:
+        if self.on_answered is not None:
+            self.on_answered(correct)
+
 
 class MagicGlossaryPlugin(Plugin):
     def __init__(self, chapters: list[_ChapterData]):
         self._chapters = chapters
-        self._chapter_cycles: list[list[_GlossaryEntry]] = [[] for _ in chapters]
-        self._chapter_positions: list[int] = [0 for _ in chapters]
-        self._last_chapter_index: int | None = None
-        for idx in range(len(self._chapters)):
-            self._reshuffle_chapter(idx)
-
-    def _reshuffle_chapter(self, chapter_index: int) -> None:
-        cycle = list(self._chapters[chapter_index].entries)
-        random.shuffle(cycle)
-        self._chapter_cycles[chapter_index] = cycle
-        self._chapter_positions[chapter_index] = 0
-
-    def _next_entry(self, chapter_index: int) -> _GlossaryEntry:
-        if self._chapter_positions[chapter_index] >= len(self._chapter_cycles[chapter_index]):
-            self._reshuffle_chapter(chapter_index)
-        pos = self._chapter_positions[chapter_index]
-        self._chapter_positions[chapter_index] = pos + 1
-        return self._chapter_cycles[chapter_index][pos]
-
-    def reset(self) -> None:
-        if self._last_chapter_index is None:
-            return
-        self._reshuffle_chapter(self._last_chapter_index)
+        # Entries are picked by spaced repetition, keyed by their answers.
+        self._reviews = ReviewStates()
+
+    def reload_data(self, changed_files: list[Path]) -> bool:
+        indices = changed_chapter_indices([chapter.path for chapter in self._chapters], changed_files)
+        if indices is None:
+            return False
+        for idx in indices:
+            # Rebuilt from the new entries when next used.
+            self._reviews.forget(self._chapters[idx].path.name)
+        return True
+
+    def load_state(self, data: bytes | None) -> None:
+        self._reviews.load(data)
+
+    def dump_state(self) -> bytes:
+        return self._reviews.dump()
 
     def make_question(self, difficulty_or_chapter: int) -> Question:
         if not self._chapters:
             raise RuntimeError("Magic glossary plugin has no chapters.")
 
-        chapter_index = max(0, min(int(difficulty_or_chapter), len(self._chapters) - 1))
-        self._last_chapter_index = chapter_index
-        chapter = self._chapters[chapter_index]
-        entry = self._next_entry(chapter_index)
+        chapter = self._chapters[max(0, min(int(difficulty_or_chapter), len(self._chapters) - 1))]
+        name = chapter.path.name
+        scheduler = self._reviews.scheduler(name, lambda: (entry.normalized_english for entry in chapter.entries))
+        if len(scheduler) != len(chapter.entries):
+            # The file changed since and nobody told us.
+            self._reviews.forget(name)
+            scheduler = self._reviews.scheduler(name, lambda: (entry.normalized_english for entry in chapter.entries))
+        index = scheduler.next_item()
+        entry = chapter.entries[index]
         return MagicGlossaryQuestion(
             chapter_name=chapter.name,
             english=entry.english,
             swedish=entry.swedish,
+            normalized_english=entry.normalized_english,
+            chapter_path=chapter.path,
+            on_answered=partial(scheduler.record, index),
         )
 
 
@@ -173,8 +187,8 @@ class MagicGlossaryPluginFactory:
             name="Magic Glossary",
             description="Lara dig engelska Magic-termer med svenska ledtradar.",
             mode=[
-                Chapter(name=name, required_streak=len(_load_chapter_file(filename)))
-                for name, filename in _CHAPTER_FILES
+                Chapter(name=chapter.name, required_streak=chapter.entry_count)
+                for chapter in discover_chapters(_plugin_dir())
             ],
             icon=EmojiIcon("🃏"),
             required_streak=None,
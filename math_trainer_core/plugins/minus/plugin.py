@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-import random
+from functools import partial
+from typing import Callable, Sequence
 
+from math_trainer_core.core.fact_stats import FactStats, FactStatsStates
+from ..partial_answer import IntAnswerPrefix, PartialAnswerChecker
+from ..question_batch import QuestionBatch
 from ..plugin_api import (
     AnswerResult,
     Difficulty,
@@ -20,6 +24,8 @@ from ..plugin_api import (
 class MinusQuestion:
     a: int
     b: int
+    # Called with whether the question was answered correctly.
+    on_answered: Callable[[bool], None] | None = None
 
     def read_question(self) -> QuestionContent:
         return QuestionContent(question_text=f"{self.a} - {self.b} =")
@@ -35,6 +41,7 @@ class MinusQuestion:
                 display_answer_text=f"{self.a} - {self.b} = {correct}",
             )
 
+        self._report(value == correct)
         if value == correct:
             return QuestionResult(
                 result=AnswerResult.CORRECT,
@@ -46,24 +53,66 @@ class MinusQuestion:
             display_answer_text=f"{self.a} - {self.b} = {correct}",
         )
 
+    def check_partial_answer(self, partial: str) -> bool:
+        return self.partial_answer_checker()(partial)
+
+    def partial_answer_checker(self) -> PartialAnswerChecker:
+        return IntAnswerPrefix(self.a - self.b)
+
     def reveal_answer(self) -> QuestionResult:
+        self._report(False)
         correct = self.a - self.b
         return QuestionResult(
             result=AnswerResult.WRONG,
             display_answer_text=f"{self.a} - {self.b} = {correct}",
         )
 
+    def _report(self, correct: bool) -> None:
+        if self.on_answered is not None:
+            self.on_answered(correct)
+
+
+def _range_for_level(difficulty_or_chapter: int) -> tuple[int, bool]:
+    # (largest operand, whether answers may be negative)
+    level = max(0, int(difficulty_or_chapter))
+    return 10 + level * 5, level >= 3
+
 
 class MinusPlugin(Plugin):
-    def make_question(self, difficulty_or_chapter: int) -> Question:
-        level = max(0, int(difficulty_or_chapter))
-        max_value = 10 + level * 5
-        allow_negative = level >= 3
+    """
+    Draws the differences of each level weighted by the user's errors and
+    answer times on them (see fact_stats).
+    """
+
+    def __init__(self) -> None:
+        self._facts = FactStatsStates()
+
+    def load_state(self, data: bytes | None) -> None:
+        self._facts.load(data)
 
-        a = random.randint(0, max_value)
-        b = random.randint(0, max_value) if allow_negative else random.randint(0, a)
+    def dump_state(self) -> bytes:
+        return self._facts.dump()
 
-        return MinusQuestion(a=a, b=b)
+    def make_question(self, difficulty_or_chapter: int) -> Question:
+        table = self._table(difficulty_or_chapter)
+        return self._question(table, *table.draw())
+
+    def make_questions(self, difficulty_or_chapter: int, count: int) -> Sequence[Question]:
+        table = self._table(difficulty_or_chapter)
+        a, b = table.draw_many(count)
+        return QuestionBatch(partial(self._question, table), a, b)
+
+    def _question(self, table: FactStats, a: int, b: int) -> MinusQuestion:
+        a, b = int(a), int(b)
+        return MinusQuestion(a=a, b=b, on_answered=self._facts.reporter(table, a, b))
+
+    def _table(self, difficulty_or_chapter: int) -> FactStats:
+        max_value, allow_negative = _range_for_level(difficulty_or_chapter)
+        operands = range(0, max_value + 1)
+        # b <= a unless answers may be negative.
+        allowed = None if allow_negative else (lambda a, b: b <= a)
+        level = max(0, int(difficulty_or_chapter))
+        return self._facts.table(str(level), operands, operands, allowed)
 
 
 class MinusPluginFactory:
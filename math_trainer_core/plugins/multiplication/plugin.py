@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-import random
+from functools import partial
+from typing import Callable, Sequence
 
+from math_trainer_core.core.fact_stats import FactStats, FactStatsStates
+from ..partial_answer import IntAnswerPrefix, PartialAnswerChecker
+from ..question_batch import QuestionBatch
 from ..plugin_api import (
     AnswerResult,
     Difficulty,
@@ -20,6 +24,8 @@ from ..plugin_api import (
 class MultiplicationQuestion:
     a: int
     b: int
+    # Called with whether the question was answered correctly.
+    on_answered: Callable[[bool], None] | None = None
 
     def read_question(self) -> QuestionContent:
         return QuestionContent(question_text=f"{self.a} x {self.b} =")
@@ -35,6 +41,7 @@ class MultiplicationQuestion:
                 display_answer_text=f"{self.a} x {self.b} = {correct}",
             )
 
+        self._report(value == correct)
         if value == correct:
             return QuestionResult(
                 result=AnswerResult.CORRECT,
@@ -46,23 +53,60 @@ class MultiplicationQuestion:
             display_answer_text=f"{self.a} x {self.b} = {correct}",
         )
 
+    def check_partial_answer(self, partial: str) -> bool:
+        return self.partial_answer_checker()(partial)
+
+    def partial_answer_checker(self) -> PartialAnswerChecker:
+        return IntAnswerPrefix(self.a * self.b)
+
     def reveal_answer(self) -> QuestionResult:
+        self._report(False)
         correct = self.a * self.b
         return QuestionResult(
             result=AnswerResult.WRONG,
             display_answer_text=f"{self.a} x {self.b} = {correct}",
         )
 
+    def _report(self, correct: bool) -> None:
+        if self.on_answered is not None:
+            self.on_answered(correct)
+
 
 class MultiplicationPlugin(Plugin):
+    """
+    Draws the facts of each level weighted by the user's errors and answer
+    times on them (see fact_stats), so troublesome facts come up more.
+    """
+
+    def __init__(self) -> None:
+        self._facts = FactStatsStates()
+
+    def load_state(self, data: bytes | None) -> None:
+        self._facts.load(data)
+
+    def dump_state(self) -> bytes:
+        return self._facts.dump()
+
     def make_question(self, difficulty_or_chapter: int) -> Question:
+        table = self._table(difficulty_or_chapter)
+        return self._question(table, *table.draw())
+
+    def make_questions(self, difficulty_or_chapter: int, count: int) -> Sequence[Question]:
+        table = self._table(difficulty_or_chapter)
+        a, b = table.draw_many(count)
+        return QuestionBatch(partial(self._question, table), a, b)
+
+    def _question(self, table: FactStats, a: int, b: int) -> MultiplicationQuestion:
+        a, b = int(a), int(b)
+        return MultiplicationQuestion(a=a, b=b, on_answered=self._facts.reporter(table, a, b))
+
+    def _table(self, difficulty_or_chapter: int) -> FactStats:
         # Level 0: 0-1 times 0-10
         # Level 1: 0-2 times 0-10
         # Level 2: 0-3 times 0-10
         # ...
-        a = random.randint(0, difficulty_or_chapter + 1)
-        b = random.randint(0, 10)
-        return MultiplicationQuestion(a=a, b=b)
+        level = max(0, int(difficulty_or_chapter))
+        return self._facts.table(str(level), range(0, level + 2), range(0, 11))
 
 
 class MultiplicationPluginFactory:
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from ..core.chapter_file import normalize_answer
+
+
+def could_become_int(partial: str, correct: int) -> bool:
+    """
+    True if more typing can turn partial into text that int() reads as
+    correct. partial must already be stripped of the whitespace the
+    plugin's answer_question ignores.
+    """
+    sign, digits = "", partial
+    if digits[:1] in ("+", "-"):
+        sign, digits = digits[0], digits[1:]
+    if digits and not digits.isdigit():
+        return False
+    if sign == "-" and correct > 0 or sign == "+" and correct < 0:
+        return False
+    if correct < 0 and not sign and digits:
+        return False
+    # Leading zeros do not change the value; int("007") == 7.
+    return str(abs(correct)).startswith(digits.lstrip("0"))
+
+
+# A question's partial_answer_checker() returns one of the checkers below.
+# They hold only data and are defined here, in the core, so the plugin host
+# can send one along with the question content and the core can check each
+# keystroke itself without asking the host or importing plugin code.
+
+
+class PartialAnswerChecker(ABC):
+    @abstractmethod
+    def __call__(self, partial: str) -> bool: ...
+
+
+@dataclass(frozen=True)
+class IntAnswerPrefix(PartialAnswerChecker):
+    correct: int
+    # Whether answer_question also ignores whitespace inside the number.
+    ignore_inner_whitespace: bool = False
+
+    def __call__(self, partial: str) -> bool:
+        if self.ignore_inner_whitespace:
+            return could_become_int("".join(partial.split()), self.correct)
+        return could_become_int(partial.strip(), self.correct)
+
+
+@dataclass(frozen=True)
+class TextAnswerPrefix(PartialAnswerChecker):
+    # The correct answer, already passed through normalize_answer.
+    normalized_answer: str
+
+    def __call__(self, partial: str) -> bool:
+        return self.normalized_answer.startswith(normalize_answer(partial))
+
+
+@dataclass(frozen=True)
+class LetterSequencePrefix(PartialAnswerChecker):
+    # Upper-case letters to type in order; whitespace is ignored.
+    letters: str
+
+    def __call__(self, partial: str) -> bool:
+        return self.letters.startswith("".join(partial.split()).upper())
@@ -1,76 +1,114 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-import json
+from functools import partial
 from pathlib import Path
 import random
+from typing import Callable, Sequence
 
 from math_trainer_core.api_types import PictureWithText
+from math_trainer_core.core.chapter_file import ChapterRecord, MappedRecords, load_chapter_records, normalize_answer
+from math_trainer_core.core.chapter_registry import ChapterRecords, changed_chapter_indices, discover_chapters
+from math_trainer_core.core.fuzzy_match import MatchKind, match_answer
 from math_trainer_core.core.picture_helper import PictureRef, download_picture
-from .plugin_api import AnswerResult, QuestionContent, QuestionResult
+from math_trainer_core.core.review_scheduler import ReviewStates
+from .partial_answer import PartialAnswerChecker, TextAnswerPrefix
+from .plugin_api import AnswerResult, Chapter, QuestionContent, QuestionResult
+
+
+NEAR_MISS_TEXT = "Nastan! Kolla stavningen och forsok igen."
 
 
 @dataclass(frozen=True)
 class PictureTextEntry:
     answer: str
-    picture_urls: list[str]
+    picture_urls: tuple[str, ...]
+    normalized_answer: str
 
 
 @dataclass(frozen=True)
 class PictureTextChapter:
     name: str
-    entries: list[PictureTextEntry]
+    # A view on the shared chapter records; see core.chapter_file.
+    entries: Sequence[PictureTextEntry]
+    path: Path | None = None
 
 
 def normalize_text_answer(value: str) -> str:
-    return " ".join(value.strip().casefold().split())
-
-
-def load_picture_text_entries(path: Path) -> list[PictureTextEntry]:
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    if not isinstance(raw, dict):
-        raise ValueError(f"Invalid chapter file format: {path}")
-
-    entries: list[PictureTextEntry] = []
-    for answer, urls in raw.items():
-        if not isinstance(answer, str) or not answer.strip():
-            continue
-        if not isinstance(urls, list):
-            continue
-        picture_urls = [u.strip() for u in urls if isinstance(u, str) and u.strip()]
-        if not picture_urls:
-            continue
-        entries.append(PictureTextEntry(answer=answer.strip(), picture_urls=picture_urls))
-
-    if not entries:
-        raise ValueError(f"Chapter has no usable entries: {path}")
-    return entries
-
-
-def load_picture_text_chapters(
-    plugin_dir: Path,
-    chapter_files: list[tuple[str, str]],
-) -> list[PictureTextChapter]:
-    chapters: list[PictureTextChapter] = []
-    for chapter_name, filename in chapter_files:
-        chapters.append(
-            PictureTextChapter(
-                name=chapter_name,
-                entries=load_picture_text_entries(plugin_dir / filename),
-            )
+    return normalize_answer(value)
+
+
+def load_picture_text_entries(path: Path) -> Sequence[PictureTextEntry]:
+    """
+    Entries of one chapter file (answer -> list of picture URLs), parsed or
+    mapped once per process while it is unchanged.
+    """
+    return MappedRecords(load_chapter_records(path), _entry_from_record)
+
+
+def _entry_from_record(record: ChapterRecord) -> PictureTextEntry:
+    return PictureTextEntry(
+        answer=record.answer,
+        picture_urls=record.values,
+        normalized_answer=record.normalized_answer,
+    )
+
+
+def picture_text_mode(plugin_dir: Path) -> list[Chapter]:
+    """
+    One Chapter per chapter file in plugin_dir, requiring a streak as long
+    as the chapter, without loading any entries.
+    """
+    return [
+        Chapter(name=chapter.name, required_streak=chapter.entry_count)
+        for chapter in discover_chapters(plugin_dir)
+    ]
+
+
+def load_picture_text_chapters(plugin_dir: Path) -> list[PictureTextChapter]:
+    """
+    The chapters in plugin_dir; entries are loaded when a chapter is used.
+    """
+    chapters = [
+        PictureTextChapter(
+            name=chapter.name,
+            entries=MappedRecords(ChapterRecords(chapter.path), _entry_from_record),
+            path=chapter.path,
         )
-
+        for chapter in discover_chapters(plugin_dir)
+    ]
     if not chapters:
-        raise ValueError("Picture-text plugin has no chapter files configured.")
+        raise ValueError(f"Picture-text plugin has no chapter files: {plugin_dir}")
     return chapters
 
 
+def reload_picture_text_chapters(schedule: PictureTextSchedule, changed_files: list[Path]) -> bool:
+    """
+    Restart the chapters whose files changed, keeping the review state of
+    entries still in them. False if chapter files were added or removed,
+    which needs a new plugin.
+    """
+    indices = changed_chapter_indices(schedule.chapter_paths(), changed_files)
+    if indices is None:
+        return False
+    for index in indices:
+        schedule.restart_chapter(index)
+    return True
+
+
 @dataclass(frozen=True)
 class PictureTextQuestion:
     prompt: str
     answer: str
     picture_urls: list[str]
     answer_label: str = "Ratt svar"
+    # Precomputed normalize_text_answer(answer), if the caller has it.
+    normalized_answer: str | None = None
+    # The chapter file the answer comes from. With it, typos get a second
+    # try and answers naming another entry of the chapter are pointed out.
+    chapter_path: Path | None = None
+    # Called with whether the question was answered correctly.
+    on_answered: Callable[[bool], None] | None = None
 
     def _answer_text(self) -> str:
         return f"{self.answer_label}: {self.answer}"
@@ -98,53 +136,100 @@ class PictureTextQuestion:
                 display_answer_text=self._answer_text(),
             )
 
-        if normalized == normalize_text_answer(self.answer):
+        expected = self.normalized_answer
+        if expected is None:
+            expected = normalize_text_answer(self.answer)
+        match = match_answer(self.chapter_path, normalized, expected)
+        if match.kind != MatchKind.NEAR_MISS:
+            self._report(match.kind == MatchKind.EXACT)
+        if match.kind == MatchKind.EXACT:
             return QuestionResult(
                 result=AnswerResult.CORRECT,
                 display_answer_text=self._answer_text(),
             )
+        if match.kind == MatchKind.NEAR_MISS:
+            return QuestionResult(
+                result=AnswerResult.NEAR_MISS,
+                display_answer_text=NEAR_MISS_TEXT,
+            )
+        if match.kind == MatchKind.OTHER_ENTRY:
+            return QuestionResult(
+                result=AnswerResult.WRONG,
+                display_answer_text=f"{match.other_answer} ar ett annat svar. {self._answer_text()}",
+            )
 
         return QuestionResult(
             result=AnswerResult.WRONG,
             display_answer_text=self._answer_text(),
         )
 
+    def check_partial_answer(self, partial: str) -> bool:
+        return self.partial_answer_checker()(partial)
+
+    def partial_answer_checker(self) -> PartialAnswerChecker:
+        expected = self.normalized_answer
+        if expected is None:
+            expected = normalize_text_answer(self.answer)
+        return TextAnswerPrefix(expected)
+
     def reveal_answer(self) -> QuestionResult:
+        self._report(False)
         return QuestionResult(
             result=AnswerResult.WRONG,
             display_answer_text=self._answer_text(),
         )
 
+    def _report(self, correct: bool) -> None:
+        if self.on_answered is not None:
+            self.on_answered(correct)
+
+
+class PictureTextSchedule:
+    """
+    Picks the entries of each chapter by spaced repetition (see
+    core.review_scheduler), keyed by their normalized answers. Entries are
+    fetched only when asked for, so a chapter streamed from a large file is
+    never held in memory as a whole; a chapter is first loaded when it is
+    first used.
+    """
 
-class PictureTextChapterCycle:
     def __init__(self, chapters: list[PictureTextChapter]):
         self._chapters = chapters
-        self._chapter_cycles: list[list[PictureTextEntry]] = [[] for _ in chapters]
-        self._chapter_positions: list[int] = [0 for _ in chapters]
-        self._last_chapter_index: int | None = None
-        for idx in range(len(self._chapters)):
-            self._reshuffle_chapter(idx)
-
-    def _reshuffle_chapter(self, chapter_index: int) -> None:
-        cycle = list(self._chapters[chapter_index].entries)
-        random.shuffle(cycle)
-        self._chapter_cycles[chapter_index] = cycle
-        self._chapter_positions[chapter_index] = 0
-
-    def reset_last_chapter(self) -> None:
-        if self._last_chapter_index is None:
-            return
-        self._reshuffle_chapter(self._last_chapter_index)
-
-    def next_for_chapter(self, requested_index: int) -> tuple[PictureTextChapter, PictureTextEntry]:
+        self._reviews = ReviewStates()
+
+    def chapter_paths(self) -> list[Path]:
+        return [chapter.path for chapter in self._chapters if chapter.path is not None]
+
+    def restart_chapter(self, chapter_index: int) -> None:
+        # Rebuilt from the chapter's new entries the next time it is used.
+        self._reviews.forget(_schedule_name(self._chapters[chapter_index]))
+
+    def load_state(self, data: bytes | None) -> None:
+        self._reviews.load(data)
+
+    def dump_state(self) -> bytes:
+        return self._reviews.dump()
+
+    def next_for_chapter(
+        self, requested_index: int
+    ) -> tuple[PictureTextChapter, PictureTextEntry, Callable[[bool], None]]:
+        """
+        The chapter, its next entry, and the callback taking whether that
+        entry was answered correctly.
+        """
         if not self._chapters:
             raise RuntimeError("Picture-text plugin has no chapters.")
 
-        chapter_index = max(0, min(int(requested_index), len(self._chapters) - 1))
-        self._last_chapter_index = chapter_index
-        if self._chapter_positions[chapter_index] >= len(self._chapter_cycles[chapter_index]):
-            self._reshuffle_chapter(chapter_index)
+        chapter = self._chapters[max(0, min(int(requested_index), len(self._chapters) - 1))]
+        name = _schedule_name(chapter)
+        scheduler = self._reviews.scheduler(name, lambda: (entry.normalized_answer for entry in chapter.entries))
+        if len(scheduler) != len(chapter.entries):
+            # The file changed since and nobody told us.
+            self._reviews.forget(name)
+            scheduler = self._reviews.scheduler(name, lambda: (entry.normalized_answer for entry in chapter.entries))
+        index = scheduler.next_item()
+        return chapter, chapter.entries[index], partial(scheduler.record, index)
+
 
-        pos = self._chapter_positions[chapter_index]
-        self._chapter_positions[chapter_index] = pos + 1
-        return self._chapters[chapter_index], self._chapter_cycles[chapter_index][pos]
+def _schedule_name(chapter: PictureTextChapter) -> str:
+    return chapter.path.name if chapter.path is not None else chapter.name
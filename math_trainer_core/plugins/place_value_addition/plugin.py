@@ -2,7 +2,16 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 import random
-
+from typing import Sequence
+
+from ..partial_answer import IntAnswerPrefix, PartialAnswerChecker
+from ..question_batch import (
+    QuestionBatch,
+    random_int_rows,
+    random_ints,
+    random_orders,
+    vectorized,
+)
 from ..plugin_api import (
     AnswerResult,
     Difficulty,
@@ -72,6 +81,12 @@ class PlaceValueQuestion:
             display_answer_text=self._format_answer_text(correct),
         )
 
+    def check_partial_answer(self, partial: str) -> bool:
+        return self.partial_answer_checker()(partial)
+
+    def partial_answer_checker(self) -> PartialAnswerChecker:
+        return IntAnswerPrefix(sum(self.terms), ignore_inner_whitespace=True)
+
     def reveal_answer(self) -> QuestionResult:
         correct = sum(self.terms)
         return QuestionResult(
@@ -80,13 +95,23 @@ class PlaceValueQuestion:
         )
 
 
+def _shape_for_level(difficulty_or_chapter: int) -> tuple[int, int, int]:
+    # (highest power of ten, fewest terms, most terms)
+    level = max(0, int(difficulty_or_chapter))
+    max_power = 2 + level
+    return max_power, 2, min(3 + level // 2, max_power + 1)
+
+
+def _place_value_question(term_count, order, digits) -> PlaceValueQuestion:
+    # The first term_count powers of a random order, one digit per power.
+    terms = [int(digits[power]) * 10 ** int(power) for power in order[:int(term_count)]]
+    terms.sort(reverse=True)
+    return PlaceValueQuestion(terms=terms)
+
+
 class PlaceValueAdditionPlugin(Plugin):
     def make_question(self, difficulty_or_chapter: int) -> Question:
-        level = max(0, int(difficulty_or_chapter))
-
-        max_power = 2 + level
-        min_terms = 2
-        max_terms = min(3 + level // 2, max_power + 1)
+        max_power, min_terms, max_terms = _shape_for_level(difficulty_or_chapter)
         term_count = random.randint(min_terms, max_terms)
 
         powers = random.sample(range(max_power + 1), k=term_count)
@@ -95,6 +120,18 @@ class PlaceValueAdditionPlugin(Plugin):
 
         return PlaceValueQuestion(terms=terms)
 
+    def make_questions(self, difficulty_or_chapter: int, count: int) -> Sequence[Question]:
+        if not vectorized():
+            # Row-wise shuffles cost more than random.sample per question.
+            return [self.make_question(difficulty_or_chapter) for _ in range(count)]
+        max_power, min_terms, max_terms = _shape_for_level(difficulty_or_chapter)
+        return QuestionBatch(
+            _place_value_question,
+            random_ints(count, min_terms, max_terms),
+            random_orders(count, max_power + 1),
+            random_int_rows(count, max_power + 1, 1, 9),
+        )
+
 
 class PlaceValueAdditionPluginFactory:
     @staticmethod
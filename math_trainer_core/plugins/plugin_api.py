@@ -65,6 +65,10 @@ class AnswerResult(Enum):
     CORRECT = auto()
     WRONG = auto()
     INVALID_INPUT = auto()
+    # Close enough to deserve a second try (e.g. one typo). The core shows
+    # display_answer_text, so it must not give the answer away, and keeps
+    # the streak; a second near miss on the same question counts as wrong.
+    NEAR_MISS = auto()
 
 @dataclass(frozen=True)
 class QuestionResult:
@@ -76,11 +80,42 @@ class Question(Protocol):
     def read_question(self) -> QuestionContent: ...
     def answer_question(self, answer: str) -> QuestionResult: ...
     def reveal_answer(self) -> QuestionResult: ...
+    # Optional methods are looked up with getattr and are not declared
+    # here: questions subclass this Protocol and would inherit a stub that
+    # returns None.
+    #
+    # check_partial_answer(self, partial: str) -> bool
+    #   Called as the answer is typed: False once the partial answer cannot
+    #   be completed into a correct one, None if the question cannot tell.
+    #   Called on every keystroke, so it must be cheap.
+    # partial_answer_checker(self) -> PartialAnswerChecker
+    #   The same check as a partial_answer checker, for plugins run in the
+    #   plugin host: the core then checks keystrokes itself instead of
+    #   asking the host for each one.
+    # content_ready(self) -> bool
+    #   For questions whose content is still being made (e.g. by the plugin
+    #   host): False until then. The core polls it on refresh and only
+    #   reads the question and takes answers once it is True.
 
 class Plugin(Protocol):
     def make_question(self, difficulty_or_chapter: int) -> Question: ...
     # Optional method to reset plugin state (e.g. for plugins with Chapters).
     def reset(self) -> None: ...
+    # Other optional methods are looked up with getattr and, like those of
+    # Question, not declared here.
+    #
+    # make_questions(self, difficulty_or_chapter: int, count: int) -> Sequence[Question]
+    #   count questions at once, for plugins that can draw them in bulk (see
+    #   question_batch). Questions may be built lazily as they are indexed.
+    # reload_data(self, changed_files: List[Path]) -> bool
+    #   Called when data files in the plugin's directory changed on disk.
+    #   Re-read them in place and return True, or return False to have the
+    #   core create a fresh plugin instead.
+    # load_state(self, data: bytes | None) -> None
+    # dump_state(self) -> bytes | None
+    #   Per-user plugin state (e.g. review schedules): load_state gets what
+    #   dump_state last returned for the current user, or None for a user
+    #   without any, before the user's first question.
 
 class PluginFactory(Protocol):
     @staticmethod
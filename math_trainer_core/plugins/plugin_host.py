@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+import pickle
+import struct
+import sys
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from . import partial_answer
+from .partial_answer import PartialAnswerChecker
+from .plugin_api import Plugin, Question
+from .plugin_manifest import load_factory, reload_package_modules
+from .question_batch import make_questions
+
+
+# The plugin host runs plugins in a child process so that a plugin that
+# hangs or crashes cannot take the GUI with it (see plugin_sandbox for the
+# core side). Both directions carry length-prefixed pickle frames: a u32
+# payload length, then pickle.dumps(message).
+#
+# Requests are (op, args) tuples and are answered strictly in order, one
+# response each: ("ok", value) or ("error", message). The core may send
+# several requests before reading any response.
+_FRAME = struct.Struct("<I")
+_PLUGINS_PKG = "math_trainer_core.plugins"
+
+OP_CREATE = "create"  # (handle, module_name) -> None
+OP_MAKE = "make"  # (handle, level, count) -> [(question_id, QuestionContent, checker | None)]
+OP_ANSWER = "answer"  # (question_id, text) -> QuestionResult
+OP_REVEAL = "reveal"  # (question_id,) -> QuestionResult
+OP_DROP = "drop"  # (question_ids,) -> None
+OP_DISCARD = "discard"  # (handle, keep_question_ids) -> None
+OP_RESET = "reset"  # (handle,) -> None
+OP_RELOAD_DATA = "reload_data"  # (handle, changed_files) -> bool
+OP_LOAD_STATE = "load_state"  # (handle, data) -> None
+OP_DUMP_STATE = "dump_state"  # (handle,) -> bytes | None
+OP_CLOSE = "close"  # (handle,) -> None
+_OPS = {
+    OP_CREATE,
+    OP_MAKE,
+    OP_ANSWER,
+    OP_REVEAL,
+    OP_DROP,
+    OP_DISCARD,
+    OP_RESET,
+    OP_RELOAD_DATA,
+    OP_LOAD_STATE,
+    OP_DUMP_STATE,
+    OP_CLOSE,
+}
+
+
+def write_frame(writer: BinaryIO, message: Any) -> None:
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(_FRAME.pack(len(payload)) + payload)
+
+
+def read_frame(reader: BinaryIO) -> Any:
+    """
+    Read one frame; raises EOFError when the stream ends.
+    """
+    header = reader.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        raise EOFError("Plugin host stream closed.")
+    (length,) = _FRAME.unpack(header)
+    payload = reader.read(length)
+    if len(payload) < length:
+        raise EOFError("Plugin host stream closed mid-frame.")
+    return pickle.loads(payload)
+
+
+class _Host:
+    def __init__(self) -> None:
+        self._plugins: dict[int, Plugin] = {}
+        self._questions: dict[int, tuple[int, Question]] = {}
+        self._next_question_id = 1
+        # Newest .py mtime of each plugin package when it was (re)loaded.
+        self._loaded_code: dict[str, int] = {}
+
+    def create(self, handle: int, module_name: str) -> None:
+        # math_trainer_core.plugins.<package>.plugin; pick up edited code.
+        package = module_name.split(".")[-2] if module_name.startswith(f"{_PLUGINS_PKG}.") else None
+        if package is not None:
+            code_mtime = _code_mtime(package)
+            if self._loaded_code.get(package, code_mtime) != code_mtime:
+                reload_package_modules(package)
+            self._loaded_code[package] = code_mtime
+        self._plugins[handle] = load_factory(module_name).CreatePlugin()
+
+    def make(self, handle: int, level: int, count: int) -> list[tuple[int, Any]]:
+        batch = []
+        for question in make_questions(self._plugins[handle], level, count):
+            question_id = self._next_question_id
+            self._next_question_id += 1
+            self._questions[question_id] = (handle, question)
+            batch.append((question_id, question.read_question(), _partial_checker(question)))
+        return batch
+
+    def answer(self, question_id: int, text: str) -> Any:
+        return self._questions[question_id][1].answer_question(text)
+
+    def reveal(self, question_id: int) -> Any:
+        return self._questions[question_id][1].reveal_answer()
+
+    def drop(self, question_ids: list[int]) -> None:
+        for question_id in question_ids:
+            self._questions.pop(question_id, None)
+
+    def discard(self, handle: int, keep: list[int]) -> None:
+        stale = [
+            question_id
+            for question_id, (owner, _) in self._questions.items()
+            if owner == handle and question_id not in keep
+        ]
+        self.drop(stale)
+
+    def reset(self, handle: int) -> None:
+        reset_fn = getattr(self._plugins[handle], "reset", None)
+        if callable(reset_fn):
+            reset_fn()
+
+    def reload_data(self, handle: int, changed_files: list[Path]) -> bool:
+        reload_fn = getattr(self._plugins[handle], "reload_data", None)
+        return bool(callable(reload_fn) and reload_fn(changed_files))
+
+    def load_state(self, handle: int, data: bytes | None) -> None:
+        load_fn = getattr(self._plugins[handle], "load_state", None)
+        if callable(load_fn):
+            load_fn(data)
+
+    def dump_state(self, handle: int) -> bytes | None:
+        dump_fn = getattr(self._plugins[handle], "dump_state", None)
+        return dump_fn() if callable(dump_fn) else None
+
+    def close(self, handle: int) -> None:
+        self.discard(handle, keep=[])
+        self._plugins.pop(handle, None)
+
+
+def _partial_checker(question: Question) -> PartialAnswerChecker | None:
+    checker_fn = getattr(question, "partial_answer_checker", None)
+    checker = checker_fn() if callable(checker_fn) else None
+    # Only the core's own checkers: unpickling anything else would import
+    # plugin code into the core.
+    if type(checker).__module__ != partial_answer.__name__ or not isinstance(checker, PartialAnswerChecker):
+        return None
+    return checker
+
+
+def _code_mtime(package: str) -> int:
+    package_dir = Path(__file__).resolve().parent / package
+    return max((path.stat().st_mtime_ns for path in package_dir.rglob("*.py")), default=0)
+
+
+def main() -> int:
+    # Keep the protocol on its own copy of stdout, so that plugins printing
+    # something end up on stderr instead of corrupting a frame.
+    reader = os.fdopen(os.dup(sys.stdin.fileno()), "rb")
+    writer = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    host = _Host()
+    while True:
+        try:
+            op, args = read_frame(reader)
+        except EOFError:
+            return 0
+        try:
+            if op not in _OPS:
+                raise ValueError(f"Unknown op {op!r}.")
+            response: tuple[str, Any] = ("ok", getattr(host, op)(*args))
+        except Exception as exc:
+            response = ("error", f"{type(exc).__name__}: {exc}")
+        write_frame(writer, response)
+        writer.flush()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
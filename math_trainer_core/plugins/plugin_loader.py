@@ -1,17 +1,126 @@
 from __future__ import annotations
 
-import importlib
-import pkgutil
-from dataclasses import dataclass
-from typing import Dict, Type
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Type
 
-from .plugin_api import PluginInfo, PluginFactory
+from .plugin_api import Plugin, PluginInfo, PluginFactory
+from .plugin_manifest import PluginLoadError, load_factory, load_plugin_manifest, refresh_plugin_entry
+from .plugin_sandbox import sandbox_enabled, sandboxed_plugin
 
 
-@dataclass(frozen=True)
 class LoadedPlugin:
-    info: PluginInfo
-    factory: Type[PluginFactory]
+    """
+    A discovered plugin: its info, plus a lazy handle on its module.
+
+    The plugin module is imported on first use of factory, and instance()
+    keeps the plugin created by CreatePlugin() warm, so chapter data and
+    other setup are not redone each time the training is entered. With
+    MATH_TRAINER_PLUGIN_SANDBOX set, that instance lives in the plugin host
+    process instead and the module is not imported here.
+
+    The plugin watcher re-reads data on its own thread, so a local instance
+    is handed out behind _GuardedPlugin: its calls and reload_data take
+    turns on one lock. Sandboxed instances need no guard, as the plugin
+    host runs their calls one at a time.
+    """
+
+    def __init__(self, info: PluginInfo, module_name: str):
+        self._info = info
+        self._module_name = module_name
+        self._factory: Type[PluginFactory] | None = None
+        self._instance: Plugin | None = None
+        self._lock = threading.Lock()
+        # Held by every call on the local instance and by its reload_data.
+        self._calls = threading.RLock()
+
+    @property
+    def info(self) -> PluginInfo:
+        return self._info
+
+    @property
+    def module_name(self) -> str:
+        return self._module_name
+
+    @property
+    def factory(self) -> Type[PluginFactory]:
+        with self._lock:
+            if self._factory is None:
+                self._factory = load_factory(self._module_name)
+            return self._factory
+
+    @property
+    def imported(self) -> bool:
+        return self._factory is not None or self._instance is not None
+
+    def instance(self) -> Plugin:
+        if sandbox_enabled():
+            with self._lock:
+                if self._instance is None:
+                    self._instance = sandboxed_plugin(self._module_name)
+                return self._instance
+        factory = self.factory
+        with self._lock:
+            if self._instance is None:
+                self._instance = _GuardedPlugin(factory.CreatePlugin(), self._calls)
+            return self._instance
+
+    def refresh(self, info: PluginInfo, code_changed: bool, changed_files: List[Path]) -> None:
+        """
+        Take in a reloaded plugin. Sessions already running keep the plugin
+        they were started with; the next instance() gets the new one.
+        """
+        with self._lock:
+            self._info = info
+            if code_changed:
+                self._factory = None
+                self._instance = None
+                return
+            instance = self._instance
+        if instance is not None and not self._reload_data(instance, changed_files):
+            with self._lock:
+                if self._instance is instance:
+                    self._instance = None
+
+    def _reload_data(self, instance: Plugin, changed_files: List[Path]) -> bool:
+        plugin = instance.plugin if isinstance(instance, _GuardedPlugin) else instance
+        reload_data = getattr(plugin, "reload_data", None)
+        if not callable(reload_data):
+            return False
+        with self._calls:
+            return bool(reload_data(changed_files))
+
+
+class _GuardedPlugin:
+    """
+    A local plugin instance whose calls all hold lock, so they never run
+    while the watcher thread has it re-read its data. Optional methods the
+    plugin lacks stay missing (getattr(..., None) still works).
+    """
+
+    def __init__(self, plugin: Plugin, lock: threading.RLock):
+        self._plugin = plugin
+        self._lock = lock
+
+    @property
+    def plugin(self) -> Plugin:
+        return self._plugin
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._plugin, name)
+        if not callable(attr):
+            return attr
+
+        def guarded(*args: Any, **kwargs: Any) -> Any:
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return guarded
+
+
+# Handles outlive a select screen, so logging in again reuses warm plugins.
+_HANDLES: Dict[str, LoadedPlugin] = {}
+_HANDLES_LOCK = threading.Lock()
 
 
 def load_plugin_factories() -> Dict[str, LoadedPlugin]:
@@ -28,34 +137,56 @@ def load_plugin_factories() -> Dict[str, LoadedPlugin]:
               plugin.py    (defines PLUGIN_FACTORY)
 
     Each plugin package must expose a top-level `PLUGIN_FACTORY`
-    in its `plugin.py` module.
+    in its `plugin.py` module. Infos come from the plugin manifest, so no
+    plugin module is imported here unless its files changed. Plugins that
+    fail to load are skipped; use discover_plugins() to see why.
     """
-    plugins_pkg = "math_trainer_core.plugins"
-    package = importlib.import_module(plugins_pkg)
+    plugins, _ = discover_plugins()
+    return plugins
 
-    result: Dict[str, LoadedPlugin] = {}
 
-    for mod in pkgutil.iter_modules(package.__path__):
-        if not mod.ispkg:
-            continue
-        package_name = f"{plugins_pkg}.{mod.name}"
-
-        # Only load subpackages that provide a plugin.py module
-        module_name = f"{package_name}.plugin"
-        module = importlib.import_module(module_name)
+def discover_plugins() -> tuple[Dict[str, LoadedPlugin], list[PluginLoadError]]:
+    """
+    Like load_plugin_factories(), but also returns the plugins that failed
+    to load. A broken or hanging plugin never stops the others.
+    """
+    manifest, errors = load_plugin_manifest()
+    result: Dict[str, LoadedPlugin] = {}
+    with _HANDLES_LOCK:
+        for plugin_id, entry in manifest.items():
+            handle = _HANDLES.get(plugin_id)
+            if handle is None or handle.info != entry.info or handle.module_name != entry.module_name:
+                handle = LoadedPlugin(info=entry.info, module_name=entry.module_name)
+                _HANDLES[plugin_id] = handle
+            result[plugin_id] = handle
+    return result, errors
 
-        factory = getattr(module, "PLUGIN_FACTORY", None)
-        if factory is None:
-            raise RuntimeError(
-                f"Plugin module '{module_name}' must define a 'PLUGIN_FACTORY' variable."
-            )
 
-        info: PluginInfo = factory.PluginInfo()
+def reload_plugin(package: str, changed_files: List[Path]) -> PluginLoadError | None:
+    """
+    Pick up changed files of one plugin package: reload its code if any
+    .py file changed, otherwise let the warm instance re-read its data.
+    Other plugins are not touched. Returns an error if the plugin no longer
+    loads; its previous state is then kept.
 
-        # Use plugin id as key
-        result[info.id] = LoadedPlugin(
-            info=info,
-            factory=factory,
+    Plugins that were never imported are skipped; the manifest check on the
+    next discovery refreshes them.
+    """
+    with _HANDLES_LOCK:
+        handle = next(
+            (handle for handle in _HANDLES.values() if _package_of(handle) == package and handle.imported),
+            None,
         )
-
-    return result
+    if handle is None:
+        return None
+    code_changed = any(path.suffix == ".py" for path in changed_files)
+    entry, error = refresh_plugin_entry(package, reload_modules=code_changed)
+    if entry is None:
+        return error
+    handle.refresh(entry.info, code_changed, changed_files)
+    return None
+
+
+def _package_of(handle: LoadedPlugin) -> str:
+    # math_trainer_core.plugins.<package>.plugin
+    return handle.module_name.split(".")[-2]
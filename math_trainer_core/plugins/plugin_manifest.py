@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import importlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Type
+
+from ..core.atomic_file import write_atomic
+from .plugin_api import (
+    AnswerButton,
+    Chapter,
+    Difficulty,
+    EmojiIcon,
+    FileIcon,
+    PluginFactory,
+    PluginInfo,
+)
+
+
+_PLUGINS_PKG = "math_trainer_core.plugins"
+_PLUGINS_DIR = Path(__file__).resolve().parent
+_MANIFEST_PATH = Path(".plugin_cache") / "manifest.json"
+_MANIFEST_VERSION = 1
+# Files whose stat signature decides whether a cached entry is still valid.
+_TRACKED_SUFFIXES = (".py", ".json")
+# How long discovery waits for any one plugin to import and describe itself.
+DEFAULT_DISCOVERY_TIMEOUT_S = 5.0
+
+Fingerprint = list[tuple[str, int, int]]
+
+
+@dataclass(frozen=True)
+class PluginManifestEntry:
+    info: PluginInfo
+    # Module defining PLUGIN_FACTORY, imported only when the plugin is used.
+    module_name: str
+
+
+@dataclass(frozen=True)
+class PluginLoadError:
+    package: str
+    module_name: str
+    message: str
+
+
+def load_plugin_manifest(
+    timeout_s: float = DEFAULT_DISCOVERY_TIMEOUT_S,
+) -> tuple[Dict[str, PluginManifestEntry], list[PluginLoadError]]:
+    """
+    PluginInfo of every plugin, keyed by plugin id, without importing them.
+
+    Infos are cached in .plugin_cache/manifest.json together with the mtime
+    and size of each plugin's .py and .json files (and of the shared modules
+    in plugins/). Only plugins whose files changed are imported to refresh
+    their entry; an unchanged tree costs a directory walk and some stats.
+
+    Stale plugins are imported in parallel, each given timeout_s. A plugin
+    that raises or does not finish in time is left out and reported in the
+    returned error list instead; it is retried on the next call.
+    """
+    cached = _read_manifest()
+    shared = _fingerprint(_PLUGINS_DIR, recursive=False)
+    cached_packages = cached.get("packages", {}) if cached.get("shared") == shared else {}
+
+    packages: dict[str, Any] = {}
+    infos: dict[str, PluginInfo] = {}
+    stale: dict[str, str] = {}
+    for package_dir in sorted(_PLUGINS_DIR.iterdir()):
+        if not (package_dir / "plugin.py").is_file():
+            continue
+        package = package_dir.name
+        fingerprint = _fingerprint(package_dir, recursive=True)
+        packages[package] = {"fingerprint": fingerprint}
+        record = cached_packages.get(package)
+        info = None
+        if record is not None and record.get("fingerprint") == fingerprint:
+            info = _info_from_dict(record.get("info"))
+        if info is None:
+            stale[package] = _module_name(package)
+        else:
+            infos[package] = info
+
+    errors: list[PluginLoadError] = []
+    if stale:
+        loaded, errors = _load_infos(stale, timeout_s)
+        infos.update(loaded)
+
+    result: Dict[str, PluginManifestEntry] = {}
+    for package in list(packages):
+        info = infos.get(package)
+        if info is None:
+            del packages[package]
+            continue
+        packages[package]["info"] = _info_to_dict(info)
+        result[info.id] = PluginManifestEntry(info=info, module_name=_module_name(package))
+
+    if stale or packages.keys() != cached_packages.keys():
+        _write_manifest({"version": _MANIFEST_VERSION, "shared": shared, "packages": packages})
+    return result, errors
+
+
+def refresh_plugin_entry(
+    package: str, reload_modules: bool
+) -> tuple[PluginManifestEntry | None, PluginLoadError | None]:
+    """
+    Recompute one plugin's manifest entry after its files changed, leaving
+    every other entry alone. With reload_modules, the package's modules
+    that are already imported are reloaded first, plugin.py last.
+    """
+    module_name = _module_name(package)
+    package_dir = _PLUGINS_DIR / package
+    try:
+        if reload_modules:
+            reload_package_modules(package)
+        info = load_factory(module_name).PluginInfo()
+    except Exception as exc:
+        return None, PluginLoadError(package=package, module_name=module_name, message=f"{type(exc).__name__}: {exc}")
+
+    manifest = _read_manifest()
+    shared = _fingerprint(_PLUGINS_DIR, recursive=False)
+    if manifest.get("shared") == shared:
+        packages = manifest.get("packages", {})
+        packages[package] = {
+            "fingerprint": _fingerprint(package_dir, recursive=True),
+            "info": _info_to_dict(info),
+        }
+        _write_manifest({"version": _MANIFEST_VERSION, "shared": shared, "packages": packages})
+    return PluginManifestEntry(info=info, module_name=module_name), None
+
+
+def reload_package_modules(package: str) -> None:
+    prefix = f"{_PLUGINS_PKG}.{package}."
+    module_name = _module_name(package)
+    for name in sorted(name for name in list(sys.modules) if name.startswith(prefix) and name != module_name):
+        importlib.reload(sys.modules[name])
+    if module_name in sys.modules:
+        importlib.reload(sys.modules[module_name])
+
+
+def _module_name(package: str) -> str:
+    return f"{_PLUGINS_PKG}.{package}.plugin"
+
+
+def _load_infos(
+    modules: dict[str, str], timeout_s: float
+) -> tuple[dict[str, PluginInfo], list[PluginLoadError]]:
+    """
+    Import modules (package -> module name) on one thread each and collect
+    their PluginInfo. All plugins start at once, so the wall time is that
+    of the slowest one, capped at timeout_s.
+
+    The threads are daemons rather than a ThreadPoolExecutor, whose workers
+    are joined at exit: a plugin that hangs must not keep the app open.
+    """
+    infos: dict[str, PluginInfo] = {}
+    errors: list[PluginLoadError] = []
+    futures: dict[str, Future[PluginInfo]] = {}
+    for package, module_name in modules.items():
+        future: Future[PluginInfo] = Future()
+        threading.Thread(
+            target=_describe,
+            args=(module_name, future),
+            name=f"plugin-discovery-{package}",
+            daemon=True,
+        ).start()
+        futures[package] = future
+    deadline = time.monotonic() + timeout_s
+    for package, future in futures.items():
+        module_name = modules[package]
+        try:
+            infos[package] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            message = f"Timed out after {timeout_s:g} s."
+            errors.append(PluginLoadError(package=package, module_name=module_name, message=message))
+        except Exception as exc:
+            message = f"{type(exc).__name__}: {exc}"
+            errors.append(PluginLoadError(package=package, module_name=module_name, message=message))
+    return infos, errors
+
+
+def _describe(module_name: str, future: Future[PluginInfo]) -> None:
+    try:
+        future.set_result(load_factory(module_name).PluginInfo())
+    except BaseException as exc:
+        future.set_exception(exc)
+
+
+def load_factory(module_name: str) -> Type[PluginFactory]:
+    module = importlib.import_module(module_name)
+    factory = getattr(module, "PLUGIN_FACTORY", None)
+    if factory is None:
+        raise RuntimeError(
+            f"Plugin module '{module_name}' must define a 'PLUGIN_FACTORY' variable."
+        )
+    return factory
+
+
+def _fingerprint(directory: Path, recursive: bool) -> Fingerprint:
+    paths = directory.rglob("*") if recursive else directory.iterdir()
+    entries: Fingerprint = []
+    for path in paths:
+        if path.suffix not in _TRACKED_SUFFIXES or "__pycache__" in path.parts:
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((path.relative_to(directory).as_posix(), stat.st_mtime_ns, stat.st_size))
+    entries.sort()
+    return entries
+
+
+def _read_manifest() -> dict[str, Any]:
+    try:
+        raw = json.loads(_MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(raw, dict) or raw.get("version") != _MANIFEST_VERSION:
+        return {}
+    # JSON turns the fingerprint tuples into lists; compare like with like.
+    raw["shared"] = [tuple(entry) for entry in raw.get("shared", [])]
+    for record in raw.get("packages", {}).values():
+        record["fingerprint"] = [tuple(entry) for entry in record.get("fingerprint", [])]
+    return raw
+
+
+def _write_manifest(manifest: dict[str, Any]) -> None:
+    try:
+        _MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(_MANIFEST_PATH, json.dumps(manifest, indent=1, ensure_ascii=False).encode("utf-8"))
+    except OSError:
+        pass  # A read-only working directory just means no cache.
+
+
+def _info_to_dict(info: PluginInfo) -> dict[str, Any]:
+    mode = info.mode
+    if isinstance(mode, Difficulty):
+        mode_dict: dict[str, Any] = {
+            "difficulty": {"max_level": mode.max_level, "required_streak": mode.required_streak}
+        }
+    else:
+        mode_dict = {
+            "chapters": [
+                {"name": chapter.name, "required_streak": chapter.required_streak}
+                for chapter in mode
+            ]
+        }
+    icon = info.icon
+    icon_dict = {"emoji": icon.symbol} if isinstance(icon, EmojiIcon) else {"file": str(icon.path)}
+    buttons = info.accepted_answer_buttons
+    return {
+        "id": info.id,
+        "name": info.name,
+        "description": info.description,
+        "mode": mode_dict,
+        "icon": icon_dict,
+        "required_streak": info.required_streak,
+        "accepted_answer_buttons": None if buttons is None else [button.name for button in buttons],
+    }
+
+
+def _info_from_dict(raw: Any) -> PluginInfo | None:
+    """
+    Rebuild a PluginInfo from the manifest; None if the record is unusable.
+    """
+    try:
+        mode_raw = raw["mode"]
+        if "difficulty" in mode_raw:
+            difficulty = mode_raw["difficulty"]
+            mode: Any = Difficulty(
+                max_level=int(difficulty["max_level"]),
+                required_streak=difficulty.get("required_streak"),
+            )
+        else:
+            mode = [
+                Chapter(name=str(chapter["name"]), required_streak=chapter.get("required_streak"))
+                for chapter in mode_raw["chapters"]
+            ]
+        icon_raw = raw["icon"]
+        icon = EmojiIcon(icon_raw["emoji"]) if "emoji" in icon_raw else FileIcon(Path(icon_raw["file"]))
+        buttons = raw.get("accepted_answer_buttons")
+        return PluginInfo(
+            id=str(raw["id"]),
+            name=str(raw["name"]),
+            description=str(raw["description"]),
+            mode=mode,
+            icon=icon,
+            required_streak=raw.get("required_streak"),
+            accepted_answer_buttons=None if buttons is None else [AnswerButton[name] for name in buttons],
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
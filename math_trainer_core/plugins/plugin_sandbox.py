@@ -0,0 +1,529 @@
+from __future__ import annotations
+
+import atexit
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from pathlib import Path
+from typing import Any, BinaryIO, List
+
+from ..api_types import QuestionContent
+from .partial_answer import PartialAnswerChecker
+from .plugin_api import AnswerResult, Plugin, Question, QuestionResult
+from .plugin_host import (
+    OP_ANSWER,
+    OP_CLOSE,
+    OP_CREATE,
+    OP_DISCARD,
+    OP_DROP,
+    OP_DUMP_STATE,
+    OP_LOAD_STATE,
+    OP_MAKE,
+    OP_RELOAD_DATA,
+    OP_RESET,
+    OP_REVEAL,
+    read_frame,
+    write_frame,
+)
+
+
+_SANDBOX_ENV = "MATH_TRAINER_PLUGIN_SANDBOX"
+# Not "-m plugin_host": the core package would import that module first.
+_HOST_COMMAND = "import sys; from math_trainer_core.plugins.plugin_host import main; sys.exit(main())"
+_PACKAGE_ROOT = Path(__file__).resolve().parents[2]
+# Questions are made this many at a time, and the next batch is requested
+# once half of the current one is used, so make_question rarely waits.
+_BATCH_SIZE = 8
+DEFAULT_CALL_TIMEOUT_S = 5.0
+# How long make_question waits for a batch before it hands out a
+# placeholder that fills itself in once the batch arrives.
+_QUESTION_WAIT_S = 0.1
+
+
+def sandbox_enabled() -> bool:
+    """
+    True when MATH_TRAINER_PLUGIN_SANDBOX asks for plugins to run in a
+    separate plugin host process.
+    """
+    return os.environ.get(_SANDBOX_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class PluginHostError(RuntimeError):
+    pass
+
+
+class _Ticket:
+    """
+    The pending response to one request. The host must answer it before
+    deadline (a time.monotonic() value) or is considered stuck.
+    """
+
+    __slots__ = ("done", "value", "error", "deadline")
+
+    def __init__(self, deadline: float) -> None:
+        self.done = False
+        self.value: Any = None
+        self.error: str | None = None
+        self.deadline = deadline
+
+
+class PluginHostSupervisor:
+    """
+    Owns the plugin host process: starts it on first use, pipelines
+    requests to it and restarts it after it crashed or stopped answering.
+
+    Each (re)start bumps generation; plugin handles and question ids only
+    mean something to the host generation that created them.
+
+    A reader thread matches responses to tickets as they arrive, so waiting
+    for one releases the lock and nobody has to wait to keep the host's
+    responses moving.
+    """
+
+    def __init__(self, timeout_s: float = DEFAULT_CALL_TIMEOUT_S):
+        self.timeout_s = timeout_s
+        self.generation = 0
+        self.restarts = 0
+        self.lock = threading.RLock()
+        self._answered = threading.Condition(self.lock)
+        self._process: subprocess.Popen[bytes] | None = None
+        self._writer: BinaryIO | None = None
+        self._pending: deque[_Ticket] = deque()
+        # Filled by finalizers, possibly on any thread; sent with the next request.
+        self._dropped_questions: list[tuple[int, int]] = []
+        self._closed_plugins: list[tuple[int, int]] = []
+
+    def running_generation(self) -> int:
+        """
+        Start the host if it is not running and return its generation.
+        """
+        with self.lock:
+            if self._process is None:
+                self._start()
+            return self.generation
+
+    def send(self, op: str, *args: Any) -> _Ticket:
+        """
+        Queue a request without waiting for its response.
+        """
+        with self.lock:
+            generation = self.running_generation()
+            frames: list[tuple[str, tuple]] = []
+            dropped, self._dropped_questions = self._dropped_questions, []
+            question_ids = [question_id for gen, question_id in dropped if gen == generation]
+            if question_ids:
+                frames.append((OP_DROP, (question_ids,)))
+            closed, self._closed_plugins = self._closed_plugins, []
+            frames.extend((OP_CLOSE, (handle,)) for gen, handle in closed if gen == generation)
+            frames.append((op, args))
+
+            deadline = time.monotonic() + self.timeout_s
+            tickets = [_Ticket(deadline) for _ in frames]
+            try:
+                for frame in frames:
+                    write_frame(self._writer, frame)
+                self._writer.flush()
+            except (OSError, ValueError):
+                self._fail("The plugin host stopped.")
+                raise PluginHostError("The plugin host stopped.") from None
+            self._pending.extend(tickets)
+            return tickets[-1]
+
+    def wait(self, ticket: _Ticket) -> Any:
+        """
+        Block until the ticket is answered (or its deadline restarts the
+        host) and return the value.
+        """
+        self.wait_done(ticket, self.timeout_s)
+        return self.result(ticket)
+
+    def wait_done(self, ticket: _Ticket, timeout_s: float) -> bool:
+        """
+        Wait up to timeout_s for the ticket and return whether it is done.
+        The lock is released while waiting. Passing the ticket's deadline
+        gives up on the host, failing the ticket.
+        """
+        with self._answered:
+            end = time.monotonic() + timeout_s
+            while not ticket.done:
+                now = time.monotonic()
+                if now >= ticket.deadline:
+                    self._fail(f"A plugin did not answer within {self.timeout_s:g} s.")
+                    break
+                if now >= end:
+                    break
+                self._answered.wait(min(end, ticket.deadline) - now)
+            return ticket.done
+
+    @staticmethod
+    def result(ticket: _Ticket) -> Any:
+        if ticket.error is not None:
+            raise PluginHostError(ticket.error)
+        return ticket.value
+
+    def call(self, op: str, *args: Any) -> Any:
+        return self.wait(self.send(op, *args))
+
+    def drop_question_later(self, generation: int, question_id: int) -> None:
+        self._dropped_questions.append((generation, question_id))
+
+    def close_plugin_later(self, generation: int, handle: int) -> None:
+        self._closed_plugins.append((generation, handle))
+
+    def close(self) -> None:
+        with self.lock:
+            process = self._process
+            self._fail("The plugin host was closed.", kill=False)
+        if process is not None:
+            try:
+                process.wait(timeout=1.0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _start(self) -> None:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(_PACKAGE_ROOT), env.get("PYTHONPATH")]))
+        try:
+            process = subprocess.Popen(
+                [sys.executable, "-c", _HOST_COMMAND],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                env=env,
+            )
+        except OSError as exc:
+            raise PluginHostError(f"Could not start the plugin host: {exc}") from exc
+        if self.generation:
+            self.restarts += 1
+        self.generation += 1
+        self._process = process
+        self._writer = process.stdin
+        threading.Thread(
+            target=self._read_responses,
+            args=(process.stdout, self.generation),
+            name=f"plugin-host-reader-{self.generation}",
+            daemon=True,
+        ).start()
+
+    def _read_responses(self, reader: BinaryIO, generation: int) -> None:
+        # Only the running host's responses count; once it failed or was
+        # replaced, whatever its reader still delivers is ignored.
+        try:
+            while True:
+                status, value = read_frame(reader)
+                with self._answered:
+                    if generation != self.generation or self._process is None or not self._pending:
+                        return
+                    answered = self._pending.popleft()
+                    answered.done = True
+                    if status == "ok":
+                        answered.value = value
+                    else:
+                        answered.error = value
+                    self._answered.notify_all()
+        except (EOFError, OSError, ValueError):
+            with self._answered:
+                if generation == self.generation and self._process is not None:
+                    self._fail("The plugin host stopped.")
+
+    def _fail(self, message: str, kill: bool = True) -> None:
+        """
+        Give up on the running host and fail every pending request. The next
+        request starts a new host. Without kill, the host is left to exit
+        on its own once it sees its input close.
+        """
+        process, self._process = self._process, None
+        if process is not None:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            if kill and process.poll() is None:
+                process.kill()
+                process.wait()
+        while self._pending:
+            ticket = self._pending.popleft()
+            ticket.done = True
+            ticket.error = message
+        self._answered.notify_all()
+
+
+_HANDLE_IDS = itertools.count(1)
+
+
+class RemotePlugin(Plugin):
+    """
+    A plugin running in the plugin host, seen through the Plugin interface.
+
+    Questions are made in batches ahead of time, so a question costs the
+    core one round trip (for its answer) instead of three. When a batch is
+    late, make_question returns a placeholder instead of blocking the
+    caller. If the host fails, the session gets a question explaining that,
+    and the next call runs on a restarted host.
+    """
+
+    def __init__(self, supervisor: PluginHostSupervisor, module_name: str):
+        self._supervisor = supervisor
+        self._module_name = module_name
+        self._handle = next(_HANDLE_IDS)
+        self._generation = 0
+        self._create: _Ticket | None = None
+        self._level: int | None = None
+        self._ready: deque[tuple[int, QuestionContent, PartialAnswerChecker | None]] = deque()
+        self._prefetch: _Ticket | None = None
+        self._current: int | None = None
+        self._finalizer: weakref.finalize | None = None
+        # The user state last loaded or dumped, given to a restarted host.
+        self._state: tuple[bytes | None] | None = None
+
+    def make_question(self, difficulty_or_chapter: int) -> Question:
+        with self._supervisor.lock:
+            try:
+                ticket = self._batch_ticket(difficulty_or_chapter)
+                if ticket is None:
+                    return self._pop_question(difficulty_or_chapter)
+            except PluginHostError as exc:
+                self._forget_batches()
+                return _FailedQuestion(str(exc))
+        if self._supervisor.wait_done(ticket, _QUESTION_WAIT_S):
+            return self._take_batch(ticket, difficulty_or_chapter)
+        return _PendingQuestion(self, ticket, difficulty_or_chapter)
+
+    def reset(self) -> None:
+        with self._supervisor.lock:
+            if self._generation == self._supervisor.generation:
+                try:
+                    self._supervisor.send(OP_DISCARD, self._handle, [self._current])
+                    self._supervisor.send(OP_RESET, self._handle)
+                except PluginHostError:
+                    pass
+            self._forget_batches()
+
+    def reload_data(self, changed_files: List[Path]) -> bool:
+        with self._supervisor.lock:
+            if self._generation != self._supervisor.generation:
+                return True  # A new host reads the files afresh anyway.
+            try:
+                self._supervisor.send(OP_DISCARD, self._handle, [self._current])
+                reloaded = bool(self._supervisor.call(OP_RELOAD_DATA, self._handle, changed_files))
+            except PluginHostError:
+                reloaded = False
+            self._forget_batches()
+            return reloaded
+
+    def load_state(self, data: bytes | None) -> None:
+        with self._supervisor.lock:
+            self._state = (data,)
+            if self._generation == self._supervisor.generation:
+                try:
+                    self._supervisor.send(OP_DISCARD, self._handle, [])
+                    self._supervisor.send(OP_LOAD_STATE, self._handle, data)
+                except PluginHostError:
+                    pass
+                self._forget_batches()
+
+    def dump_state(self) -> bytes | None:
+        with self._supervisor.lock:
+            if self._state is None:
+                return None
+            if self._generation == self._supervisor.generation:
+                try:
+                    self._state = (self._supervisor.call(OP_DUMP_STATE, self._handle),)
+                except PluginHostError:
+                    pass  # Keep what we had.
+            return self._state[0]
+
+    def _batch_ticket(self, level: int) -> _Ticket | None:
+        """
+        The batch to wait for before a question of level can be handed out,
+        or None if one is ready.
+        """
+        self._ensure_created()
+        if level != self._level:
+            if self._level is not None:
+                self._supervisor.send(OP_DISCARD, self._handle, [])
+                self._forget_batches()
+            self._level = level
+        if self._ready:
+            return None
+        ticket = self._prefetch or self._supervisor.send(OP_MAKE, self._handle, level, _BATCH_SIZE)
+        self._prefetch = None
+        return ticket
+
+    def _take_batch(self, ticket: _Ticket, level: int) -> Question:
+        """
+        Turn an answered batch ticket into the next question.
+        """
+        with self._supervisor.lock:
+            try:
+                # Responses come in order, so the create is answered too.
+                if self._create is not None and self._create.done:
+                    create, self._create = self._create, None
+                    try:
+                        self._supervisor.result(create)
+                    except PluginHostError:
+                        self._generation = 0  # Create it again next time.
+                        raise
+                batch = self._supervisor.result(ticket)
+            except PluginHostError as exc:
+                self._forget_batches()
+                return _FailedQuestion(str(exc))
+            if level != self._level:
+                # The session that asked for it has moved on.
+                return RemoteQuestion(self._supervisor, self._generation, *batch[0])
+            self._ready.extend(batch)
+            return self._pop_question(level)
+
+    def _pop_question(self, level: int) -> Question:
+        question_id, content, checker = self._ready.popleft()
+        if len(self._ready) <= _BATCH_SIZE // 2 and self._prefetch is None:
+            self._prefetch = self._supervisor.send(OP_MAKE, self._handle, level, _BATCH_SIZE)
+        self._current = question_id
+        return RemoteQuestion(self._supervisor, self._generation, question_id, content, checker)
+
+    def _ensure_created(self) -> None:
+        generation = self._supervisor.running_generation()
+        if generation == self._generation:
+            return
+        self._forget_batches()
+        self._create = self._supervisor.send(OP_CREATE, self._handle, self._module_name)
+        if self._state is not None:
+            self._supervisor.send(OP_LOAD_STATE, self._handle, self._state[0])
+        self._generation = generation
+        if self._finalizer is not None:
+            self._finalizer.detach()
+        self._finalizer = weakref.finalize(
+            self, self._supervisor.close_plugin_later, generation, self._handle
+        )
+
+    def _forget_batches(self) -> None:
+        # Responses to a forgotten prefetch are still read, then ignored.
+        self._ready.clear()
+        self._prefetch = None
+
+
+class RemoteQuestion(Question):
+    def __init__(
+        self,
+        supervisor: PluginHostSupervisor,
+        generation: int,
+        question_id: int,
+        content: QuestionContent,
+        checker: PartialAnswerChecker | None = None,
+    ):
+        self._supervisor = supervisor
+        self._generation = generation
+        self._question_id = question_id
+        self._content = content
+        self._checker = checker
+        weakref.finalize(self, supervisor.drop_question_later, generation, question_id)
+
+    def read_question(self) -> QuestionContent:
+        return self._content
+
+    def answer_question(self, answer: str) -> QuestionResult:
+        return self._call(OP_ANSWER, self._question_id, answer)
+
+    def reveal_answer(self) -> QuestionResult:
+        return self._call(OP_REVEAL, self._question_id)
+
+    def check_partial_answer(self, partial: str) -> bool | None:
+        # Checked here, without the host; None for a question that sent no
+        # checker, which the core takes as no opinion.
+        return None if self._checker is None else self._checker(partial)
+
+    def _call(self, op: str, *args: Any) -> QuestionResult:
+        with self._supervisor.lock:
+            if self._supervisor.generation != self._generation:
+                return _failure_result("The training was restarted.")
+            try:
+                return self._supervisor.call(op, *args)
+            except PluginHostError as exc:
+                return _failure_result(str(exc))
+
+
+class _PendingQuestion(Question):
+    """
+    Stands in for a question whose batch the plugin host is still making.
+    It turns into the real question once the batch arrives; until then the
+    core sees content_ready() return False and keeps the input closed.
+    """
+
+    def __init__(self, plugin: RemotePlugin, ticket: _Ticket, level: int):
+        self._plugin = plugin
+        self._ticket = ticket
+        self._level = level
+        self._question: Question | None = None
+
+    def content_ready(self) -> bool:
+        if self._question is None:
+            if not self._plugin._supervisor.wait_done(self._ticket, 0.0):
+                return False
+            self._question = self._plugin._take_batch(self._ticket, self._level)
+        return True
+
+    def read_question(self) -> QuestionContent:
+        if self.content_ready():
+            return self._question.read_question()
+        return QuestionContent(question_text="Preparing the question... ⏳")
+
+    def answer_question(self, answer: str) -> QuestionResult:
+        if self.content_ready():
+            return self._question.answer_question(answer)
+        return QuestionResult(result=AnswerResult.INVALID_INPUT, display_answer_text="")
+
+    def reveal_answer(self) -> QuestionResult:
+        if self.content_ready():
+            return self._question.reveal_answer()
+        return _failure_result("The question was not ready yet.")
+
+    def check_partial_answer(self, partial: str) -> bool | None:
+        if self.content_ready():
+            check_fn = getattr(self._question, "check_partial_answer", None)
+            return check_fn(partial) if callable(check_fn) else None
+        return None
+
+
+class _FailedQuestion(Question):
+    """
+    Stands in for a question the plugin host could not make.
+    """
+
+    def __init__(self, message: str):
+        self._message = message
+
+    def read_question(self) -> QuestionContent:
+        return QuestionContent(question_text=f"This training ran into a problem. 🛠️\n{self._message}")
+
+    def answer_question(self, answer: str) -> QuestionResult:
+        return _failure_result(self._message)
+
+    def reveal_answer(self) -> QuestionResult:
+        return _failure_result(self._message)
+
+
+def _failure_result(message: str) -> QuestionResult:
+    return QuestionResult(
+        result=AnswerResult.WRONG,
+        display_answer_text=f"{message} Press Next to try again.",
+    )
+
+
+_SUPERVISOR: PluginHostSupervisor | None = None
+_SUPERVISOR_LOCK = threading.Lock()
+
+
+def sandboxed_plugin(module_name: str) -> Plugin:
+    """
+    Create the plugin defined in module_name inside the shared plugin host.
+    """
+    global _SUPERVISOR
+    with _SUPERVISOR_LOCK:
+        if _SUPERVISOR is None:
+            _SUPERVISOR = PluginHostSupervisor()
+            atexit.register(_SUPERVISOR.close)
+        return RemotePlugin(_SUPERVISOR, module_name)
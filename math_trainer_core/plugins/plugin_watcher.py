@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable
+
+from .plugin_loader import reload_plugin
+from .plugin_manifest import PluginLoadError
+
+
+_PLUGINS_PKG = "math_trainer_core.plugins"
+_PLUGINS_DIR = Path(__file__).resolve().parent
+_WATCHED_SUFFIXES = (".py", ".json")
+_POLL_INTERVAL_S = 1.0
+# Editors save in several steps; wait this long for a burst to settle.
+_SETTLE_S = 0.1
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ISDIR = 0x40000000
+_IN_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_IN_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    """
+    Linux inotify through libc, watching the plugins directory and each
+    plugin package directory.
+    """
+
+    def __init__(self, libc: ctypes.CDLL):
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, Path] = {}
+        self._watch(_PLUGINS_DIR)
+        for path in _PLUGINS_DIR.iterdir():
+            if path.is_dir() and path.name != "__pycache__":
+                self._watch(path)
+
+    @staticmethod
+    def create() -> _Inotify | None:
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            return _Inotify(libc)
+        except (OSError, AttributeError):
+            return None
+
+    def _watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _IN_MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+
+    def wait(self, timeout_s: float | None) -> set[Path]:
+        readable, _, _ = select.select([self._fd], [], [], timeout_s)
+        if not readable:
+            return set()
+        changed: set[Path] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            pos = 0
+            while pos + _IN_EVENT.size <= len(data):
+                wd, mask, _, name_len = _IN_EVENT.unpack_from(data, pos)
+                pos += _IN_EVENT.size
+                name = data[pos:pos + name_len].rstrip(b"\0")
+                pos += name_len
+                directory = self._dirs.get(wd)
+                if directory is None or not name:
+                    continue
+                path = directory / os.fsdecode(name)
+                if mask & _IN_ISDIR:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO) and directory == _PLUGINS_DIR:
+                        self._watch(path)
+                    continue
+                changed.add(path)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _Poller:
+    """
+    Fallback: compare mtime and size of every watched file once a second.
+    """
+
+    def __init__(self) -> None:
+        self._stats = self._scan()
+
+    @staticmethod
+    def _scan() -> dict[Path, tuple[int, int]]:
+        stats: dict[Path, tuple[int, int]] = {}
+        for directory in [_PLUGINS_DIR, *(p for p in _PLUGINS_DIR.iterdir() if p.is_dir())]:
+            for path in directory.iterdir():
+                if path.suffix not in _WATCHED_SUFFIXES:
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                stats[path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def wait(self, timeout_s: float | None) -> set[Path]:
+        time.sleep(_POLL_INTERVAL_S if timeout_s is None else min(timeout_s, _POLL_INTERVAL_S))
+        stats = self._scan()
+        changed = {path for path in stats.keys() | self._stats.keys() if stats.get(path) != self._stats.get(path)}
+        self._stats = stats
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class PluginWatcher:
+    """
+    Reloads plugins whose files change on disk, one package at a time.
+
+    A changed chapter file is handed to the warm plugin instance to re-read
+    (see Plugin.reload_data); changed plugin code reloads that plugin's
+    modules only. Shared modules in plugins/ are not reloaded: other
+    plugins and the core hold their classes (e.g. isinstance checks on
+    PartialAnswerChecker), so a change there is reported as needing a
+    restart. Training sessions already running keep going.
+    """
+
+    def __init__(self) -> None:
+        # Latest failed reload per package, until that package reloads fine.
+        self._errors: dict[str, PluginLoadError] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="plugin-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def errors(self) -> list[PluginLoadError]:
+        return list(self._errors.values())
+
+    def _run(self) -> None:
+        source = _Inotify.create() or _Poller()
+        try:
+            while not self._stop.is_set():
+                changed = source.wait(timeout_s=_POLL_INTERVAL_S)
+                if not changed:
+                    continue
+                time.sleep(_SETTLE_S)
+                changed |= source.wait(timeout_s=0)
+                self.apply(changed)
+        finally:
+            source.close()
+
+    def apply(self, changed: set[Path]) -> None:
+        by_package: dict[str, list[Path]] = defaultdict(list)
+        shared: list[Path] = []
+        for path in changed:
+            if path.suffix not in _WATCHED_SUFFIXES or path.name.endswith(".tmp"):
+                continue
+            if path.parent == _PLUGINS_DIR:
+                shared.append(path)
+            elif path.parent.parent == _PLUGINS_DIR:
+                by_package[path.parent.name].append(path)
+
+        for path in shared:
+            module_name = f"{_PLUGINS_PKG}.{path.stem}"
+            if path.suffix == ".py" and module_name in sys.modules:
+                self._errors[path.stem] = PluginLoadError(
+                    package=path.stem,
+                    module_name=module_name,
+                    message="Changed on disk; restart the app to use the new version.",
+                )
+
+        for package, paths in by_package.items():
+            self._run_reload(package, lambda: reload_plugin(package, paths))
+
+    def _run_reload(self, name: str, action: Callable[[], object]) -> None:
+        try:
+            result = action()
+        except Exception as exc:
+            result = PluginLoadError(
+                package=name,
+                module_name=f"{_PLUGINS_PKG}.{name}",
+                message=f"{type(exc).__name__}: {exc}",
+            )
+        if isinstance(result, PluginLoadError):
+            self._errors[name] = result
+        else:
+            self._errors.pop(name, None)
+
+
+_WATCHER: PluginWatcher | None = None
+
+
+def start_plugin_watcher() -> PluginWatcher:
+    """
+    Start the process-wide watcher once; later calls return it.
+    """
+    global _WATCHER
+    if _WATCHER is None:
+        _WATCHER = PluginWatcher()
+        _WATCHER.start()
+    return _WATCHER
+
+
+def plugin_reload_errors() -> list[PluginLoadError]:
+    """
+    Plugins whose last hot reload failed (they keep their previous code).
+    """
+    return _WATCHER.errors() if _WATCHER is not None else []
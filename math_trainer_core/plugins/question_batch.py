@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import random
+from array import array
+from typing import Any, Callable, Sequence, Union, overload
+
+try:
+    import numpy as np
+except ImportError:  # Optional; batches then come from the random module.
+    np = None
+
+from .plugin_api import Plugin, Question
+
+
+# A column of n ints: a NumPy array when NumPy is installed, else an
+# array("q"). Plugins only pass columns back into this module, or read
+# items from them.
+Column = Any
+Bound = Union[int, Column]
+
+_RNG = np.random.default_rng() if np is not None else None
+
+
+def vectorized() -> bool:
+    """
+    True when columns are NumPy arrays, so whole batches cost a few array
+    operations instead of n calls into the random module.
+    """
+    return np is not None
+
+
+class QuestionBatch(Sequence[Question]):
+    """
+    n questions, each made from one item of every column when it is first
+    accessed; a million-question batch is only its columns until then.
+    """
+
+    def __init__(self, make: Callable[..., Question], *columns: Sequence[Any]):
+        self._make = make
+        self._columns = columns
+        self._length = len(columns[0]) if columns else 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> Question: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Question]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("question index out of range")
+        return self._make(*(column[index] for column in self._columns))
+
+
+def make_questions(plugin: Plugin, level: int, count: int) -> Sequence[Question]:
+    """
+    count questions for level: plugin.make_questions if the plugin has it,
+    else count calls to make_question.
+    """
+    make_fn = getattr(plugin, "make_questions", None)
+    if callable(make_fn):
+        return make_fn(level, count)
+    return [plugin.make_question(level) for _ in range(count)]
+
+
+def random_ints(count: int, low: Bound, high: Bound) -> Column:
+    """
+    count random ints, item i uniform in [low, high] (both inclusive).
+    Either bound may be a column, giving per-item bounds.
+    """
+    if np is not None:
+        return _RNG.integers(low, np.add(high, 1), size=count)
+    if isinstance(low, int) and isinstance(high, int):
+        return array("q", random.choices(range(low, high + 1), k=count))
+    lows = low if not isinstance(low, int) else [low] * count
+    highs = high if not isinstance(high, int) else [high] * count
+    rand = random.random
+    return array("q", [lo + int(rand() * (hi - lo + 1)) for lo, hi in zip(lows, highs)])
+
+
+def weighted_indices(count: int, weights: Sequence[float]) -> Column:
+    """
+    count indices into weights, each index drawn with probability
+    proportional to its weight. Zero weights are never drawn.
+    """
+    if np is not None:
+        cumulative = np.cumsum(weights)
+        return np.searchsorted(cumulative, _RNG.random(count) * cumulative[-1], side="right")
+    return array("q", random.choices(range(len(weights)), weights=weights, k=count))
+
+
+def divide(column: Column, divisor: int) -> tuple[Column, Column]:
+    """
+    (item // divisor, item % divisor) for every item of column, as two
+    columns.
+    """
+    if np is not None:
+        return np.divmod(column, divisor)
+    return (
+        array("q", [value // divisor for value in column]),
+        array("q", [value % divisor for value in column]),
+    )
+
+
+def affine(column: Column, scale: int, offset: int) -> Column:
+    """
+    scale * item + offset for every item of column.
+    """
+    if np is not None:
+        return column * scale + offset
+    return array("q", [value * scale + offset for value in column])
+
+
+def random_orders(count: int, size: int) -> Column:
+    """
+    count rows, each 0..size-1 in random order (a count x size column of
+    rows).
+    """
+    if np is not None:
+        return np.argsort(_RNG.random((count, size)), axis=1).astype(np.int8 if size < 128 else np.int32)
+    orders = []
+    for _ in range(count):
+        order = array("b" if size < 128 else "i", range(size))
+        random.shuffle(order)
+        orders.append(order)
+    return orders
+
+
+def random_int_rows(count: int, size: int, low: int, high: int) -> Column:
+    """
+    count rows of size random ints in [low, high].
+    """
+    if np is not None:
+        return _RNG.integers(low, high + 1, size=(count, size))
+    values = random.choices(range(low, high + 1), k=count * size)
+    return [array("q", values[start:start + size]) for start in range(0, count * size, size)]
@@ -0,0 +1 @@
+"""Command-line maintenance tools (run with python -m math_trainer_core.tools.<name>)."""
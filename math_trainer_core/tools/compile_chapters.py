@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from ..core.chapter_file import compile_chapter
+
+
+_PLUGINS_DIR = Path(__file__).resolve().parent.parent / "plugins"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compile chapter JSON files into .chapter files that load without parsing."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        type=Path,
+        help="chapter files or directories to search (default: all plugins)",
+    )
+    args = parser.parse_args(argv)
+
+    sources: list[Path] = []
+    for path in args.paths or [_PLUGINS_DIR]:
+        sources.extend(sorted(path.rglob("*.json")) if path.is_dir() else [path])
+
+    failed = 0
+    for source in sources:
+        try:
+            target = compile_chapter(source)
+        except (OSError, ValueError) as exc:
+            failed += 1
+            print(f"Skipped {source}: {exc}")
+            continue
+        print(f"Compiled {source} -> {target.name}")
+    return 1 if failed and args.paths else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import socket
+import socketserver
+import threading
+
+from ..core import kv_protocol as kv
+
+
+class KVStore:
+    """
+    In-memory key-value data behind the stand-in server.
+    """
+
+    def __init__(self) -> None:
+        self._data: dict[bytes, bytearray] = {}
+        self._lock = threading.Lock()
+
+    def execute(self, command: kv.Command) -> bytes:
+        op, key, value = command
+        with self._lock:
+            if op == kv.OP_GET:
+                stored = self._data.get(key)
+                return _found(bytes(stored)) if stored is not None else kv.encode_response(kv.STATUS_NOT_FOUND)
+            if op == kv.OP_SET:
+                self._data[key] = bytearray(value)
+                return _found(b"")
+            if op == kv.OP_APPEND:
+                stored = self._data.setdefault(key, bytearray())
+                stored += value
+                return _found(kv.pack_length(len(stored)))
+            if op == kv.OP_GETRANGE:
+                stored = self._data.get(key)
+                if stored is None:
+                    return kv.encode_response(kv.STATUS_NOT_FOUND)
+                return _found(bytes(stored[kv.unpack_length(value):]))
+            if op == kv.OP_KEYS:
+                matches = sorted(k for k in self._data if k.startswith(key))
+                return _found(b"\n".join(matches))
+        return kv.encode_response(kv.STATUS_ERROR, f"Unknown op {op}.".encode("utf-8"))
+
+
+def _found(payload: bytes) -> bytes:
+    return kv.encode_response(kv.STATUS_OK, payload)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: KVServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self) -> None:
+        while True:
+            try:
+                command = kv.read_request(self.rfile)
+            except (kv.KVError, OSError):
+                return
+            if command is None:
+                return
+            self.wfile.write(self.server.store.execute(command))
+
+
+class KVServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple[str, int], store: KVStore | None = None):
+        super().__init__(address, _Handler)
+        self.store = store if store is not None else KVStore()
+
+
+def start_local_kv_server(host: str = "127.0.0.1", port: int = 0) -> KVServer:
+    """
+    Serve an empty in-memory store on a background thread, e.g. for tests.
+
+    Port 0 picks a free port; read it back from server.server_address.
+    Call server.shutdown() to stop it.
+    """
+    server = KVServer((host, port))
+    threading.Thread(target=server.serve_forever, name="kv-server", daemon=True).start()
+    return server
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Stand-in key-value server for MATH_TRAINER_STORAGE=kv://host:port."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7379)
+    args = parser.parse_args(argv)
+
+    with KVServer((args.host, args.port)) as server:
+        host, port = server.server_address[:2]
+        print(f"Serving on kv://{host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
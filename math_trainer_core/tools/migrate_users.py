@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import argparse
+
+from ..core.user import compact_user, list_unsharded_user_names, load_user, rebuild_name_manifest
+
+
+def migrate_users(verbose: bool = False) -> int:
+    """
+    Move every profile stored directly in users/ into its hash shard.
+
+    Safe to run while the app is in use: each user is moved under that user's
+    profile lock by writing a fresh snapshot into the shard, and readers fall
+    back to the flat path until the move has happened. Returns the number of
+    users moved.
+    """
+    moved = 0
+    for name in list_unsharded_user_names():
+        # Loading converts a legacy JSON profile straight into its shard.
+        if load_user(name) is None:
+            continue
+        if not compact_user(name):
+            continue
+        moved += 1
+        if verbose:
+            print(f"moved {name}")
+    rebuild_name_manifest()
+    return moved
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Migrate users/ to the hash-sharded layout and rebuild the name manifest."
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="print each migrated user")
+    args = parser.parse_args(argv)
+    moved = migrate_users(verbose=args.verbose)
+    print(f"Migrated {moved} user(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
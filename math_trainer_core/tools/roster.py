@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Iterator, TextIO
+
+from ..api_types import AuthError, Unlocked
+from ..core.user import create_users, list_user_names, load_user
+
+
+_EXPORT_FIELDS = ["user", "training_id", "difficulty", "time_pressure", "state", "mastery_level", "score"]
+_EXPORT_CHUNK_SIZE = 256
+
+
+def read_roster(path: Path) -> list[str]:
+    """
+    Read student names from a CSV file.
+
+    Uses the "name" column when the file has one, otherwise the first column
+    of every row. Blank rows are skipped.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        rows = list(csv.reader(handle))
+    if not rows:
+        return []
+    header = [cell.strip().casefold() for cell in rows[0]]
+    if "name" in header:
+        column = header.index("name")
+        rows = rows[1:]
+    else:
+        column = 0
+    return [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+
+
+def import_roster(path: Path) -> tuple[int, list[AuthError]]:
+    """
+    Create every user in the roster. Returns (created count, errors).
+    """
+    results = create_users(read_roster(path))
+    errors = [result for result in results if isinstance(result, AuthError)]
+    return len(results) - len(errors), errors
+
+
+def export_progress(out: TextIO, fmt: str = "csv", workers: int | None = None) -> int:
+    """
+    Write one record per user, training and room to out.
+
+    Profiles are decoded and formatted in a process pool, in chunks of user
+    names; the parent only concatenates the finished text in name order.
+    Returns the number of records written.
+    """
+    if fmt == "csv":
+        csv.writer(out, lineterminator="\n").writerow(_EXPORT_FIELDS)
+    records = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for text, count in pool.map(partial(_export_chunk, fmt=fmt), _chunks(list_user_names())):
+            out.write(text)
+            records += count
+    return records
+
+
+def _chunks(names: list[str]) -> Iterator[list[str]]:
+    for start in range(0, len(names), _EXPORT_CHUNK_SIZE):
+        yield names[start:start + _EXPORT_CHUNK_SIZE]
+
+
+def _export_chunk(names: list[str], fmt: str) -> tuple[str, int]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n") if fmt == "csv" else None
+    count = 0
+    for name in names:
+        profile = load_user(name)
+        if profile is None:
+            continue
+        for training_id, grid in profile.items.items():
+            for room, status in grid.items():
+                unlocked = isinstance(status, Unlocked)
+                row = [
+                    profile.name,
+                    training_id,
+                    room.difficulty,
+                    room.time_pressure,
+                    "unlocked" if unlocked else "locked",
+                    status.mastery_level if unlocked else 0,
+                    status.score if unlocked else 0,
+                ]
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(_EXPORT_FIELDS, row)), ensure_ascii=False))
+                    buffer.write("\n")
+                count += 1
+    return buffer.getvalue(), count
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk user import and progress export.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_cmd = commands.add_parser("import", help="create users from a CSV roster")
+    import_cmd.add_argument("roster", type=Path, help="CSV file with a 'name' column")
+
+    export_cmd = commands.add_parser("export", help="export progress per user, training and room")
+    export_cmd.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    export_cmd.add_argument("--output", type=Path, help="output file (default: stdout)")
+    export_cmd.add_argument("--workers", type=int, default=None, help="worker processes")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        created, errors = import_roster(args.roster)
+        for error in errors:
+            print(error.message, file=sys.stderr)
+        print(f"Created {created} user(s).", file=sys.stderr)
+        return 1 if errors else 0
+
+    if args.output is None:
+        records = export_progress(sys.stdout, fmt=args.format, workers=args.workers)
+    else:
+        with open(args.output, "w", newline="", encoding="utf-8") as handle:
+            records = export_progress(handle, fmt=args.format, workers=args.workers)
+    print(f"Exported {records} record(s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from ..core.sync import SharedFolderTransport, SyncServerTransport, SyncTransport, sync
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Sync progress with other machines.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--folder", type=Path, help="shared folder every machine can reach")
+    target.add_argument("--server", metavar="HOST:PORT", help="sync server (see tools.kv_server)")
+    args = parser.parse_args(argv)
+
+    transport: SyncTransport
+    if args.folder is not None:
+        args.folder.mkdir(parents=True, exist_ok=True)
+        transport = SharedFolderTransport(args.folder)
+    else:
+        host, _, port = args.server.rpartition(":")
+        transport = SyncServerTransport(host or "127.0.0.1", int(port))
+
+    report = sync(transport)
+    print(f"Sent {report.pushed} and received {report.pulled} event(s).")
+    for name, count in sorted(report.updated.items()):
+        print(f"  {name}: {count} new")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import pytest
+
+from math_trainer_core.core import user
+
+
+@pytest.fixture
+def local_users(tmp_path, monkeypatch):
+    """
+    Local file storage in an empty working directory (profiles go to
+    ./users), with the in-process profile cache and name index emptied.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(user, "_STORAGE", user.LocalFileStorage())
+    monkeypatch.setattr(user, "_NAME_INDEX", None)
+    monkeypatch.setattr(user, "_NAMES_CREATED", [])
+    user.invalidate_profile_cache()
+    yield tmp_path / "users"
+    user.invalidate_profile_cache()
+
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import threading
+
+from math_trainer_core.core.atomic_file import write_atomic
+
+
+def test_concurrent_writers_leave_one_whole_file(tmp_path):
+    path = tmp_path / "index.json"
+    payloads = [bytes([index]) * 100_000 for index in range(8)]
+    errors = []
+
+    def write(payload: bytes) -> None:
+        try:
+            for _ in range(20):
+                write_atomic(path, payload)
+        except OSError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write, args=(payload,)) for payload in payloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert path.read_bytes() in payloads
+    assert [entry.name for entry in tmp_path.iterdir()] == ["index.json"]
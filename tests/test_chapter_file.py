@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from math_trainer_core.core import chapter_file
+from math_trainer_core.core.chapter_file import (
+    CompiledChapter,
+    MappedRecords,
+    StreamedChapter,
+    compile_chapter,
+    compiled_path,
+    load_chapter_records,
+    open_compiled_chapter,
+    read_chapter_header,
+    read_chapter_json,
+)
+from math_trainer_core.core.content_repository import content_repository
+
+
+def _open_count(path: Path) -> int:
+    fd_dir = Path("/proc/self/fd")
+    if not fd_dir.is_dir():
+        pytest.skip("Needs /proc to see open files")
+    target = os.fspath(path.resolve())
+    count = 0
+    for fd in fd_dir.iterdir():
+        try:
+            count += os.readlink(fd) == target
+        except OSError:
+            continue
+    return count
+
+
+@pytest.fixture(autouse=True)
+def empty_repository():
+    content_repository().clear()
+    yield
+    content_repository().clear()
+
+
+@pytest.fixture
+def chapter_path(tmp_path):
+    path = tmp_path / "words.json"
+    entries = {"@chapter": {"name": "Ord"}}
+    entries.update((f"ord {index}", [f"word {index}", f"term {index}"]) for index in range(50))
+    entries["tom"] = []
+    path.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_streamed_chapter_opens_its_file_only_while_reading(chapter_path):
+    chapter = StreamedChapter(chapter_path)
+    assert _open_count(chapter_path) == 0
+    assert chapter[3].values == ("word 3", "term 3")
+    assert _open_count(chapter_path) == 1
+    chapter.close()
+    assert _open_count(chapter_path) == 0
+    assert chapter[-1].answer == "ord 49"
+    assert list(chapter) == list(read_chapter_json(chapter_path))
+    assert _open_count(chapter_path) == 0
+
+    with StreamedChapter(chapter_path) as scoped:
+        assert len(scoped) == 50
+        scoped[0]
+    assert _open_count(chapter_path) == 0
+
+
+def test_repository_closes_a_replaced_streamed_chapter(chapter_path, monkeypatch):
+    monkeypatch.setattr(chapter_file, "STREAM_THRESHOLD_BYTES", 0)
+    old = load_chapter_records(chapter_path)
+    assert isinstance(old, StreamedChapter)
+    old[0]
+    assert _open_count(chapter_path) == 1
+
+    chapter_path.write_text(json.dumps({"katt": "cat"}), encoding="utf-8")
+    new = load_chapter_records(chapter_path)
+    assert [record.answer for record in new] == ["katt"]
+    assert _open_count(chapter_path) == 0
+
+
+def test_header_is_read_without_the_entries(chapter_path, tmp_path):
+    assert read_chapter_header(chapter_path) == {"name": "Ord"}
+    plain = tmp_path / "plain.json"
+    plain.write_text(json.dumps({"katt": "cat"}), encoding="utf-8")
+    assert read_chapter_header(plain) == {}
+
+
+def test_compiled_chapter_matches_the_json(chapter_path):
+    expected = read_chapter_json(chapter_path)
+    assert compile_chapter(chapter_path) == compiled_path(chapter_path)
+    compiled = open_compiled_chapter(chapter_path)
+    assert isinstance(compiled, CompiledChapter)
+    assert list(compiled) == list(expected)
+    assert compiled[-1] == expected[-1]
+    assert compiled[2:4] == list(expected[2:4])
+    with pytest.raises(IndexError):
+        compiled[len(expected)]
+
+    loaded = load_chapter_records(chapter_path)
+    assert isinstance(loaded, CompiledChapter)
+    answers = MappedRecords(loaded, lambda record: record.answer.upper())
+    assert answers[1] == "ORD 1"
+    assert len(answers) == len(expected)
+
+
+def test_stale_or_broken_compiled_chapters_are_ignored(chapter_path):
+    compile_chapter(chapter_path)
+    target = compiled_path(chapter_path)
+    target.write_bytes(target.read_bytes()[:-3])
+    assert open_compiled_chapter(chapter_path) is None
+
+    compile_chapter(chapter_path)
+    chapter_path.write_text(json.dumps({"katt": "cat"}), encoding="utf-8")
+    assert open_compiled_chapter(chapter_path) is None
+    assert [record.answer for record in load_chapter_records(chapter_path)] == ["katt"]
+
+
+def test_streamed_chapter_matches_the_json_across_chunks(tmp_path):
+    # More than one scan chunk of multi-byte text, escapes and skipped members.
+    entries: dict = {"@chapter": {"name": "Stor", "note": "} not the end"}}
+    for index in range(30_000):
+        entries[f'ä{index} "citat"'] = [f"värde {index}", "åäö\n\\é", 7] if index % 3 else f"ö{index}"
+        if index % 1000 == 0:
+            entries[f"siffra {index}"] = 12.5
+    path = tmp_path / "big.json"
+    path.write_text(json.dumps(entries, ensure_ascii=False, indent=1), encoding="utf-8")
+    assert path.stat().st_size > 1024 * 1024
+
+    expected = read_chapter_json(path)
+    with StreamedChapter(path) as streamed:
+        assert len(streamed) == len(expected) == 30_000
+        assert list(streamed) == list(expected)
+        assert streamed[-1] == expected[-1]
+
+
+def test_streamed_chapter_rejects_bad_files(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text('{"katt": "cat", "hund": ', encoding="utf-8")
+    with pytest.raises(ValueError):
+        StreamedChapter(path)
+    path.write_text('["katt"]', encoding="utf-8")
+    with pytest.raises(ValueError):
+        StreamedChapter(path)
+    path.write_text('{"@chapter": {}, "tom": []}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        StreamedChapter(path)
+
+
+def test_streamed_chapter_notices_a_rewritten_file(chapter_path):
+    with StreamedChapter(chapter_path) as streamed:
+        chapter_path.write_text(" " * chapter_path.stat().st_size, encoding="utf-8")
+        with pytest.raises(ValueError):
+            streamed[10]
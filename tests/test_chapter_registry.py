@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from math_trainer_core.core import chapter_file
+from math_trainer_core.core.chapter_file import compile_chapter, count_chapter_entries
+from math_trainer_core.core.chapter_registry import discover_chapters
+
+
+@pytest.fixture
+def chapters(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    directory = tmp_path / "chapters"
+    directory.mkdir()
+    (directory / "b_animals.json").write_text(
+        json.dumps({"@chapter": {"name": "Djur"}, "katt": "cat", "hund": ["dog", "hound"], " ": "blank"}),
+        encoding="utf-8",
+    )
+    (directory / "a_colors.json").write_text(
+        json.dumps({"röd": "red", "blå": "blue", "grön": "green", "ingen": []}), encoding="utf-8"
+    )
+    return directory
+
+
+def test_discover_counts_without_loading_records(chapters, monkeypatch):
+    def no_parse(path):
+        raise AssertionError(f"{path} was parsed")
+
+    monkeypatch.setattr(chapter_file, "read_chapter_json", no_parse)
+    found = discover_chapters(chapters)
+    assert [(chapter.name, chapter.entry_count) for chapter in found] == [("A colors", 3), ("Djur", 2)]
+
+
+def test_discover_reuses_the_index_until_a_file_changes(chapters, monkeypatch):
+    discover_chapters(chapters)
+    counted = []
+    monkeypatch.setattr(
+        "math_trainer_core.core.chapter_registry.count_chapter_entries",
+        lambda path: counted.append(path.name) or count_chapter_entries(path),
+    )
+    discover_chapters(chapters)
+    assert counted == []
+
+    (chapters / "a_colors.json").write_text(json.dumps({"röd": "red"}), encoding="utf-8")
+    assert [chapter.entry_count for chapter in discover_chapters(chapters)] == [1, 2]
+    assert counted == ["a_colors.json"]
+
+
+def test_count_uses_an_up_to_date_compiled_chapter(chapters):
+    path = chapters / "b_animals.json"
+    compile_chapter(path)
+    assert count_chapter_entries(path) == 2
+
+
+def test_count_rejects_a_chapter_without_entries(chapters):
+    path = chapters / "empty.json"
+    path.write_text(json.dumps({"@chapter": {"name": "Tom"}, "x": ""}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        count_chapter_entries(path)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+import pytest
+
+from math_trainer_core.core.fact_stats import FactStats, FactStatsStates
+from math_trainer_core.plugins import question_batch
+from math_trainer_core.plugins.addition.plugin import PlusPlugin
+from math_trainer_core.plugins.minus.plugin import MinusPlugin
+from math_trainer_core.plugins.multiplication.plugin import MultiplicationPlugin
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    random.seed(1234)
+
+
+def _facts(table: FactStats) -> list[tuple[int, int]]:
+    return [(a, b) for a in table.rows for b in table.cols]
+
+
+def _assert_follows_weights(table: FactStats, counts: Counter, draws: int) -> None:
+    total = sum(table.weight(a, b) for a, b in _facts(table))
+    for fact in _facts(table):
+        expected = table.weight(*fact) / total
+        assert abs(counts[fact] / draws - expected) < 0.01, fact
+
+
+def test_wrong_answers_raise_a_facts_weight():
+    table = FactStats(range(0, 3), range(0, 11))
+    before = table.weight(2, 7)
+    for _ in range(5):
+        table.record(2, 7, correct=False, latency_ms=9000.0)
+        table.record(1, 1, correct=True, latency_ms=500.0)
+    assert table.weight(2, 7) > 2 * before
+    assert table.weight(1, 1) < before
+    counts = Counter(table.draw() for _ in range(20000))
+    assert counts[(2, 7)] > 4 * counts[(1, 1)]
+
+
+def test_draws_follow_the_weights():
+    table = FactStats(range(0, 4), range(0, 6), allowed=lambda a, b: a + b <= 6)
+    for _ in range(300):
+        a, b = table.draw()
+        table.record(a, b, random.random() < 0.2 + 0.1 * a, random.random() * 20000.0)
+    draws = 60000
+    counts = Counter(table.draw() for _ in range(draws))
+    assert all(a + b <= 6 for a, b in counts)
+    _assert_follows_weights(table, counts, draws)
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_draw_many_follows_the_weights(use_numpy, monkeypatch):
+    if use_numpy and question_batch.np is None:
+        pytest.skip("NumPy is not installed")
+    if not use_numpy:
+        monkeypatch.setattr(question_batch, "np", None)
+    table = FactStats(range(1, 9, 2), range(0, 5), allowed=lambda a, b: b != 3)
+    table.record(5, 4, correct=False, latency_ms=12000.0)
+    draws = 60000
+    rows, cols = table.draw_many(draws)
+    counts = Counter(zip(map(int, rows), map(int, cols)))
+    assert set(counts) <= {(a, b) for a, b in _facts(table) if b != 3}
+    _assert_follows_weights(table, counts, draws)
+
+
+def test_no_allowed_fact_is_an_error():
+    with pytest.raises(ValueError):
+        FactStats(range(0, 2), range(0, 2), allowed=lambda a, b: False)
+
+
+def test_dump_and_load_keep_shared_facts_across_a_changed_range():
+    table = FactStats(range(0, 3), range(0, 11))
+    table.record(2, 7, correct=False, latency_ms=8000.0)
+    table.record(0, 0, correct=False, latency_ms=8000.0)
+    grown = FactStats(range(0, 5), range(0, 11), state=table.dump())
+    assert grown.weight(2, 7) == pytest.approx(table.weight(2, 7))
+    assert grown.weight(4, 7) == pytest.approx(FactStats(range(0, 1), range(0, 1)).weight(0, 0))
+
+    stepped = FactStats(range(0, 10, 2), range(1, 11, 3))
+    stepped.record(4, 7, correct=False, latency_ms=8000.0)
+    moved = FactStats(range(2, 8, 2), range(1, 11, 3), state=stepped.dump())
+    assert moved.weight(4, 7) == pytest.approx(stepped.weight(4, 7))
+    assert moved.weight(2, 7) == pytest.approx(stepped.weight(2, 7))
+
+
+def test_states_keep_tables_not_used_this_session():
+    states = FactStatsStates()
+    states.table("0", range(0, 2), range(0, 11)).record(1, 5, correct=False, latency_ms=7000.0)
+    states.table("1", range(0, 3), range(0, 11)).record(2, 9, correct=False, latency_ms=7000.0)
+    data = states.dump()
+
+    reloaded = FactStatsStates()
+    reloaded.load(data)
+    reloaded.table("0", range(0, 2), range(0, 11))
+    again = FactStatsStates()
+    again.load(reloaded.dump())
+    assert again.table("1", range(0, 3), range(0, 11)).weight(2, 9) == pytest.approx(
+        states.table("1", range(0, 3), range(0, 11)).weight(2, 9)
+    )
+
+    unreadable = FactStatsStates()
+    unreadable.load(b"garbage")
+    assert unreadable.table("0", range(0, 2), range(0, 11)).weight(1, 5) < states.table(
+        "0", range(0, 2), range(0, 11)
+    ).weight(1, 5)
+
+
+@pytest.mark.parametrize("plugin_type", [PlusPlugin, MinusPlugin, MultiplicationPlugin])
+def test_plugins_record_answers_into_their_stats(plugin_type):
+    plugin = plugin_type()
+    plugin.load_state(None)
+    question = plugin.make_question(1)
+    fresh = plugin.dump_state()
+    question.answer_question("-999")
+    assert plugin.dump_state() != fresh
+
+    restored = plugin_type()
+    restored.load_state(plugin.dump_state())
+    assert restored.dump_state() == plugin.dump_state()
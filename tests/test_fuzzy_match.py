@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+from math_trainer_core.core.chapter_file import ChapterRecord, normalize_answer
+from math_trainer_core.core.content_repository import content_repository
+from math_trainer_core.core.fuzzy_match import (
+    AnswerIndex,
+    AnswerMatch,
+    MatchKind,
+    match_answer,
+    within_one_typo,
+)
+
+
+def _records(*answers: str) -> list[ChapterRecord]:
+    return [ChapterRecord(answer=answer, normalized_answer=normalize_answer(answer), values=("x",)) for answer in answers]
+
+
+@pytest.mark.parametrize(
+    "a, b, close",
+    [
+        ("katt", "kat", True),
+        ("katt", "katta", True),
+        ("katt", "kbtt", True),
+        ("katt", "aktt", True),
+        ("katt", "ktta", False),
+        ("katt", "katt", False),
+        ("katt", "ka", False),
+        ("", "a", True),
+    ],
+)
+def test_within_one_typo(a, b, close):
+    assert within_one_typo(a, b) is close
+    assert within_one_typo(b, a) is close
+
+
+def test_index_tells_typos_from_other_entries():
+    index = AnswerIndex(_records("Elefant", "Elegant", "Hund", "Ox", "Ax"))
+    assert index.match("elefant", "elefant") == AnswerMatch(MatchKind.EXACT)
+    assert index.match("elefnat", "elefant") == AnswerMatch(MatchKind.NEAR_MISS)
+    # Exactly another entry wins over being one typo from the expected one.
+    assert index.match("elegant", "elefant") == AnswerMatch(MatchKind.OTHER_ENTRY, other_answer="Elegant")
+    assert index.match("hnud", "elefant") == AnswerMatch(MatchKind.OTHER_ENTRY, other_answer="Hund")
+    # Short answers are never typos of each other.
+    assert index.match("ax", "ox") == AnswerMatch(MatchKind.OTHER_ENTRY, other_answer="Ax")
+    assert index.match("ex", "ox") == AnswerMatch(MatchKind.NO_MATCH)
+    assert index.match("zebra", "elefant") == AnswerMatch(MatchKind.NO_MATCH)
+
+
+def _brute_force(records: list[ChapterRecord], answer: str, expected: str) -> AnswerMatch:
+    if answer == expected:
+        return AnswerMatch(MatchKind.EXACT)
+    others = [record for record in records if record.normalized_answer != expected]
+    for record in others:
+        if record.normalized_answer == answer:
+            return AnswerMatch(MatchKind.OTHER_ENTRY, other_answer=record.answer)
+    if len(expected) >= 3 and within_one_typo(answer, expected):
+        return AnswerMatch(MatchKind.NEAR_MISS)
+    for record in others:
+        if len(record.normalized_answer) >= 3 and within_one_typo(answer, record.normalized_answer):
+            return AnswerMatch(MatchKind.OTHER_ENTRY, other_answer=record.answer)
+    return AnswerMatch(MatchKind.NO_MATCH)
+
+
+def test_index_agrees_with_comparing_every_entry():
+    rng = random.Random(7)
+    words = sorted({"".join(rng.choice("abcd") for _ in range(rng.randint(2, 5))) for _ in range(300)})
+    records = _records(*words)
+    index = AnswerIndex(records)
+    for _ in range(2000):
+        expected = rng.choice(words)
+        answer = list(rng.choice(words))
+        if answer and rng.random() < 0.7:
+            answer[rng.randrange(len(answer))] = rng.choice("abcde")
+        answer = "".join(answer)
+        result = index.match(answer, expected)
+        truth = _brute_force(records, answer, expected)
+        assert result.kind == truth.kind, (answer, expected)
+        if truth.kind is MatchKind.OTHER_ENTRY and truth.other_answer == answer:
+            assert result == truth
+
+
+def test_match_answer_uses_the_chapter_file(tmp_path):
+    content_repository().clear()
+    path = tmp_path / "djur.json"
+    path.write_text(json.dumps({"Katt": "cat", "Hund": "dog"}), encoding="utf-8")
+    assert match_answer(path, "hund", "katt") == AnswerMatch(MatchKind.OTHER_ENTRY, other_answer="Hund")
+
+    path.unlink()
+    content_repository().clear()
+    assert match_answer(path, "hund", "katt") == AnswerMatch(MatchKind.NO_MATCH)
+    assert match_answer(None, "kat", "katt") == AnswerMatch(MatchKind.NEAR_MISS)
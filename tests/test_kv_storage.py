@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from math_trainer_core.api_types import AuthError, AuthPending, Room, Unlocked, UserProfile
+from math_trainer_core.core import user
+from math_trainer_core.core.kv_protocol import KVClient
+from math_trainer_core.core.kv_storage import RemoteKVStorage
+from math_trainer_core.core.user import StoredUserProfile
+from math_trainer_core.tools.kv_server import start_local_kv_server
+
+
+class _CountingClient(KVClient):
+    """
+    Counts round trips made from the test's own thread, i.e. the ones a GUI
+    caller would wait for.
+    """
+
+    def __init__(self, host: str, port: int):
+        super().__init__(host, port)
+        self.blocking = 0
+        # Background round trips wait for this, to hold back a fetch.
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def execute(self, commands):
+        if threading.current_thread() is threading.main_thread():
+            self.blocking += 1
+        else:
+            self.gate.wait()
+        return super().execute(commands)
+
+
+@pytest.fixture
+def server():
+    server = start_local_kv_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _storage(server, client: KVClient | None = None) -> RemoteKVStorage:
+    host, port = server.server_address[:2]
+    return RemoteKVStorage(host=host, port=port, client=client)
+
+
+def _counting_client(server) -> _CountingClient:
+    host, port = server.server_address[:2]
+    return _CountingClient(host, port)
+
+
+@pytest.fixture
+def use_storage(monkeypatch):
+    def use(storage: RemoteKVStorage) -> None:
+        monkeypatch.setattr(user, "_STORAGE", storage)
+
+    return use
+
+
+def _unlocked(mastery_level: int, room: Room) -> Unlocked:
+    return Unlocked(mastery_level=mastery_level, score=room.difficulty * room.time_pressure * mastery_level)
+
+
+def _wait_for(condition, timeout_s: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_save_flush_load_round_trip(server):
+    room = Room(difficulty=2, time_pressure=3)
+    writer = _storage(server)
+    writer.save(StoredUserProfile(name="alice", items={"plus": {room: _unlocked(2, room)}}))
+    writer.save_plugin_state("alice", "plus", b"\x01\x02")
+    assert writer.flush()
+
+    reader = _storage(server)
+    loaded = reader.load("alice")
+    assert loaded is not None
+    assert loaded.items["plus"][room] == _unlocked(2, room)
+    assert reader.load_plugin_state("alice", "plus") == b"\x01\x02"
+    assert reader.list_names() == ["alice"]
+    assert reader.load("nobody") is None
+
+
+def test_appends_from_two_sites_merge(server):
+    first_room = Room(difficulty=1, time_pressure=1)
+    second_room = Room(difficulty=3, time_pressure=1)
+    creator = _storage(server)
+    creator.save(StoredUserProfile(name="bob", items={}))
+    assert creator.flush()
+
+    site_a = _storage(server)
+    site_b = _storage(server)
+    profile_a = site_a.load("bob")
+    profile_b = site_b.load("bob")
+    profile_a.items["plus"] = {first_room: _unlocked(1, first_room)}
+    profile_b.items["plus"] = {second_room: _unlocked(2, second_room)}
+    site_a.save(profile_a)
+    site_b.save(profile_b)
+    assert site_a.flush() and site_b.flush()
+
+    merged = _storage(server).load("bob")
+    assert merged.items["plus"] == {
+        first_room: _unlocked(1, first_room),
+        second_room: _unlocked(2, second_room),
+    }
+
+
+def test_highscore_batches_stream_every_total(server):
+    storage = _storage(server)
+    for index in range(5):
+        room = Room(difficulty=index + 1, time_pressure=1)
+        storage.save(StoredUserProfile(name=f"user{index}", items={"plus": {room: _unlocked(1, room)}}))
+    assert storage.flush()
+
+    batches = list(_storage(server).highscore_batches(batch_size=2))
+    assert all(len(batch) <= 2 for batch in batches)
+    # Best first.
+    assert [pair for batch in batches for pair in batch] == [(f"user{index}", index + 1) for index in reversed(range(5))]
+
+
+def test_prefetch_serves_loads_without_round_trips(server):
+    writer = _storage(server)
+    writer.save(StoredUserProfile(name="carol", items={}))
+    writer.save_plugin_state("carol", "plus", b"state")
+    assert writer.flush()
+
+    client = _counting_client(server)
+    storage = _storage(server, client)
+    storage.prefetch(["carol"])
+    _wait_for(lambda: storage.ready("carol"))
+
+    assert storage.load("carol") is not None
+    assert storage.load_plugin_state("carol", "plus") == b"state"
+    assert storage.load_plugin_state("carol", "minus") is None
+    assert client.blocking == 0
+
+
+def test_load_prefetches_plugin_states(server):
+    writer = _storage(server)
+    writer.save(StoredUserProfile(name="dave", items={}))
+    writer.save_plugin_state("dave", "plus", b"state")
+    assert writer.flush()
+
+    client = _counting_client(server)
+    storage = _storage(server, client)
+    assert storage.load("dave") is not None
+    assert client.blocking == 1
+    _wait_for(lambda: storage.ready("dave"))
+    assert storage.load_plugin_state("dave", "plus") == b"state"
+    assert client.blocking == 1
+
+
+def test_unknown_names_are_answered_without_round_trips(server):
+    client = _counting_client(server)
+    storage = _storage(server, client)
+    _wait_for(lambda: storage.ready("nobody"))
+    assert storage.load("nobody") is None
+    assert client.blocking == 0
+
+
+def test_login_is_pending_until_the_user_is_fetched(server, use_storage):
+    writer = _storage(server)
+    writer.save(StoredUserProfile(name="frank", items={}))
+    assert writer.flush()
+
+    client = _counting_client(server)
+    client.gate.clear()
+    use_storage(_storage(server, client))
+    assert user.login("frank") == AuthPending()
+    assert user.create_user("frank") == AuthPending()
+    client.gate.set()
+    _wait_for(lambda: user.login("frank") != AuthPending())
+    assert user.login("frank") == UserProfile(name="frank")
+    assert user.create_user("frank") == AuthError(message="User already exists.")
+    assert client.blocking == 0
+
+
+def test_creating_a_user_makes_no_blocking_round_trip(server, use_storage):
+    client = _counting_client(server)
+    storage = _storage(server, client)
+    use_storage(storage)
+    _wait_for(lambda: user.create_user("grace") != AuthPending())
+    assert storage.flush()
+    assert client.blocking == 0
+    assert _storage(server).load("grace") is not None
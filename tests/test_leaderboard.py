@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+
+from math_trainer_core.api_types import Room, Unlocked
+from math_trainer_core.core import user
+from math_trainer_core.core.leaderboard import (
+    TOP_K,
+    index_path,
+    load_leaderboard,
+    merge_leaderboard_updates,
+    read_leaderboard_updates,
+    updates_path,
+)
+from math_trainer_core.core.user import (
+    StoredUserProfile,
+    create_users,
+    iter_highscore_batches,
+    load_highscores,
+    load_user,
+    save_user,
+)
+
+
+_ROOM = Room(difficulty=2, time_pressure=3)
+
+
+def _save_score(name: str, mastery_level: int) -> None:
+    profile = load_user(name) or StoredUserProfile(name=name, items={})
+    profile.items["plus"] = {_ROOM: Unlocked(mastery_level=mastery_level, score=6 * mastery_level)}
+    save_user(profile)
+
+
+def _manifest(users_dir):
+    return users_dir / "names.manifest"
+
+
+def test_first_read_builds_the_index_best_first(local_users):
+    for index in range(TOP_K + 5):
+        _save_score(f"p{index:02d}", mastery_level=index % 7)
+    assert not index_path(local_users).exists()
+
+    batches = list(iter_highscore_batches(batch_size=4))
+    assert sum(len(batch) for batch in batches) == TOP_K + 5
+    assert index_path(local_users).exists()
+
+    leaderboard = load_leaderboard(local_users, _manifest(local_users))
+    assert leaderboard is not None
+    assert [total for _, total in leaderboard.top] == sorted((total for _, total in leaderboard.top), reverse=True)
+    assert len(leaderboard.top) == TOP_K
+
+    first, *rest = list(iter_highscore_batches(batch_size=4))
+    assert first == leaderboard.top
+    assert all(len(batch) <= 4 for batch in rest)
+    assert dict(first + [pair for batch in rest for pair in batch]) == load_highscores()
+
+
+def test_saves_append_to_the_log_instead_of_rewriting_the_index(local_users):
+    _save_score("anna", 1)
+    _save_score("bo", 2)
+    list(iter_highscore_batches())
+    snapshot = index_path(local_users).read_bytes()
+
+    _save_score("anna", 4)
+    assert index_path(local_users).read_bytes() == snapshot
+    assert read_leaderboard_updates(local_users) == [("anna", 24)]
+    first = next(iter_highscore_batches())
+    assert first[0] == ("anna", 24)
+
+
+def test_new_users_keep_the_index_fresh(local_users):
+    _save_score("anna", 1)
+    list(iter_highscore_batches())
+    create_users(["cleo", "dan"])
+    _save_score("eve", 3)
+    leaderboard = load_leaderboard(local_users, _manifest(local_users))
+    assert leaderboard is not None
+    assert load_highscores() == {"anna": 6, "cleo": 0, "dan": 0, "eve": 18}
+
+
+def test_index_older_than_the_manifest_is_rebuilt(local_users):
+    _save_score("anna", 1)
+    list(iter_highscore_batches())
+    manifest = _manifest(local_users)
+    # The manifest changed behind the app's back, e.g. a copied profile.
+    earlier = manifest.stat().st_mtime_ns - 10_000_000_000
+    os.utime(index_path(local_users), ns=(earlier, earlier))
+    assert load_leaderboard(local_users, manifest) is None
+    assert load_highscores() == {"anna": 6}
+    assert load_leaderboard(local_users, manifest) is not None
+
+
+def test_many_updates_are_compacted_by_a_reader(local_users, monkeypatch):
+    monkeypatch.setattr(user, "COMPACT_AFTER_UPDATES", 3)
+    _save_score("anna", 1)
+    list(iter_highscore_batches())
+    for mastery_level in range(2, 6):
+        _save_score("anna", mastery_level)
+    assert len(read_leaderboard_updates(local_users)) == 4
+
+    list(iter_highscore_batches())
+    assert not updates_path(local_users).exists()
+    assert load_highscores() == {"anna": 30}
+
+
+def test_update_log_merges_the_higher_total_and_skips_a_partial_line(tmp_path):
+    updates_path(tmp_path).write_bytes(b'["anna",6]\n["bo",3]\n["anna",4]\n["cl')
+    updates = read_leaderboard_updates(tmp_path)
+    assert updates == [("anna", 6), ("bo", 3), ("anna", 4)]
+
+    totals = {"anna": 5, "bo": 9}
+    assert merge_leaderboard_updates(totals, updates) == {"anna": 6}
+    assert totals == {"anna": 6, "bo": 9}
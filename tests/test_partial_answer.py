@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import pickle
+from dataclasses import dataclass
+
+import pytest
+
+from math_trainer_core.api_types import QuestionContent
+from math_trainer_core.core.question_impl import QuestionImpl
+from math_trainer_core.plugins.partial_answer import (
+    IntAnswerPrefix,
+    LetterSequencePrefix,
+    PartialAnswerChecker,
+    TextAnswerPrefix,
+    could_become_int,
+)
+from math_trainer_core.plugins.plugin_api import AnswerResult, QuestionResult
+from math_trainer_core.plugins.plugin_host import _Host, _partial_checker
+
+
+@pytest.mark.parametrize(
+    "partial, correct, possible",
+    [
+        ("", 42, True),
+        ("4", 42, True),
+        ("42", 42, True),
+        ("43", 42, False),
+        ("421", 42, False),
+        ("0042", 42, True),
+        ("+4", 42, True),
+        ("-", 42, False),
+        ("-", -7, True),
+        ("-7", -7, True),
+        ("7", -7, False),
+        ("+", -7, False),
+        ("4x", 42, False),
+        ("0", 0, True),
+    ],
+)
+def test_could_become_int(partial, correct, possible):
+    assert could_become_int(partial, correct) is possible
+
+
+def test_int_prefix_whitespace():
+    assert IntAnswerPrefix(105)(" 10 ")
+    assert not IntAnswerPrefix(105)("1 0")
+    assert IntAnswerPrefix(105, ignore_inner_whitespace=True)("1 0")
+
+
+def test_text_prefix_normalizes_the_partial_answer():
+    checker = TextAnswerPrefix("blue whale")
+    assert checker("  BLUE  wh")
+    assert checker("")
+    assert not checker("blue wg")
+
+
+def test_letter_sequence_prefix():
+    checker = LetterSequencePrefix("JFKÖ")
+    assert checker("j f k")
+    assert not checker("jk")
+
+
+def test_checkers_survive_pickling():
+    for checker in (IntAnswerPrefix(-3), TextAnswerPrefix("katt"), LetterSequencePrefix("AB")):
+        assert pickle.loads(pickle.dumps(checker)) == checker
+
+
+def test_base_checker_is_abstract():
+    with pytest.raises(TypeError):
+        PartialAnswerChecker()
+
+
+@dataclass(frozen=True)
+class _PluginChecker(PartialAnswerChecker):
+    def __call__(self, partial: str) -> bool:
+        return True
+
+
+class _PluginQuestion:
+    def partial_answer_checker(self) -> PartialAnswerChecker:
+        return _PluginChecker()
+
+
+def test_host_sends_only_core_checkers():
+    assert _partial_checker(_PluginQuestion()) is None
+    assert _partial_checker(object()) is None
+
+    host = _Host()
+    host.create(1, "math_trainer_core.plugins.multiplication.plugin")
+    for question_id, content, checker in host.make(1, 0, 4):
+        a, b = host._questions[question_id][1].a, host._questions[question_id][1].b
+        assert checker == IntAnswerPrefix(a * b)
+
+
+class _SilentQuestion:
+    def __init__(self, check_result):
+        self._check_result = check_result
+
+    def read_question(self) -> QuestionContent:
+        return QuestionContent(question_text="?")
+
+    def answer_question(self, answer: str) -> QuestionResult:
+        return QuestionResult(result=AnswerResult.CORRECT, display_answer_text="")
+
+    def reveal_answer(self) -> QuestionResult:
+        return QuestionResult(result=AnswerResult.WRONG, display_answer_text="")
+
+    def check_partial_answer(self, partial: str):
+        return self._check_result
+
+
+class _OneQuestionPlugin:
+    def __init__(self, question):
+        self._question = question
+
+    def make_question(self, difficulty_or_chapter: int):
+        return self._question
+
+
+@pytest.mark.parametrize("check_result", [None, False, True])
+def test_question_passes_on_the_plugins_opinion(check_result):
+    screen = QuestionImpl(_OneQuestionPlugin(_SilentQuestion(check_result)), 0, 3)
+    assert screen.check_partial_answer("x") is check_result
+
+
+def test_question_without_check_has_no_opinion():
+    class _BareQuestion(_SilentQuestion):
+        check_partial_answer = None
+
+    screen = QuestionImpl(_OneQuestionPlugin(_BareQuestion(None)), 0, 3)
+    assert screen.check_partial_answer("x") is None
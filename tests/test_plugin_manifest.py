@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from math_trainer_core.plugins import plugin_manifest
+from math_trainer_core.plugins.plugin_manifest import load_plugin_manifest
+
+
+_MANIFEST = Path(".plugin_cache") / "manifest.json"
+
+
+@pytest.fixture
+def described(tmp_path, monkeypatch):
+    """
+    Module names of the plugins imported to describe them, in an empty
+    working directory (so without a cached manifest).
+    """
+    monkeypatch.chdir(tmp_path)
+    modules: list[str] = []
+    lock = threading.Lock()
+    real = plugin_manifest.load_factory
+
+    def recording(module_name):
+        with lock:
+            modules.append(module_name)
+        return real(module_name)
+
+    monkeypatch.setattr(plugin_manifest, "load_factory", recording)
+    return modules
+
+
+def test_unchanged_plugins_are_not_imported_again(described):
+    first, errors = load_plugin_manifest()
+    assert errors == []
+    assert first and len(described) == len(first)
+    assert _MANIFEST.exists()
+
+    described.clear()
+    second, _ = load_plugin_manifest()
+    assert described == []
+    assert {plugin_id: entry.info for plugin_id, entry in second.items()} == {
+        plugin_id: entry.info for plugin_id, entry in first.items()
+    }
+    assert {entry.module_name for entry in second.values()} == {entry.module_name for entry in first.values()}
+
+
+def test_only_the_changed_plugin_is_described_again(described):
+    load_plugin_manifest()
+    manifest = json.loads(_MANIFEST.read_text(encoding="utf-8"))
+    # As if a file of the multiplication plugin had been edited.
+    manifest["packages"]["multiplication"]["fingerprint"][0][1] += 1
+    _MANIFEST.write_text(json.dumps(manifest), encoding="utf-8")
+
+    described.clear()
+    load_plugin_manifest()
+    assert described == ["math_trainer_core.plugins.multiplication.plugin"]
+
+
+def test_an_unreadable_manifest_is_rebuilt(described):
+    _MANIFEST.parent.mkdir()
+    _MANIFEST.write_text("{not json", encoding="utf-8")
+    plugins, errors = load_plugin_manifest()
+    assert plugins and errors == []
+    assert json.loads(_MANIFEST.read_text(encoding="utf-8"))["version"] == 1
+
+
+def test_broken_and_hanging_plugins_are_reported_and_retried(described, monkeypatch):
+    release = threading.Event()
+    real = plugin_manifest.load_factory
+
+    def unlucky(module_name):
+        if module_name.endswith(".minus.plugin"):
+            raise ImportError("broken on purpose")
+        if module_name.endswith(".addition.plugin"):
+            release.wait(5.0)
+        return real(module_name)
+
+    monkeypatch.setattr(plugin_manifest, "load_factory", unlucky)
+    try:
+        plugins, errors = load_plugin_manifest(timeout_s=0.5)
+    finally:
+        release.set()
+    messages = {error.package: error.message for error in errors}
+    assert messages["minus"] == "ImportError: broken on purpose"
+    assert messages["addition"].startswith("Timed out")
+    assert "multiplication" in {entry.module_name.split(".")[-2] for entry in plugins.values()}
+
+    monkeypatch.setattr(plugin_manifest, "load_factory", real)
+    described_again, errors = load_plugin_manifest()
+    assert errors == []
+    assert len(described_again) == len(plugins) + 2
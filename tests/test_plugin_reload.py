@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from math_trainer_core.plugins import partial_answer
+from math_trainer_core.plugins.plugin_loader import LoadedPlugin
+from math_trainer_core.plugins.plugin_manifest import load_factory
+from math_trainer_core.plugins.plugin_watcher import PluginWatcher
+
+
+class _ChapterPlugin:
+    reloading = threading.Event()
+    release = threading.Event()
+
+    def __init__(self) -> None:
+        self.records = ["old"]
+
+    def make_question(self, difficulty_or_chapter: int):
+        return list(self.records)
+
+    def reload_data(self, changed_files: list[Path]) -> bool:
+        self.records = []
+        self.reloading.set()
+        self.release.wait(5.0)
+        self.records = ["new"]
+        return True
+
+
+class _Factory:
+    @staticmethod
+    def PluginInfo():
+        return load_factory("math_trainer_core.plugins.multiplication.plugin").PluginInfo()
+
+    @staticmethod
+    def CreatePlugin():
+        return _ChapterPlugin()
+
+
+PLUGIN_FACTORY = _Factory
+
+
+@pytest.fixture
+def handle(monkeypatch):
+    monkeypatch.delenv("MATH_TRAINER_PLUGIN_SANDBOX", raising=False)
+    _ChapterPlugin.reloading.clear()
+    _ChapterPlugin.release.clear()
+    return LoadedPlugin(info=_Factory.PluginInfo(), module_name=__name__)
+
+
+def test_questions_wait_for_a_data_reload(handle):
+    plugin = handle.instance()
+    reload = threading.Thread(target=handle.refresh, args=(handle.info, False, [Path("chapter.txt")]))
+    reload.start()
+    assert _ChapterPlugin.reloading.wait(5.0)
+
+    made = []
+    asking = threading.Thread(target=lambda: made.append(plugin.make_question(0)))
+    asking.start()
+    asking.join(0.1)
+    assert made == []
+
+    _ChapterPlugin.release.set()
+    reload.join(5.0)
+    asking.join(5.0)
+    assert made == [["new"]]
+    assert handle.instance() is plugin
+
+
+def test_guarded_instance_keeps_optional_methods_missing(handle):
+    plugin = handle.instance()
+    assert getattr(plugin, "make_questions", None) is None
+    assert plugin.records == ["old"]
+
+
+def test_changed_shared_module_is_not_reloaded():
+    checker_type = partial_answer.PartialAnswerChecker
+    watcher = PluginWatcher()
+    watcher.apply({Path(partial_answer.__file__)})
+    assert partial_answer.PartialAnswerChecker is checker_type
+    assert [error.package for error in watcher.errors()] == ["partial_answer"]
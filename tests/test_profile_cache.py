@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+
+from math_trainer_core.api_types import Room, Unlocked
+from math_trainer_core.core import user
+from math_trainer_core.core.user import (
+    StoredUserProfile,
+    create_users,
+    encode_profile,
+    invalidate_profile_cache,
+    load_user,
+    save_user,
+)
+
+
+_ROOM = Room(difficulty=2, time_pressure=2)
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """
+    Names whose snapshot was read from disk, in order.
+    """
+    decoded: list[str] = []
+    real = user.decode_snapshot
+
+    def counting(data, fallback_name):
+        decoded.append(fallback_name)
+        return real(data, fallback_name)
+
+    monkeypatch.setattr(user, "decode_snapshot", counting)
+    return decoded
+
+
+def test_unchanged_profiles_are_served_from_memory(local_users, decodes):
+    save_user(StoredUserProfile(name="anna", items={"plus": {_ROOM: Unlocked(mastery_level=1, score=4)}}))
+    invalidate_profile_cache()
+    load_user("anna")
+    load_user("anna")
+    assert decodes == ["anna"]
+
+    invalidate_profile_cache("anna")
+    load_user("anna")
+    assert decodes == ["anna", "anna"]
+
+
+def test_callers_get_their_own_copy(local_users):
+    save_user(StoredUserProfile(name="anna", items={"plus": {_ROOM: Unlocked(mastery_level=1, score=4)}}))
+    mine = load_user("anna")
+    mine.items["plus"] = {}
+    mine.items["minus"] = {}
+    assert load_user("anna").items == {"plus": {_ROOM: Unlocked(mastery_level=1, score=4)}}
+
+
+def test_a_file_changed_on_disk_is_read_again(local_users, decodes):
+    save_user(StoredUserProfile(name="anna", items={}))
+    load_user("anna")
+    # Another process replaces the snapshot.
+    shard = local_users / hashlib.sha1(b"anna").hexdigest()[:2]
+    changed = StoredUserProfile(name="anna", items={"plus": {_ROOM: Unlocked(mastery_level=3, score=12)}})
+    (shard / "anna.prof").write_bytes(encode_profile(changed))
+    assert load_user("anna").items == changed.items
+    assert decodes == ["anna"]
+
+
+def test_least_recently_used_profiles_are_dropped(local_users, decodes):
+    # More users than the cache holds.
+    names = [f"u{index:03d}" for index in range(200)]
+    create_users(names)
+    for name in names:
+        load_user(name)
+    decodes.clear()
+
+    load_user(names[-1])
+    assert decodes == []
+    # The first user was pushed out by the last one.
+    load_user(names[0])
+    assert decodes == [names[0]]
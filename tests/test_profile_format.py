@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import struct
+
+import pytest
+
+from math_trainer_core.api_types import Locked, Room, Unlocked
+from math_trainer_core.core.user import (
+    StoredUserProfile,
+    decode_profile,
+    decode_snapshot,
+    encode_profile,
+    export_user_json,
+    list_user_names,
+    load_user,
+    total_score,
+)
+
+
+def _profile() -> StoredUserProfile:
+    grids = {
+        "plus": {
+            Room(difficulty=1, time_pressure=1): Unlocked(mastery_level=3, score=3),
+            Room(difficulty=4, time_pressure=2): Unlocked(mastery_level=1, score=8),
+            Room(difficulty=9, time_pressure=5): Locked(),
+        },
+        "glosor": {Room(difficulty=300, time_pressure=1): Unlocked(mastery_level=0, score=0)},
+        "tom": {},
+    }
+    return StoredUserProfile(name="åsa", items=grids, revision=17)
+
+
+def _older_version(data: bytes, version: int) -> bytes:
+    # Same body, with a version 1 or 2 header instead of the version 3 one.
+    name_len = len("åsa".encode("utf-8"))
+    body = data[5 + struct.calcsize("<IQH"):]
+    if version == 1:
+        header = struct.pack("<H", name_len)
+    else:
+        header = struct.pack("<IH", 17, name_len)
+    return b"MTUP" + bytes([version]) + header + body
+
+
+def test_round_trip_keeps_grids_revision_and_log_offset():
+    profile = _profile()
+    decoded, log_offset = decode_snapshot(encode_profile(profile, log_offset=1234), fallback_name="x")
+    assert log_offset == 1234
+    assert decoded.name == "åsa"
+    assert decoded.revision == 17
+    assert dict(decoded.items) == profile.items
+    assert total_score(decoded) == 11
+
+
+def test_untouched_grids_are_written_back_as_they_were():
+    data = encode_profile(_profile(), log_offset=99)
+    decoded, _ = decode_snapshot(data, fallback_name="x")
+    assert encode_profile(decoded, log_offset=99) == data
+
+    decoded.items["plus"] = {Room(difficulty=1, time_pressure=1): Unlocked(mastery_level=4, score=4)}
+    again = decode_profile(encode_profile(decoded), fallback_name="x")
+    assert again.items["glosor"] == _profile().items["glosor"]
+    assert total_score(again) == 4
+
+
+@pytest.mark.parametrize("version, revision", [(1, 0), (2, 17)])
+def test_older_versions_still_load(version, revision):
+    data = _older_version(encode_profile(_profile(), log_offset=55), version)
+    decoded, log_offset = decode_snapshot(data, fallback_name="x")
+    assert (decoded.revision, log_offset) == (revision, 0)
+    assert dict(decoded.items) == _profile().items
+
+
+def test_unknown_data_is_rejected():
+    with pytest.raises(ValueError):
+        decode_profile(b"{}\n" + bytes(8), fallback_name="x")
+    with pytest.raises(ValueError):
+        decode_profile(b"MTUP" + bytes([9]) + bytes(16), fallback_name="x")
+
+
+def test_empty_name_falls_back():
+    data = encode_profile(StoredUserProfile(name="", items={}))
+    assert decode_profile(data, fallback_name="player").name == "player"
+
+
+def test_legacy_json_profile_is_migrated_on_load(local_users):
+    local_users.mkdir()
+    profile = _profile()
+    profile.name = "asa"
+    (local_users / "asa.json").write_text(export_user_json(profile), encoding="utf-8")
+
+    loaded = load_user("asa")
+    assert loaded is not None
+    assert dict(loaded.items) == profile.items
+    assert not (local_users / "asa.json").exists()
+    assert [path.name for path in local_users.glob("*/asa.prof")] == ["asa.prof"]
+    assert list_user_names() == ["asa"]
+    assert dict(load_user("asa").items) == profile.items
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+
+from math_trainer_core.api_types import Locked, Room, Unlocked
+from math_trainer_core.core import user
+from math_trainer_core.core.file_lock import file_lock
+from math_trainer_core.core.leaderboard import index_path
+from math_trainer_core.core.user import (
+    StoredUserProfile,
+    iter_highscore_batches,
+    load_highscores,
+    load_user,
+    merge_grids,
+    read_progress_history,
+    save_user,
+)
+
+
+_ROOM_A = Room(difficulty=1, time_pressure=1)
+_ROOM_B = Room(difficulty=2, time_pressure=1)
+
+
+def _unlocked(room: Room, mastery_level: int) -> Unlocked:
+    return Unlocked(mastery_level=mastery_level, score=room.difficulty * room.time_pressure * mastery_level)
+
+
+def test_lock_is_exclusive_and_bounded(tmp_path):
+    path = tmp_path / "locks" / "anna.lock"
+    results = []
+
+    def try_lock() -> None:
+        with file_lock(path, timeout_s=0.05) as acquired:
+            results.append(acquired)
+
+    with file_lock(path) as held:
+        assert held
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+    assert results == [False]
+    with file_lock(path, timeout_s=0.0) as again:
+        assert again
+
+
+def test_merge_grids_keeps_the_best_of_both():
+    ours = {_ROOM_A: _unlocked(_ROOM_A, 3), _ROOM_B: Locked()}
+    theirs = {_ROOM_A: _unlocked(_ROOM_A, 1), _ROOM_B: _unlocked(_ROOM_B, 0)}
+    assert merge_grids(ours, theirs) == {_ROOM_A: _unlocked(_ROOM_A, 3), _ROOM_B: _unlocked(_ROOM_B, 0)}
+
+
+def test_concurrent_saves_from_stale_copies_merge(local_users):
+    save_user(StoredUserProfile(name="anna", items={"plus": {_ROOM_A: Locked(), _ROOM_B: Locked()}}))
+    first = load_user("anna")
+    second = load_user("anna")
+
+    first.items["plus"] = {_ROOM_A: _unlocked(_ROOM_A, 3), _ROOM_B: Locked()}
+    save_user(first)
+    second.items["plus"] = {_ROOM_A: _unlocked(_ROOM_A, 1), _ROOM_B: _unlocked(_ROOM_B, 2)}
+    save_user(second)
+
+    expected = {_ROOM_A: _unlocked(_ROOM_A, 3), _ROOM_B: _unlocked(_ROOM_B, 2)}
+    # The later writer gets the merged state back in place.
+    assert second.items["plus"] == expected
+    assert load_user("anna").items["plus"] == expected
+    assert load_highscores() == {"anna": 7}
+
+
+def test_save_without_the_lock_still_records_progress(local_users, monkeypatch):
+    save_user(StoredUserProfile(name="anna", items={}))
+    list(iter_highscore_batches())
+    assert index_path(local_users).exists()
+
+    @contextmanager
+    def busy_lock(path, timeout_s=0.0):
+        yield False
+
+    monkeypatch.setattr(user, "file_lock", busy_lock)
+    profile = load_user("anna")
+    profile.items["plus"] = {_ROOM_A: _unlocked(_ROOM_A, 2)}
+    save_user(profile)
+
+    # Not holding the leaderboard lock, the save drops the index rather
+    # than risk losing its update.
+    assert not index_path(local_users).exists()
+    monkeypatch.setattr(user, "file_lock", file_lock)
+    assert load_user("anna").items["plus"] == {_ROOM_A: _unlocked(_ROOM_A, 2)}
+    assert len(read_progress_history("anna")) == 1
+    assert load_highscores() == {"anna": 2}
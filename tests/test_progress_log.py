@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from math_trainer_core.api_types import Locked, Room, Unlocked
+from math_trainer_core.core.progress_log import (
+    ProgressEvent,
+    append_events,
+    append_lines,
+    apply_events,
+    diff_events,
+    merge_events,
+    read_events,
+)
+from math_trainer_core.core.user import (
+    StoredUserProfile,
+    compact_user,
+    import_progress,
+    invalidate_profile_cache,
+    load_highscores,
+    load_user,
+    read_progress_history,
+    save_user,
+)
+
+
+_ROOMS = [Room(difficulty=difficulty, time_pressure=1) for difficulty in range(1, 4)]
+
+
+def _unlocked(room: Room, mastery_level: int) -> Unlocked:
+    return Unlocked(mastery_level=mastery_level, score=room.difficulty * room.time_pressure * mastery_level)
+
+
+def _event(room: Room, mastery_level: int, unlocked: bool = True) -> ProgressEvent:
+    return ProgressEvent(training_id="plus", room=room, mastery_level=mastery_level, unlocked=unlocked, timestamp=1.0)
+
+
+def test_diff_only_reports_rooms_that_moved_forward():
+    before = {"plus": {_ROOMS[0]: _unlocked(_ROOMS[0], 2), _ROOMS[1]: Locked()}}
+    after = {"plus": {_ROOMS[0]: _unlocked(_ROOMS[0], 1), _ROOMS[1]: _unlocked(_ROOMS[1], 0), _ROOMS[2]: Locked()}}
+    events = diff_events(before, after)
+    assert [(event.room, event.mastery_level, event.unlocked) for event in events] == [
+        (_ROOMS[1], 0, True),
+        (_ROOMS[2], 0, False),
+    ]
+
+    items = {"plus": dict(before["plus"])}
+    apply_events(items, events)
+    assert items["plus"] == {
+        _ROOMS[0]: _unlocked(_ROOMS[0], 2),
+        _ROOMS[1]: _unlocked(_ROOMS[1], 0),
+        _ROOMS[2]: Locked(),
+    }
+
+
+def test_replaying_events_is_order_independent_and_idempotent():
+    events = [_event(_ROOMS[0], 1), _event(_ROOMS[0], 3), _event(_ROOMS[1], 0, unlocked=False), _event(_ROOMS[1], 2)]
+    forward: dict = {}
+    apply_events(forward, events)
+    backward: dict = {}
+    apply_events(backward, list(reversed(events)) + events)
+    assert forward == backward == {"plus": {_ROOMS[0]: _unlocked(_ROOMS[0], 3), _ROOMS[1]: _unlocked(_ROOMS[1], 2)}}
+    assert merge_events(forward, events) == []
+
+
+def test_log_reads_stop_at_a_partial_line(tmp_path):
+    path = tmp_path / "anna.log"
+    end = append_events(path, [_event(_ROOMS[0], 1)])
+    with open(path, "ab") as handle:
+        handle.write(b'{"t":"plus"')
+    events, offset = read_events(path)
+    assert len(events) == 1 and offset == end
+
+    # The next append terminates the torn line first, so no event is lost.
+    append_lines(path, b"not an event\n")
+    append_events(path, [_event(_ROOMS[1], 2)])
+    later, _ = read_events(path, offset)
+    assert [event.room for event in later] == [_ROOMS[1]]
+
+
+def test_saves_append_events_and_compaction_keeps_the_state(local_users):
+    profile = StoredUserProfile(name="anna", items={})
+    save_user(profile)
+    for mastery_level in range(1, 4):
+        profile.items["plus"] = {_ROOMS[0]: _unlocked(_ROOMS[0], mastery_level)}
+        save_user(profile)
+    history = read_progress_history("anna")
+    assert [event.mastery_level for event in history] == [1, 2, 3]
+    assert load_user("anna").revision == 3
+
+    assert compact_user("anna")
+    invalidate_profile_cache()
+    loaded = load_user("anna")
+    assert loaded.items == profile.items
+    assert loaded.revision == 3
+    assert read_progress_history("anna") == history
+    assert not compact_user("nobody")
+
+
+def test_import_progress_logs_only_news(local_users):
+    save_user(StoredUserProfile(name="anna", items={"plus": {_ROOMS[0]: _unlocked(_ROOMS[0], 2)}}))
+    assert import_progress("anna", [_event(_ROOMS[0], 1), _event(_ROOMS[1], 1)]) == 1
+    assert import_progress("anna", [_event(_ROOMS[1], 1)]) == 0
+    assert load_user("anna").items["plus"] == {_ROOMS[0]: _unlocked(_ROOMS[0], 2), _ROOMS[1]: _unlocked(_ROOMS[1], 1)}
+
+    assert import_progress("bo", [_event(_ROOMS[2], 1)]) == 1
+    assert load_highscores() == {"anna": 4, "bo": 3}
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import pytest
+
+from math_trainer_core.plugins import question_batch
+from math_trainer_core.plugins.addition.plugin import PlusPlugin, _max_sum
+from math_trainer_core.plugins.alphabet_order.plugin import AlphabetOrderPlugin
+from math_trainer_core.plugins.minus.plugin import MinusPlugin
+from math_trainer_core.plugins.multiplication.plugin import MultiplicationPlugin
+from math_trainer_core.plugins.place_value_addition.plugin import PlaceValueAdditionPlugin
+from math_trainer_core.plugins.plugin_host import _Host
+from math_trainer_core.plugins.question_batch import QuestionBatch, make_questions, random_ints
+
+
+@pytest.fixture(params=["numpy", "fallback"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if question_batch.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(question_batch, "np", None)
+    return request.param
+
+
+def test_question_batch_builds_questions_when_indexed():
+    made = []
+
+    def make(a, b):
+        made.append((a, b))
+        return (a, b)
+
+    batch = QuestionBatch(make, [1, 2, 3], [4, 5, 6])
+    assert len(batch) == 3
+    assert made == []
+    assert batch[1] == (2, 5)
+    assert batch[-1] == (3, 6)
+    assert batch[0:2] == [(1, 4), (2, 5)]
+    assert made == [(2, 5), (3, 6), (1, 4), (2, 5)]
+    with pytest.raises(IndexError):
+        batch[3]
+
+
+def test_random_ints_respects_per_item_bounds(backend):
+    highs = random_ints(500, 0, 5)
+    values = random_ints(500, 0, highs)
+    assert all(0 <= value <= high <= 5 for value, high in zip(values, highs))
+
+
+def test_plugin_without_make_questions_falls_back_to_make_question():
+    questions = make_questions(AlphabetOrderPlugin(), 2, 4)
+    assert len(questions) == 4
+    assert all(len(question.shown) == 5 for question in questions)
+
+
+def test_plugin_host_makes_batches_of_plugins_without_make_questions():
+    host = _Host()
+    host.create(1, "math_trainer_core.plugins.alphabet_order.plugin")
+    batch = host.make(1, 0, 3)
+    assert len(batch) == 3
+    assert len({question_id for question_id, _, _ in batch}) == 3
+
+
+def test_addition_batch_stays_within_the_level(backend):
+    for level in (0, 4):
+        for question in make_questions(PlusPlugin(), level, 300):
+            assert question.a >= 2 and question.b >= 2
+            assert question.a + question.b <= _max_sum(level)
+
+
+def test_minus_batch_avoids_negative_answers_on_low_levels(backend):
+    questions = make_questions(MinusPlugin(), 0, 300)
+    assert all(0 <= question.b <= question.a <= 10 for question in questions)
+
+
+def test_multiplication_batch_covers_the_level_table(backend):
+    questions = make_questions(MultiplicationPlugin(), 1, 300)
+    assert all(0 <= question.a <= 2 and 0 <= question.b <= 10 for question in questions)
+    assert all(isinstance(question.a, int) and isinstance(question.b, int) for question in questions)
+
+
+def test_place_value_batch_uses_distinct_powers(backend):
+    for question in make_questions(PlaceValueAdditionPlugin(), 1, 100):
+        assert 2 <= len(question.terms) <= 3
+        powers = [len(str(term)) - 1 for term in question.terms]
+        assert len(set(powers)) == len(powers)
+        assert all(str(term)[0] != "0" and set(str(term)[1:]) <= {"0"} for term in question.terms)
+        assert question.terms == sorted(question.terms, reverse=True)
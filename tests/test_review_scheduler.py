@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from math_trainer_core.core.review_scheduler import ReviewScheduler, ReviewStates
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    random.seed(99)
+
+
+def _keys(count: int) -> list[str]:
+    return [f"ord {index}" for index in range(count)]
+
+
+def _ask(scheduler: ReviewScheduler, count: int, wrong: set[int] = frozenset()) -> list[int]:
+    asked = []
+    for _ in range(count):
+        index = scheduler.next_item()
+        scheduler.record(index, index not in wrong)
+        asked.append(index)
+    return asked
+
+
+def test_every_item_is_asked_and_never_twice_in_a_row():
+    asked = _ask(ReviewScheduler(_keys(20)), 200)
+    assert set(asked) == set(range(20))
+    assert all(a != b for a, b in zip(asked, asked[1:]))
+
+
+def test_known_items_come_back_less_and_less_often():
+    asked = _ask(ReviewScheduler(_keys(400)), 4000)
+    times = [position for position, index in enumerate(asked) if index == 0]
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert gaps[:6] == sorted(gaps[:6])
+    assert gaps[5] > 100
+
+
+def test_a_small_chapter_cycles_when_nothing_is_due():
+    asked = _ask(ReviewScheduler(_keys(10)), 1000)
+    assert set(asked[-10:]) == set(range(10))
+
+
+def test_a_wrong_answer_brings_the_item_back_soon():
+    scheduler = ReviewScheduler(_keys(30))
+    _ask(scheduler, 200)
+    index = scheduler.next_item()
+    scheduler.record(index, False)
+    assert index in _ask(scheduler, 3)
+
+
+def test_state_survives_a_dump_and_follows_the_keys():
+    keys = _keys(25)
+    scheduler = ReviewScheduler(keys)
+    _ask(scheduler, 300, wrong={3, 7})
+    state = scheduler.dump()
+    restored = ReviewScheduler(keys, state)
+    assert restored.dump() == state
+    # The items answered wrong are due first, after a restore too.
+    assert set(_ask(restored, 2)) == set(_ask(scheduler, 2)) == {3, 7}
+
+    # One item gone, one new: the others keep their state, 13 bytes each.
+    changed = ReviewScheduler(["new"] + keys[1:], state)
+    assert len(changed.dump()) == len(state) - 13
+    assert set(_ask(changed, 2)) == {3, 7}
+    assert 0 in _ask(changed, 25)
+
+
+def test_an_empty_chapter_cannot_schedule():
+    with pytest.raises(ValueError):
+        ReviewScheduler([]).next_item()
+
+
+def test_states_keep_chapters_not_used_this_session():
+    states = ReviewStates()
+    _ask(states.scheduler("a.json", lambda: _keys(5)), 20)
+    _ask(states.scheduler("b.json", lambda: _keys(8)), 20)
+    saved = states.dump()
+
+    again = ReviewStates()
+    again.load(saved)
+    again.scheduler("a.json", lambda: _keys(5))
+    assert again.dump() == saved
+
+    # A changed chapter: its state carries over, by key, to the new one.
+    again.forget("b.json")
+    rebuilt = again.scheduler("b.json", lambda: _keys(9))
+    assert len(rebuilt) == 9
+    assert 8 in _ask(rebuilt, 2)
+
+    again.load(b"not a state")
+    assert again.dump() == ReviewStates().dump()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import hashlib
+
+from math_trainer_core.api_types import Room, Unlocked
+from math_trainer_core.core.user import (
+    StoredUserProfile,
+    create_users,
+    encode_profile,
+    list_unsharded_user_names,
+    list_user_names,
+    load_plugin_state,
+    load_user,
+    save_plugin_state,
+    save_user,
+)
+from math_trainer_core.tools.migrate_users import migrate_users
+
+
+_ROOM = Room(difficulty=3, time_pressure=2)
+
+
+def _shard(users_dir, name: str):
+    return users_dir / hashlib.sha1(name.encode("utf-8")).hexdigest()[:2]
+
+
+def test_user_files_live_in_the_users_shard(local_users):
+    save_user(StoredUserProfile(name="anna", items={"plus": {_ROOM: Unlocked(mastery_level=1, score=6)}}))
+    save_plugin_state("anna", "plus", b"state")
+
+    shard = _shard(local_users, "anna")
+    assert sorted(path.name for path in shard.iterdir()) == ["anna.lock", "anna.log", "anna.plus.state", "anna.prof"]
+    assert [path.name for path in local_users.glob("anna*")] == []
+    assert load_plugin_state("anna", "plus") == b"state"
+
+
+def test_names_come_from_the_manifest(local_users):
+    create_users(["cleo", "anna"])
+    save_user(StoredUserProfile(name="bo", items={}))
+    manifest = local_users / "names.manifest"
+    assert sorted(manifest.read_text(encoding="utf-8").split()) == ["anna", "bo", "cleo"]
+    assert list_user_names() == ["anna", "bo", "cleo"]
+
+    manifest.unlink()
+    assert list_user_names() == ["anna", "bo", "cleo"]
+    assert manifest.exists()
+
+
+def test_flat_profiles_load_until_migrated(local_users):
+    local_users.mkdir()
+    flat = StoredUserProfile(name="dan", items={"plus": {_ROOM: Unlocked(mastery_level=2, score=12)}})
+    (local_users / "dan.prof").write_bytes(encode_profile(flat))
+    save_user(StoredUserProfile(name="eve", items={}))
+
+    assert list_unsharded_user_names() == ["dan"]
+    assert load_user("dan").items == flat.items
+
+    assert migrate_users() == 1
+    assert list_unsharded_user_names() == []
+    assert (_shard(local_users, "dan") / "dan.prof").exists()
+    assert load_user("dan").items == flat.items
+    assert list_user_names() == ["dan", "eve"]
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from math_trainer_core.api_types import Room, Unlocked
+from math_trainer_core.core.progress_log import ProgressEvent, encode_user_events
+from math_trainer_core.core.sync import SharedFolderTransport, SyncServerTransport, sync
+from math_trainer_core.core.user import (
+    StoredUserProfile,
+    invalidate_profile_cache,
+    list_user_names,
+    load_user,
+    save_user,
+)
+from math_trainer_core.tools.kv_server import start_local_kv_server
+
+
+_ROOM_A = Room(difficulty=1, time_pressure=2)
+_ROOM_B = Room(difficulty=3, time_pressure=1)
+
+
+def _unlocked(room: Room, mastery_level: int) -> Unlocked:
+    return Unlocked(mastery_level=mastery_level, score=room.difficulty * room.time_pressure * mastery_level)
+
+
+@pytest.fixture
+def machines(local_users, tmp_path):
+    """
+    on(name) switches to that machine's working directory, so two
+    machines can take turns in one process.
+    """
+
+    def on(name: str) -> None:
+        directory = tmp_path / name
+        directory.mkdir(exist_ok=True)
+        os.chdir(directory)
+        invalidate_profile_cache()
+
+    return on
+
+
+@pytest.fixture
+def server():
+    server = start_local_kv_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _exchange_progress(on, transport) -> None:
+    on("laptop")
+    save_user(StoredUserProfile(name="anna", items={"plus": {_ROOM_A: _unlocked(_ROOM_A, 2)}}))
+    save_user(StoredUserProfile(name="bo", items={}))
+    report = sync(transport)
+    assert (report.pushed, report.pulled) == (1, 0)
+
+    on("desktop")
+    report = sync(transport)
+    assert report.updated == {"anna": 1}
+    assert list_user_names() == ["anna", "bo"]
+    anna = load_user("anna")
+    anna.items["plus"] = {_ROOM_A: _unlocked(_ROOM_A, 1), _ROOM_B: _unlocked(_ROOM_B, 3)}
+    save_user(anna)
+    assert sync(transport).pushed == 1
+
+    on("laptop")
+    report = sync(transport)
+    assert report.updated == {"anna": 1}
+    assert load_user("anna").items["plus"] == {_ROOM_A: _unlocked(_ROOM_A, 2), _ROOM_B: _unlocked(_ROOM_B, 3)}
+
+    # Nothing new on either side: nothing is sent or merged again.
+    report = sync(transport)
+    assert (report.pushed, report.pulled, report.updated) == (0, 0, {})
+    on("desktop")
+    assert sync(transport).updated == {}
+
+
+def test_shared_folder_sync_exchanges_only_new_progress(machines, tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    _exchange_progress(machines, SharedFolderTransport(shared))
+
+
+def test_server_sync_exchanges_only_new_progress(machines, server):
+    host, port = server.server_address[:2]
+    _exchange_progress(machines, SyncServerTransport(host, port))
+
+
+def test_feeds_cannot_name_files_outside_the_users_directory(machines, tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    event = ProgressEvent(training_id="plus", room=_ROOM_A, mastery_level=1, unlocked=True, timestamp=1.0)
+    (shared / "other.feed").write_bytes(
+        encode_user_events("../evil", [event]) + encode_user_events("cleo", [event])
+    )
+    machines("laptop")
+    report = sync(SharedFolderTransport(shared))
+    assert report.updated == {"cleo": 1}
+    assert list_user_names() == ["cleo"]